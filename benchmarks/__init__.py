@@ -0,0 +1,4 @@
+"""
+Portfolio API Benchmarks
+ベンチマーク・負荷試験パッケージ
+"""
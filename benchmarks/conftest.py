@@ -0,0 +1,72 @@
+"""
+Benchmark Configuration and Fixtures
+ベンチマーク用フィクスチャ（motoによるDynamoDBのスタンドインに対して実行）
+"""
+
+import asyncio
+import os
+
+import boto3
+import pytest
+
+# DEBUG=falseではカーソル署名キーが必須のため、設定を読み込む前にベンチマーク用の値を設定
+os.environ.setdefault("CURSOR_SECRET_KEY", "benchmark")
+
+from app.core.config import get_settings
+from app.services.metric_service import MetricService
+from app.services.user_service import UserService
+from benchmarks.stand_in import create_tables, seed_metrics, seed_users
+
+# 投入するデータ量（一覧・集計のベンチマーク結果はこの件数に依存する）
+SEED_USERS = 200
+SEED_DEVICES = 20
+SEED_METRICS_PER_DEVICE = 25
+
+
+@pytest.fixture(scope="session")
+def run_async():
+    """コルーチンを同期的に実行する関数（pytest-benchmarkは同期関数のみ計測できるため）"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def dynamodb_tables(run_async):
+    """motoのDynamoDBにテーブルを作成してデータを投入"""
+    moto = pytest.importorskip("moto")
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(name, "benchmark")
+
+    settings = get_settings()
+    with moto.mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name=settings.AWS_REGION)
+        tables = create_tables(dynamodb, settings, boto3.client("dynamodb", region_name=settings.AWS_REGION))
+        user_ids = run_async(seed_users(_user_service(tables), SEED_USERS))
+        device_ids = run_async(seed_metrics(_metric_service(tables), SEED_DEVICES, SEED_METRICS_PER_DEVICE))
+        yield {"tables": tables, "user_ids": user_ids, "device_ids": device_ids}
+
+
+def _user_service(tables) -> UserService:
+    settings = get_settings()
+    return UserService(
+        tables[settings.DYNAMODB_USERS_TABLE],
+        reservations_table=tables[settings.DYNAMODB_USER_RESERVATIONS_TABLE]
+    )
+
+
+def _metric_service(tables) -> MetricService:
+    settings = get_settings()
+    return MetricService(tables[settings.DYNAMODB_METRICS_TABLE], tables[settings.DYNAMODB_ROLLUPS_TABLE])
+
+
+@pytest.fixture
+def user_service(dynamodb_tables) -> UserService:
+    """キャッシュなしのUserService（DynamoDB呼び出しを含めて計測する）"""
+    return _user_service(dynamodb_tables["tables"])
+
+
+@pytest.fixture
+def metric_service(dynamodb_tables) -> MetricService:
+    """キャッシュなしのMetricService（ロールアップ有効）"""
+    return _metric_service(dynamodb_tables["tables"])
@@ -0,0 +1,261 @@
+"""
+HTTP Load Generator
+FastAPIアプリケーションに非同期で負荷をかけ、シナリオごとのスループット・レイテンシを計測する
+
+使い方:
+    # アプリケーションをプロセス内で起動し、motoのDynamoDBに対して実行
+    PYTHONPATH=src python -m benchmarks.load_test --scenario all --duration 10 --output results/HEAD.json
+
+    # DynamoDB Localに対して実行（テーブルがなければ作成）
+    DYNAMODB_ENDPOINT_URL=http://localhost:8001 PYTHONPATH=src python -m benchmarks.load_test
+
+    # 起動済みのサーバーに対して実行（データ投入は行わない）
+    PYTHONPATH=src python -m benchmarks.load_test --base-url http://localhost:8000
+
+    # 前回の結果と比較
+    PYTHONPATH=src python -m benchmarks.load_test --output results/new.json --compare results/base.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+API_PREFIX = "/api/v1"
+SCENARIOS = ("ingest", "latest", "summary", "list")
+
+
+@dataclass
+class ScenarioResult:
+    """シナリオの計測結果"""
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    status_codes: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def record(self, latency: float, status_code: Optional[int]) -> None:
+        self.latencies.append(latency)
+        if status_code is None or status_code >= 400:
+            self.errors += 1
+        if status_code is not None:
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        latencies_ms = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(len(self.latencies) / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(latencies_ms.max()), 2),
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())}
+        }
+
+
+def _scenario_request(name: str, device_ids: List[str]) -> Callable[[httpx.AsyncClient, Dict], Any]:
+    """シナリオの1リクエストを送信する関数（stateはワーカーごとの状態）"""
+
+    async def ingest(client: httpx.AsyncClient, state: Dict) -> httpx.Response:
+        return await client.post(f"{API_PREFIX}/metrics", json={
+            "device_id": random.choice(device_ids),
+            "metric_name": random.choice(("temperature", "humidity", "pressure")),
+            "value": round(random.uniform(0, 100), 2),
+            "unit": "unit",
+            "status": "active",
+            "metadata": {"source": "load_test"}
+        })
+
+    async def latest(client: httpx.AsyncClient, state: Dict) -> httpx.Response:
+        return await client.get(f"{API_PREFIX}/metrics/latest", params={
+            "device_id": random.choice(device_ids), "limit": 10
+        })
+
+    async def summary(client: httpx.AsyncClient, state: Dict) -> httpx.Response:
+        return await client.get(f"{API_PREFIX}/metrics/summary")
+
+    async def list_page(client: httpx.AsyncClient, state: Dict) -> httpx.Response:
+        # デバイスのメトリクスをカーソルで辿り、最終ページに達したら別のデバイスから再開
+        params = {"device_id": state.setdefault("device_id", random.choice(device_ids)), "limit": 20}
+        if state.get("cursor"):
+            params["cursor"] = state["cursor"]
+        response = await client.get(f"{API_PREFIX}/metrics", params=params)
+        state["cursor"] = response.json().get("next_cursor") if response.status_code == 200 else None
+        if not state["cursor"]:
+            state.pop("device_id")
+        return response
+
+    return {"ingest": ingest, "latest": latest, "summary": summary, "list": list_page}[name]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    device_ids: List[str],
+    concurrency: int,
+    duration: float,
+    warmup: float
+) -> ScenarioResult:
+    """指定時間、concurrency個のワーカーからリクエストを送り続ける（ウォームアップ中の結果は除外）"""
+    send = _scenario_request(name, device_ids)
+    result = ScenarioResult(name)
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    async def worker():
+        state: Dict = {}
+        while True:
+            request_started = time.perf_counter()
+            if request_started >= deadline:
+                return
+            try:
+                status_code = (await send(client, state)).status_code
+            except httpx.HTTPError:
+                status_code = None
+            if request_started >= measure_from:
+                result.record(time.perf_counter() - request_started, status_code)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - measure_from
+    return result
+
+
+@contextlib.asynccontextmanager
+async def in_process_client(devices: int, metrics_per_device: int):
+    """
+    アプリケーションをプロセス内で起動したクライアント
+    DYNAMODB_ENDPOINT_URLが未設定の場合はmotoのDynamoDBを使用し、テーブル作成・データ投入を行う
+    """
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_FILE", "")
+    os.environ.setdefault("CURSOR_SECRET_KEY", "load-test")
+    use_moto = not os.environ.get("DYNAMODB_ENDPOINT_URL")
+    mock = contextlib.nullcontext()
+    if use_moto:
+        from moto import mock_aws
+
+        for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            os.environ.setdefault(name, "benchmark")
+        mock = mock_aws()
+
+    with mock:
+        from app.core.config import get_settings
+        from app.dependencies import get_dynamodb_client, get_dynamodb_resource
+        from app.services.metric_service import MetricService
+        from benchmarks.stand_in import create_tables, seed_metrics
+        from main import app
+
+        settings = get_settings()
+        tables = create_tables(get_dynamodb_resource(), settings, get_dynamodb_client())
+        device_ids = await seed_metrics(
+            MetricService(tables[settings.DYNAMODB_METRICS_TABLE], tables[settings.DYNAMODB_ROLLUPS_TABLE]),
+            devices,
+            metrics_per_device
+        )
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+                yield client, device_ids
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """結果の表示（baselineがある場合はp50/p95/p99・req/sの変化率も表示）"""
+    print(f"\nrevision={report['revision']} concurrency={report['concurrency']} duration={report['duration']}s")
+    print(f"{'scenario':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in report["scenarios"].items():
+        print(
+            f"{name:<10}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>10}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        )
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base:
+            changes = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                if base[key]:
+                    changes.append(f"{key} {(stats[key] - base[key]) / base[key] * 100:+.1f}%")
+            print(f"{'':<10}vs {baseline.get('revision')}: " + ", ".join(changes))
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+
+    if args.base_url:
+        client_context = contextlib.nullcontext()
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=30.0)
+        device_ids = [f"bench-device-{i:03d}" for i in range(args.devices)]
+    else:
+        client_context = in_process_client(args.devices, args.metrics_per_device)
+
+    report = {
+        "revision": _git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.base_url or "in-process",
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "scenarios": {}
+    }
+    async with client_context as context:
+        if context is not None:
+            client, device_ids = context
+        async with client:
+            for name in scenarios:
+                result = await run_scenario(client, name, device_ids, args.concurrency, args.duration, args.warmup)
+                report["scenarios"][name] = result.summary()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Portfolio APIの負荷試験")
+    parser.add_argument("--scenario", choices=(*SCENARIOS, "all"), default="all")
+    parser.add_argument("--base-url", help="起動済みサーバーのURL（未指定の場合はプロセス内で起動）")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時に送信するリクエスト数")
+    parser.add_argument("--duration", type=float, default=10.0, help="シナリオごとの計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=1.0, help="計測から除外する開始直後の時間（秒）")
+    parser.add_argument("--devices", type=int, default=20, help="データ投入・リクエストに使うデバイス数")
+    parser.add_argument("--metrics-per-device", type=int, default=50, help="デバイスごとの投入件数")
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    parser.add_argument("--compare", help="比較対象の結果JSONファイル")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
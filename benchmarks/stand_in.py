@@ -0,0 +1,123 @@
+"""
+DynamoDB Stand-in
+ベンチマーク用のテーブル作成とデータ投入（moto / DynamoDB Localのどちらでも使用できる）
+"""
+
+from typing import Dict, List, Optional
+
+from app.core.config import Settings
+from app.core.dynamodb import AsyncTable, as_async_table
+from app.models.metric import MetricCreate, MetricStatus
+from app.models.user import UserCreate
+from app.services.metric_service import MetricService
+from app.services.user_service import UserService
+
+METRIC_NAMES = ("temperature", "humidity", "pressure")
+
+
+def _key_schema(hash_key: str, range_key: Optional[str] = None) -> List[Dict[str, str]]:
+    schema = [{"AttributeName": hash_key, "KeyType": "HASH"}]
+    if range_key:
+        schema.append({"AttributeName": range_key, "KeyType": "RANGE"})
+    return schema
+
+
+def _gsi(name: str, hash_key: str, range_key: Optional[str] = None) -> Dict:
+    return {"IndexName": name, "KeySchema": _key_schema(hash_key, range_key), "Projection": {"ProjectionType": "ALL"}}
+
+
+def table_definitions(settings: Settings) -> List[Dict]:
+    """
+    アプリケーションが使用するテーブル定義（terraform/main.tfと同じキー・インデックス）
+    timestampはアプリケーションの保存形式に合わせてISO 8601文字列（S）とする
+    """
+    return [
+        {
+            "TableName": settings.DYNAMODB_USERS_TABLE,
+            "KeySchema": _key_schema("user_id"),
+            "AttributeDefinitions": [
+                {"AttributeName": name, "AttributeType": "S"} for name in ("user_id", "username", "email")
+            ],
+            "GlobalSecondaryIndexes": [_gsi("username-index", "username"), _gsi("email-index", "email")]
+        },
+        {
+            "TableName": settings.DYNAMODB_USER_RESERVATIONS_TABLE,
+            "KeySchema": _key_schema("reservation_key"),
+            "AttributeDefinitions": [{"AttributeName": "reservation_key", "AttributeType": "S"}]
+        },
+        {
+            "TableName": settings.DYNAMODB_METRICS_TABLE,
+            "KeySchema": _key_schema("device_id", "timestamp"),
+            "AttributeDefinitions": [
+                {"AttributeName": name, "AttributeType": "S"}
+                for name in ("device_id", "timestamp", "status", "metric_id")
+            ],
+            "GlobalSecondaryIndexes": [
+                _gsi("timestamp-index", "timestamp", "device_id"),
+                _gsi("status-index", "status", "timestamp"),
+                _gsi("metric-id-index", "metric_id")
+            ]
+        },
+        {
+            "TableName": settings.DYNAMODB_ROLLUPS_TABLE,
+            "KeySchema": _key_schema("device_id", "metric_name"),
+            "AttributeDefinitions": [
+                {"AttributeName": name, "AttributeType": "S"} for name in ("device_id", "metric_name")
+            ]
+        }
+    ]
+
+
+def create_tables(dynamodb, settings: Settings, client) -> Dict[str, AsyncTable]:
+    """
+    テーブルを作成（既存のテーブルはそのまま使用）し、テーブル名をキーとした非同期アダプターの辞書で返す
+    clientはclient_call用の低レベルクライアント（boto3.client）
+    """
+    existing = {table.name for table in dynamodb.tables.all()}
+    tables = {}
+    for definition in table_definitions(settings):
+        name = definition["TableName"]
+        if name not in existing:
+            dynamodb.create_table(BillingMode="PAY_PER_REQUEST", **definition).wait_until_exists()
+        tables[name] = as_async_table(dynamodb.Table(name), client)
+    return tables
+
+
+def device_ids(count: int) -> List[str]:
+    return [f"bench-device-{i:03d}" for i in range(count)]
+
+
+def sample_metric(device_id: str, index: int) -> MetricCreate:
+    return MetricCreate(
+        device_id=device_id,
+        metric_name=METRIC_NAMES[index % len(METRIC_NAMES)],
+        value=20.0 + (index % 50) * 0.5,
+        unit="unit",
+        status=MetricStatus.ACTIVE,
+        metadata={"source": "benchmark"}
+    )
+
+
+async def seed_metrics(service: MetricService, devices: int, metrics_per_device: int) -> List[str]:
+    """デバイスごとにメトリクスを一括登録（同一デバイス内のtimestampの重複はcreate_metrics_batchが解消する）"""
+    ids = device_ids(devices)
+    for device_id in ids:
+        result = await service.create_metrics_batch([sample_metric(device_id, i) for i in range(metrics_per_device)])
+        if result.failure_count:
+            raise RuntimeError(f"Failed to seed {result.failure_count} metrics for {device_id}")
+    return ids
+
+
+async def seed_users(service: UserService, count: int) -> List[str]:
+    """ユーザーを投入し、作成したuser_idを返す"""
+    user_ids = []
+    for i in range(count):
+        user = await service.create_user(UserCreate(
+            username=f"bench{i:05d}",
+            email=f"bench{i:05d}@example.com",
+            full_name=f"Benchmark User {i}",
+            is_active=True,
+            password="password123"
+        ))
+        user_ids.append(user.user_id)
+    return user_ids
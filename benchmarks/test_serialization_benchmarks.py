@@ -0,0 +1,89 @@
+"""
+Serialization Benchmarks
+一覧APIの1ページ（100件）あたりのシリアライズCPU時間
+（デフォルト: response_modelでの辞書化・再検証・シリアライズ後にJSONResponse / 高速パス: FastJSONResponse）
+
+実行方法:
+    PYTHONPATH=src pytest benchmarks/test_serialization_benchmarks.py
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.core.responses import FastJSONResponse
+from app.models.metric import MetricListResponse, MetricResponse
+from app.models.user import UserListResponse, UserResponse
+
+pytest.importorskip("pytest_benchmark")
+
+PAGE_SIZE = 100
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat()
+
+
+def _metric_page():
+    """DynamoDBから読み出した形式の1ページ分のメトリクス"""
+    items = [
+        {
+            "metric_id": f"metric-{i:05d}", "device_id": "bench-device-000", "metric_name": "temperature",
+            "value": Decimal("23.5") + i, "unit": "celsius", "status": "active",
+            "metadata": {"source": "benchmark"}, "timestamp": NOW, "created_at": NOW, "updated_at": NOW
+        }
+        for i in range(PAGE_SIZE)
+    ]
+    metrics = [MetricResponse(**item) for item in items]
+    return MetricListResponse(metrics=metrics, total_count=len(metrics), limit=PAGE_SIZE, offset=0)
+
+
+def _user_page():
+    items = [
+        {
+            "user_id": f"user-{i:05d}", "username": f"user{i:05d}", "email": f"user{i:05d}@example.com",
+            "full_name": f"User {i}", "is_active": True, "created_at": NOW, "updated_at": NOW
+        }
+        for i in range(PAGE_SIZE)
+    ]
+    users = [UserResponse(**item) for item in items]
+    return UserListResponse(users=users, total_count=len(users), limit=PAGE_SIZE, offset=0)
+
+
+def _default_path(response_model, run_async):
+    """FastAPIのデフォルトの処理（serialize_responseでの辞書化・再検証・シリアライズ後にJSONResponseでエンコード）"""
+    route = APIRoute("/bench", lambda: None, response_model=response_model)
+
+    def render(content):
+        serialized = run_async(serialize_response(
+            field=route.secure_cloned_response_field, response_content=content, is_coroutine=True
+        ))
+        return JSONResponse(serialized).body
+
+    return render
+
+
+@pytest.mark.benchmark(group="serialize-metrics-page")
+class TestMetricPageSerialization:
+    """GET /metrics 1ページ分のシリアライズ"""
+
+    def test_default(self, benchmark, run_async):
+        page = _metric_page()
+        assert benchmark(_default_path(MetricListResponse, run_async), page)
+
+    def test_fast_path(self, benchmark):
+        page = _metric_page()
+        assert benchmark(lambda: FastJSONResponse(page).body)
+
+
+@pytest.mark.benchmark(group="serialize-users-page")
+class TestUserPageSerialization:
+    """GET /users 1ページ分のシリアライズ"""
+
+    def test_default(self, benchmark, run_async):
+        page = _user_page()
+        assert benchmark(_default_path(UserListResponse, run_async), page)
+
+    def test_fast_path(self, benchmark):
+        page = _user_page()
+        assert benchmark(lambda: FastJSONResponse(page).body)
@@ -0,0 +1,120 @@
+"""
+Service Benchmarks
+UserService・MetricServiceのマイクロベンチマーク
+
+実行方法:
+    PYTHONPATH=src pytest benchmarks --benchmark-autosave
+    PYTHONPATH=src pytest benchmarks --benchmark-compare   # 前回保存した結果との比較
+"""
+
+import itertools
+
+import pytest
+
+from app.core.exceptions import MetricNotFoundException
+from app.models.metric import MetricUpdate
+from app.models.user import UserCreate
+from benchmarks.stand_in import sample_metric
+
+pytest.importorskip("pytest_benchmark")
+
+# create系のベンチマークで一意なユーザー名を払い出す
+_sequence = itertools.count()
+
+
+@pytest.mark.benchmark(group="users")
+class TestUserServiceBenchmarks:
+    """UserServiceのベンチマーク"""
+
+    def test_get_user(self, benchmark, run_async, user_service, dynamodb_tables):
+        user_id = dynamodb_tables["user_ids"][0]
+        user = benchmark(lambda: run_async(user_service.get_user(user_id)))
+        assert user.user_id == user_id
+
+    def test_list_users_all_pages(self, benchmark, run_async, user_service, dynamodb_tables):
+        """カーソルで全ページを辿る"""
+
+        async def list_all():
+            count, cursor = 0, None
+            while True:
+                page = await user_service.get_users(limit=50, cursor=cursor)
+                count += len(page.users)
+                cursor = page.next_cursor
+                if not cursor:
+                    return count
+
+        assert benchmark(lambda: run_async(list_all())) >= len(dynamodb_tables["user_ids"])
+
+    def test_create_user(self, benchmark, run_async, user_service):
+        def create():
+            n = next(_sequence)
+            return run_async(user_service.create_user(UserCreate(
+                username=f"create{n:06d}",
+                email=f"create{n:06d}@example.com",
+                full_name="Benchmark User",
+                is_active=True,
+                password="password123"
+            )))
+
+        assert benchmark(create).user_id
+
+
+@pytest.mark.benchmark(group="metrics")
+class TestMetricServiceBenchmarks:
+    """MetricServiceのベンチマーク（ingest・latest・summary・一覧）"""
+
+    def test_ingest_single(self, benchmark, run_async, metric_service, dynamodb_tables):
+        device_id = dynamodb_tables["device_ids"][0]
+        metric = benchmark(lambda: run_async(metric_service.create_metric(sample_metric(device_id, next(_sequence)))))
+        assert metric.device_id == device_id
+
+    def test_ingest_batch(self, benchmark, run_async, metric_service, dynamodb_tables):
+        """デバイスごとに1件ずつ、BatchWriteItemでまとめて書き込む"""
+        device_ids = dynamodb_tables["device_ids"]
+
+        def ingest():
+            n = next(_sequence)
+            return run_async(metric_service.create_metrics_batch([sample_metric(d, n) for d in device_ids]))
+
+        assert benchmark(ingest).failure_count == 0
+
+    def test_update_and_delete(self, benchmark, run_async, metric_service, dynamodb_tables):
+        """作成したメトリクスをmetric_idで更新・削除する（metric-id-indexでテーブルのキーを解決）"""
+        device_id = dynamodb_tables["device_ids"][2]
+
+        async def update_and_delete():
+            metric = await metric_service.create_metric(sample_metric(device_id, next(_sequence)))
+            updated = await metric_service.update_metric(metric.metric_id, MetricUpdate(value=99.5))
+            deleted = await metric_service.delete_metric(metric.metric_id)
+            return metric, updated, deleted
+
+        metric, updated, deleted = benchmark(lambda: run_async(update_and_delete()))
+        assert updated.metric_id == metric.metric_id
+        assert updated.value == 99.5
+        assert deleted is True
+        assert run_async(metric_service.get_metric(metric.metric_id)) is None
+        with pytest.raises(MetricNotFoundException):
+            run_async(metric_service.delete_metric(metric.metric_id))
+
+    def test_latest_by_device(self, benchmark, run_async, metric_service, dynamodb_tables):
+        device_id = dynamodb_tables["device_ids"][0]
+        metrics = benchmark(lambda: run_async(metric_service.get_latest_metrics(device_id=device_id, limit=10)))
+        assert len(metrics) == 10
+
+    def test_summary(self, benchmark, run_async, metric_service):
+        assert benchmark(lambda: run_async(metric_service.get_metrics_summary()))
+
+    def test_list_device_metrics_all_pages(self, benchmark, run_async, metric_service, dynamodb_tables):
+        """デバイスのメトリクスをカーソルで全ページ取得"""
+        device_id = dynamodb_tables["device_ids"][1]
+
+        async def list_all():
+            count, cursor = 0, None
+            while True:
+                page = await metric_service.get_metrics(limit=10, device_id=device_id, cursor=cursor)
+                count += len(page.metrics)
+                cursor = page.next_cursor
+                if not cursor:
+                    return count
+
+        assert benchmark(lambda: run_async(list_all())) >= 10
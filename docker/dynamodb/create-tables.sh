@@ -0,0 +1,48 @@
+#!/bin/sh
+# DynamoDB Local のテーブル作成（benchmarks/stand_in.py の table_definitions と同じキー・インデックス）
+# 作成済みのテーブルはスキップするため、何度実行してもよい
+set -e
+
+ENDPOINT="${DYNAMODB_ENDPOINT_URL:-http://dynamodb-local:8000}"
+
+# DynamoDB Local の起動待ち
+until aws dynamodb list-tables --endpoint-url "$ENDPOINT" > /dev/null 2>&1; do
+  sleep 1
+done
+
+create_table() {
+  name="$1"
+  shift
+  if aws dynamodb describe-table --endpoint-url "$ENDPOINT" --table-name "$name" > /dev/null 2>&1; then
+    echo "Table exists: $name"
+    return
+  fi
+  aws dynamodb create-table --endpoint-url "$ENDPOINT" --table-name "$name" \
+    --billing-mode PAY_PER_REQUEST "$@" > /dev/null
+  echo "Table created: $name"
+}
+
+create_table "$DYNAMODB_USERS_TABLE" \
+  --attribute-definitions AttributeName=user_id,AttributeType=S AttributeName=username,AttributeType=S \
+    AttributeName=email,AttributeType=S \
+  --key-schema AttributeName=user_id,KeyType=HASH \
+  --global-secondary-indexes \
+    'IndexName=username-index,KeySchema=[{AttributeName=username,KeyType=HASH}],Projection={ProjectionType=ALL}' \
+    'IndexName=email-index,KeySchema=[{AttributeName=email,KeyType=HASH}],Projection={ProjectionType=ALL}'
+
+create_table "$DYNAMODB_USER_RESERVATIONS_TABLE" \
+  --attribute-definitions AttributeName=reservation_key,AttributeType=S \
+  --key-schema AttributeName=reservation_key,KeyType=HASH
+
+create_table "$DYNAMODB_METRICS_TABLE" \
+  --attribute-definitions AttributeName=device_id,AttributeType=S AttributeName=timestamp,AttributeType=S \
+    AttributeName=status,AttributeType=S AttributeName=metric_id,AttributeType=S \
+  --key-schema AttributeName=device_id,KeyType=HASH AttributeName=timestamp,KeyType=RANGE \
+  --global-secondary-indexes \
+    'IndexName=timestamp-index,KeySchema=[{AttributeName=timestamp,KeyType=HASH},{AttributeName=device_id,KeyType=RANGE}],Projection={ProjectionType=ALL}' \
+    'IndexName=status-index,KeySchema=[{AttributeName=status,KeyType=HASH},{AttributeName=timestamp,KeyType=RANGE}],Projection={ProjectionType=ALL}' \
+    'IndexName=metric-id-index,KeySchema=[{AttributeName=metric_id,KeyType=HASH}],Projection={ProjectionType=ALL}'
+
+create_table "$DYNAMODB_ROLLUPS_TABLE" \
+  --attribute-definitions AttributeName=device_id,AttributeType=S AttributeName=metric_name,AttributeType=S \
+  --key-schema AttributeName=device_id,KeyType=HASH AttributeName=metric_name,KeyType=RANGE
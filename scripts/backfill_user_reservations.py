@@ -0,0 +1,43 @@
+"""
+User Reservation Backfill
+既存ユーザーのusername/email予約項目を作成する
+USER_RESERVATIONS_ENABLED=trueにする前に実行し、重複（conflicts）が0件であることを確認すること
+（有効化までの間に作成されたユーザーを含めるため、有効化後にもう一度実行する）
+
+使い方:
+    python scripts/backfill_user_reservations.py
+"""
+
+import asyncio
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+from app.core.config import get_settings  # noqa: E402
+from app.dependencies import get_dynamodb_resource  # noqa: E402
+from app.services.user_service import UserService  # noqa: E402
+
+
+async def backfill() -> int:
+    settings = get_settings()
+    dynamodb = get_dynamodb_resource()
+    service = UserService(
+        dynamodb.Table(settings.DYNAMODB_USERS_TABLE),
+        reservations_table=dynamodb.Table(settings.DYNAMODB_USER_RESERVATIONS_TABLE)
+    )
+
+    counts = await service.backfill_reservations()
+    print(
+        f"users: {counts['users']}, reserved: {counts['reserved']}, conflicts: {counts['conflicts']} "
+        f"({settings.DYNAMODB_USERS_TABLE} -> {settings.DYNAMODB_USER_RESERVATIONS_TABLE})"
+    )
+    if counts['conflicts']:
+        print("Resolve the duplicated usernames/emails listed above before enabling USER_RESERVATIONS_ENABLED")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(backfill()))
@@ -0,0 +1,60 @@
+"""
+Import-Time Profile Report
+アプリケーション（src/main.py）のimport時間を計測し、時間のかかるモジュールを一覧表示する
+
+使い方:
+    python scripts/profile_imports.py [--top 20] [--module main]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def profile_imports(module: str) -> List[Tuple[str, int, int]]:
+    """python -X importtimeの出力を (モジュール名, 自身の時間μs, 累積時間μs) のリストに変換"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        env={**os.environ, "PYTHONPATH": SRC_DIR},
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="import時間のプロファイル")
+    parser.add_argument("--module", default="main", help="計測するモジュール")
+    parser.add_argument("--top", type=int, default=20, help="表示するモジュール数")
+    args = parser.parse_args()
+
+    entries = profile_imports(args.module)
+    total = next((cumulative for name, _, cumulative in entries if name == args.module), 0)
+
+    print(f"Total import time of {args.module}: {total / 1000:.1f} ms\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    print("\nTop packages by self time:")
+    for name, self_us, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
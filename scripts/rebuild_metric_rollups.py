@@ -0,0 +1,40 @@
+"""
+Metric Rollup Rebuild
+メトリクス表の全件からロールアップ表を再構築する
+ROLLUP_MODE=inlineを有効にする前の既存データの取り込みや、ロールアップの不整合の修復に使用する
+（メトリクス表をScanするため、負荷の低い時間帯に実行すること）
+
+使い方:
+    python scripts/rebuild_metric_rollups.py
+"""
+
+import asyncio
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+from app.core.config import get_settings  # noqa: E402
+from app.dependencies import get_dynamodb_resource  # noqa: E402
+from app.services.metric_service import MetricService  # noqa: E402
+
+
+async def rebuild() -> int:
+    settings = get_settings()
+    dynamodb = get_dynamodb_resource()
+    service = MetricService(
+        dynamodb.Table(settings.DYNAMODB_METRICS_TABLE),
+        dynamodb.Table(settings.DYNAMODB_ROLLUPS_TABLE)
+    )
+
+    counts = await service.rebuild_rollups()
+    print(
+        f"metrics: {counts['metrics']}, rollups: {counts['rollups']}, removed: {counts['removed']} "
+        f"({settings.DYNAMODB_METRICS_TABLE} -> {settings.DYNAMODB_ROLLUPS_TABLE})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(rebuild()))
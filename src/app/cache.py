@@ -0,0 +1,283 @@
+"""
+Cache Backends
+キャッシュバックエンド（プロセス内 / Redisプロトコル共有キャッシュ）
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+from pydantic import TypeAdapter
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Settings.CACHE_BACKENDで選択可能なバックエンド
+CACHE_BACKEND_MEMORY = "memory"
+CACHE_BACKEND_REDIS = "redis"
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+class CacheBackend(ABC):
+    """
+    キャッシュバックエンドのインターフェース
+    値はmodel（UserResponse、List[MetricResponse]等）の型で登録・取得する
+    """
+
+    @abstractmethod
+    async def get(self, key: str, model: Any) -> Optional[Any]:
+        """キャッシュ値を取得（未登録・期限切れはNone）"""
+
+    @abstractmethod
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        model: Any,
+        tags: Iterable[str] = (),
+        ttl_seconds: Optional[float] = None
+    ) -> None:
+        """キャッシュ値を登録"""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """キーを無効化"""
+
+    @abstractmethod
+    async def invalidate_tags(self, *tags: str) -> None:
+        """タグに紐づく全キーを無効化"""
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """統計情報"""
+
+    async def start(self) -> None:
+        """バックグラウンド処理の開始（必要なバックエンドのみ）"""
+
+    async def close(self) -> None:
+        """リソースの解放"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """プロセス内TTL+LRUキャッシュ（単一タスク・ローカル開発向け）"""
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+
+    async def get(self, key: str, model: Any) -> Optional[Any]:
+        return self.cache.get(key)
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        model: Any,
+        tags: Iterable[str] = (),
+        ttl_seconds: Optional[float] = None
+    ) -> None:
+        self.cache.set(key, value, tags=tags, ttl_seconds=ttl_seconds)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.cache.delete(key)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        for tag in tags:
+            self.cache.invalidate_tag(tag)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"backend": CACHE_BACKEND_MEMORY, **self.cache.stats()}
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redisプロトコルの共有キャッシュ
+    複数タスク間で値を共有し、各タスクのニアキャッシュ（プロセス内L1）は
+    pub/subの無効化メッセージで一斉に破棄する
+    """
+
+    def __init__(
+        self,
+        redis,
+        channel: str,
+        ttl_seconds: float = 30.0,
+        key_prefix: str = "portfolio:cache:",
+        near_cache: Optional[TTLCache] = None
+    ):
+        self.redis = redis
+        self.channel = channel
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.near_cache = near_cache
+        # 自タスクが発行したメッセージを識別するID
+        self.node_id = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations_received = 0
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}tag:{tag}"
+
+    async def get(self, key: str, model: Any) -> Optional[Any]:
+        if self.near_cache is not None:
+            value = self.near_cache.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        try:
+            raw = await self.redis.get(self._key(key))
+        except Exception as e:
+            # キャッシュ障害時はDynamoDBから読むためミス扱い
+            self.errors += 1
+            logger.warning(f"Cache get failed for {key}: {e}")
+            return None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        value = _adapter(model).validate_json(raw)
+        if self.near_cache is not None:
+            self.near_cache.set(key, value)
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        model: Any,
+        tags: Iterable[str] = (),
+        ttl_seconds: Optional[float] = None
+    ) -> None:
+        ttl_ms = max(1, int((self.ttl_seconds if ttl_seconds is None else ttl_seconds) * 1000))
+        tags = list(tags)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(self._key(key), _adapter(model).dump_json(value), px=ttl_ms)
+                for tag in tags:
+                    pipe.sadd(self._tag_key(tag), key)
+                    pipe.pexpire(self._tag_key(tag), ttl_ms)
+                await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache set failed for {key}: {e}")
+            return
+
+        if self.near_cache is not None:
+            self.near_cache.set(key, value, tags=tags, ttl_seconds=ttl_seconds)
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        self._evict_local(keys=keys)
+        try:
+            await self.redis.delete(*(self._key(key) for key in keys))
+            await self._publish({"keys": list(keys)})
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache delete failed for {keys}: {e}")
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        if not tags:
+            return
+        self._evict_local(tags=tags)
+        try:
+            keys = set()
+            for tag in tags:
+                members = await self.redis.smembers(self._tag_key(tag))
+                keys.update(m.decode() if isinstance(m, bytes) else m for m in members)
+            await self.redis.delete(*(self._key(key) for key in keys), *(self._tag_key(tag) for tag in tags))
+            await self._publish({"keys": sorted(keys), "tags": list(tags)})
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache invalidation failed for {tags}: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": CACHE_BACKEND_REDIS,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "invalidations_received": self.invalidations_received,
+            "subscribed": self._listener is not None and not self._listener.done()
+        }
+        if self.near_cache is not None:
+            stats["near_cache"] = self.near_cache.stats()
+        return stats
+
+    async def start(self) -> None:
+        """無効化チャンネルの購読を開始"""
+        if self.near_cache is None or self._listener is not None:
+            return
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"Subscribed to cache invalidation channel: {self.channel}")
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self.redis.aclose()
+
+    async def _publish(self, message: Dict[str, Any]) -> None:
+        if self.near_cache is None:
+            return
+        await self.redis.publish(self.channel, json.dumps({"node": self.node_id, **message}))
+
+    async def _listen(self) -> None:
+        """他タスクからの無効化メッセージをニアキャッシュに反映"""
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                self.handle_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error: {e}")
+                await asyncio.sleep(1.0)
+
+    def handle_invalidation(self, data: Any) -> None:
+        """無効化メッセージ（JSON）を処理"""
+        payload = json.loads(data)
+        if payload.get("node") == self.node_id:
+            return
+        self.invalidations_received += 1
+        self._evict_local(keys=payload.get("keys", ()), tags=payload.get("tags", ()))
+
+    def _evict_local(self, keys: Iterable[str] = (), tags: Iterable[str] = ()) -> None:
+        if self.near_cache is None:
+            return
+        for key in keys:
+            self.near_cache.delete(key)
+        for tag in tags:
+            self.near_cache.invalidate_tag(tag)
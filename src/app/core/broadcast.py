@@ -0,0 +1,150 @@
+"""
+Metric Broadcast Hub
+新規メトリクスを購読者へ配信するプロセス内ハブ
+"""
+
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.core.config import get_settings
+from app.core.exceptions import ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+# 購読終了を通知する番兵
+_CLOSED = object()
+
+
+class Subscription:
+    """
+    ハブの購読者
+    デバイスを指定せずに購読を開始した場合（all_devices）のみ全デバイスのメトリクスを受け取る
+    """
+
+    def __init__(self, hub: "BroadcastHub", device_ids: Optional[Iterable[str]], queue_size: int):
+        self._hub = hub
+        self.device_ids: Set[str] = set(device_ids or ())
+        self.all_devices = not self.device_ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self.close_reason: Optional[str] = None
+
+    def matches(self, device_id: str) -> bool:
+        return self.all_devices or device_id in self.device_ids
+
+    def add_devices(self, device_ids: Iterable[str]) -> None:
+        """購読デバイスを追加（全デバイスを購読中の場合は指定したデバイスのみの購読に切り替える）"""
+        device_ids = set(device_ids)
+        if device_ids:
+            self.all_devices = False
+            self.device_ids |= device_ids
+
+    def remove_devices(self, device_ids: Iterable[str]) -> None:
+        """購読デバイスを解除（全て解除した場合は何も受け取らない。全デバイスの購読には戻らない）"""
+        self.device_ids -= set(device_ids)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        次のメッセージを取得
+        timeout経過時はNone、購読終了時はStopAsyncIterationを送出
+        """
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is _CLOSED:
+            raise StopAsyncIteration
+        return message
+
+    def close(self, reason: Optional[str] = None) -> None:
+        """購読を終了（未送信のメッセージは破棄）"""
+        self._hub.unsubscribe(self)
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        message = await self.get()
+        while message is None:
+            message = await self.get()
+        return message
+
+
+class BroadcastHub:
+    """
+    メトリクス配信ハブ
+    購読者ごとに上限付きキューを持ち、publishは待機しない
+    キューが溢れた（読み取りが追いつかない）購読者は切断し、他の購読者や書き込み処理を遅らせない
+    """
+
+    def __init__(self, queue_size: int = 100, max_subscribers: int = 1000):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[Subscription] = set()
+        self.published = 0
+        self.delivered = 0
+        self.dropped_subscribers = 0
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, device_ids: Optional[Iterable[str]] = None) -> Subscription:
+        """購読を開始"""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise ServiceUnavailableException("metrics stream", "Too many subscribers")
+        subscription = Subscription(self, device_ids, self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, device_id: str, message: Any) -> int:
+        """device_idを購読中の全購読者へ配信し、配信できた件数を返す"""
+        self.published += 1
+        delivered = 0
+        for subscription in list(self._subscribers):
+            if not subscription.matches(device_id):
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                self.dropped_subscribers += 1
+                logger.warning("Dropping slow metrics stream subscriber")
+                subscription.close("slow_consumer")
+        self.delivered += delivered
+        return delivered
+
+    def close_all(self) -> None:
+        """全購読を終了（アプリ終了時）"""
+        for subscription in list(self._subscribers):
+            subscription.close("shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped_subscribers
+        }
+
+
+@lru_cache()
+def get_broadcast_hub() -> BroadcastHub:
+    """プロセス内で共有する配信ハブを取得"""
+    settings = get_settings()
+    return BroadcastHub(
+        queue_size=settings.STREAM_QUEUE_SIZE,
+        max_subscribers=settings.STREAM_MAX_SUBSCRIBERS
+    )
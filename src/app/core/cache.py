@@ -0,0 +1,152 @@
+"""
+In-Process Entity Cache
+プロセス内TTL+LRUキャッシュ
+"""
+
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from pydantic import BaseModel
+
+
+def estimate_size(value: Any) -> int:
+    """キャッシュ値のおおよそのサイズ（バイト）を見積もる"""
+    if isinstance(value, BaseModel):
+        return len(value.model_dump_json())
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    size: int
+    tags: Set[str]
+
+
+class TTLCache:
+    """
+    TTL+LRUキャッシュ
+    件数と合計サイズの両方で上限を設け、超過時は最も使われていない項目から追い出す
+    タグ（例: "user:<id>"）単位で関連するキーをまとめて無効化できる
+    イベントループ内からのみ使用する前提でロックは取らない
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 30.0,
+        sizeof: Callable[[Any], int] = estimate_size,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """キャッシュ値を取得（期限切れ・未登録はNone）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl_seconds: Optional[float] = None) -> None:
+        """キャッシュ値を登録（上限を超えた分はLRU順に追い出す）"""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            # 単体で上限を超える値はキャッシュしない
+            self.delete(key)
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        entry = _Entry(value=value, expires_at=self._clock() + ttl, size=size, tags=set(tags))
+        self._entries[key] = entry
+        self._bytes += size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """キーを無効化"""
+        if key not in self._entries:
+            return False
+        self._remove(key)
+        self.invalidations += 1
+        return True
+
+    def invalidate_tag(self, tag: str) -> int:
+        """タグに紐づく全キーを無効化"""
+        keys = list(self._tags.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """全項目を削除（統計値は保持）"""
+        self._entries.clear()
+        self._tags.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率等の統計情報"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
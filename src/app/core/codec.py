@@ -0,0 +1,106 @@
+"""
+DynamoDB Item Codec
+Pythonの値とDynamoDBの型付き属性値（{'S': ...}, {'N': ...}等）の相互変換
+数値はDecimalを経由せずint/floatとして扱う
+"""
+
+import math
+from decimal import Decimal
+from typing import Any, Dict, List
+
+# 属性値のキー（型記述子）
+_STRING = 'S'
+_NUMBER = 'N'
+_BINARY = 'B'
+_BOOLEAN = 'BOOL'
+_NULL = 'NULL'
+_MAP = 'M'
+_LIST = 'L'
+_STRING_SET = 'SS'
+_NUMBER_SET = 'NS'
+_BINARY_SET = 'BS'
+
+
+def _encode_number(value: Any) -> str:
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f"DynamoDB does not support {value} as a number")
+        return repr(value)
+    return str(value)
+
+
+def decode_number(text: str) -> Any:
+    """数値属性の文字列をint（小数点・指数なし）またはfloatに変換"""
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def encode_value(value: Any) -> Dict[str, Any]:
+    """Pythonの値を型付き属性値に変換"""
+    if isinstance(value, str):
+        return {_STRING: value}
+    # boolはintのサブクラスのため数値より先に判定
+    if isinstance(value, bool):
+        return {_BOOLEAN: value}
+    if isinstance(value, (int, float, Decimal)):
+        return {_NUMBER: _encode_number(value)}
+    if value is None:
+        return {_NULL: True}
+    if isinstance(value, dict):
+        return {_MAP: {k: encode_value(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {_LIST: [encode_value(v) for v in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {_BINARY: bytes(value)}
+    if isinstance(value, (set, frozenset)):
+        # 空のセットは型を決められず、DynamoDBも受け付けないため属性ごと省略すること
+        if not value:
+            raise ValueError("DynamoDB does not support empty sets; omit the attribute instead")
+        if all(isinstance(v, str) for v in value):
+            return {_STRING_SET: list(value)}
+        if all(isinstance(v, (bytes, bytearray)) for v in value):
+            return {_BINARY_SET: [bytes(v) for v in value]}
+        if all(isinstance(v, (int, float, Decimal)) and not isinstance(v, bool) for v in value):
+            return {_NUMBER_SET: [_encode_number(v) for v in value]}
+    raise TypeError(f"Unsupported type for DynamoDB: {type(value).__name__}")
+
+
+def decode_value(attribute: Dict[str, Any]) -> Any:
+    """型付き属性値をPythonの値に変換"""
+    (tag, value), = attribute.items()
+    if tag == _STRING:
+        return value
+    if tag == _NUMBER:
+        return decode_number(value)
+    if tag == _MAP:
+        return {k: decode_value(v) for k, v in value.items()}
+    if tag == _LIST:
+        return [decode_value(v) for v in value]
+    if tag == _BOOLEAN:
+        return value
+    if tag == _NULL:
+        return None
+    if tag == _BINARY:
+        return value
+    if tag == _STRING_SET:
+        return set(value)
+    if tag == _NUMBER_SET:
+        return {decode_number(v) for v in value}
+    if tag == _BINARY_SET:
+        return set(value)
+    raise TypeError(f"Unsupported DynamoDB attribute type: {tag}")
+
+
+def encode_item(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """項目（キー・ExpressionAttributeValues等）を型付き属性値の辞書に変換"""
+    return {k: encode_value(v) for k, v in item.items()}
+
+
+def decode_item(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """型付き属性値の辞書を項目に変換"""
+    return {k: decode_value(v) for k, v in item.items()}
+
+
+def decode_items(items: List[Dict[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    return [decode_item(item) for item in items]
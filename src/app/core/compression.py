@@ -0,0 +1,139 @@
+"""
+Response Compression
+Accept-Encodingのネゴシエーションとストリーム圧縮器（zstd / br / gzip）
+brotli・zstandardは任意依存（未インストールの場合はその方式を提示しない）
+"""
+
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ENCODING_GZIP = "gzip"
+ENCODING_BROTLI = "br"
+ENCODING_ZSTD = "zstd"
+
+# 動的なレスポンス向けに圧縮速度を優先した既定値
+DEFAULT_LEVELS = {ENCODING_GZIP: 6, ENCODING_BROTLI: 4, ENCODING_ZSTD: 3}
+
+
+class Compressor(ABC):
+    """ストリーム圧縮器"""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """チャンクを圧縮（出力は圧縮器の内部にバッファされる場合がある）"""
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """それまでの入力をクライアント側で展開できるよう出力"""
+
+    @abstractmethod
+    def finish(self, data: bytes = b"") -> bytes:
+        """最後のチャンクを圧縮してストリームを終了"""
+
+
+class GzipCompressor(Compressor):
+    def __init__(self, level: int):
+        # wbits=16+MAX_WBITSでgzipヘッダー・トレーラーを付与
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliCompressor(Compressor):
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+def _available_compressors() -> Dict[str, Callable[[int], Compressor]]:
+    compressors = {ENCODING_GZIP: GzipCompressor}
+    if brotli is not None:
+        compressors[ENCODING_BROTLI] = BrotliCompressor
+    if zstandard is not None:
+        compressors[ENCODING_ZSTD] = ZstdCompressor
+    return compressors
+
+
+COMPRESSORS = _available_compressors()
+
+
+def create_compressor(encoding: str, level: Optional[int] = None) -> Compressor:
+    """圧縮方式の圧縮器を作成（levelを省略した場合は既定値）"""
+    return COMPRESSORS[encoding](DEFAULT_LEVELS[encoding] if level is None else level)
+
+
+def _parse_accept_encoding(accept_encoding: str) -> Dict[str, float]:
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate_encoding(accept_encoding: Optional[str], preferred: Iterable[str]) -> Optional[str]:
+    """
+    Accept-Encodingのq値が最も高い圧縮方式を選択（同じq値の場合はpreferredの順）
+    q=0の方式・未インストールの方式は選択しない
+    """
+    if not accept_encoding:
+        return None
+    qualities = _parse_accept_encoding(accept_encoding)
+    selected, selected_quality = None, 0.0
+    for encoding in preferred:
+        if encoding not in COMPRESSORS:
+            continue
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > selected_quality:
+            selected, selected_quality = encoding, quality
+    return selected
@@ -4,11 +4,13 @@ Portfolio API Configuration
 """
 
 import os
+import secrets
 from datetime import datetime, timezone
 from functools import lru_cache
 from typing import List, Optional
 
-from pydantic import BaseSettings, Field
+from pydantic import Field, model_validator
+from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
@@ -27,7 +29,23 @@ class Settings(BaseSettings):
     # DynamoDB設定
     DYNAMODB_USERS_TABLE: str = Field(default="portfolio-users", env="DYNAMODB_USERS_TABLE")
     DYNAMODB_METRICS_TABLE: str = Field(default="portfolio-metrics", env="DYNAMODB_METRICS_TABLE")
+    DYNAMODB_USER_RESERVATIONS_TABLE: str = Field(default="portfolio-user-reservations", env="DYNAMODB_USER_RESERVATIONS_TABLE")
+    DYNAMODB_ROLLUPS_TABLE: str = Field(default="portfolio-metric-rollups", env="DYNAMODB_ROLLUPS_TABLE")
+    # username/emailの一意性をトランザクションで保証（既存ユーザーの予約項目をバックフィルしてから有効化すること）
+    USER_RESERVATIONS_ENABLED: bool = Field(default=False, env="USER_RESERVATIONS_ENABLED")
     DYNAMODB_ENDPOINT_URL: Optional[str] = Field(default=None, env="DYNAMODB_ENDPOINT_URL")  # ローカル開発用
+    DYNAMODB_BACKEND: str = Field(default="threadpool", env="DYNAMODB_BACKEND")  # sync / threadpool / aioboto3
+    DYNAMODB_EXECUTOR_MAX_WORKERS: int = Field(default=32, env="DYNAMODB_EXECUTOR_MAX_WORKERS")
+    DYNAMODB_METRICS_CODEC: str = Field(default="native", env="DYNAMODB_METRICS_CODEC")  # native: 数値をint/float / resource: Decimal
+    
+    # botocoreクライアント設定（接続プール・タイムアウト・リトライ）
+    DYNAMODB_MAX_POOL_CONNECTIONS: int = Field(default=64, env="DYNAMODB_MAX_POOL_CONNECTIONS")  # 同時実行数以上に設定
+    DYNAMODB_CONNECT_TIMEOUT: float = Field(default=2.0, env="DYNAMODB_CONNECT_TIMEOUT")  # 秒
+    DYNAMODB_READ_TIMEOUT: float = Field(default=5.0, env="DYNAMODB_READ_TIMEOUT")  # 秒
+    DYNAMODB_RETRY_MODE: str = Field(default="standard", env="DYNAMODB_RETRY_MODE")  # legacy / standard / adaptive
+    DYNAMODB_MAX_ATTEMPTS: int = Field(default=3, env="DYNAMODB_MAX_ATTEMPTS")  # 初回を含む試行回数
+    DYNAMODB_TCP_KEEPALIVE: bool = Field(default=True, env="DYNAMODB_TCP_KEEPALIVE")
+    DYNAMODB_RETURN_CONSUMED_CAPACITY: bool = Field(default=True, env="DYNAMODB_RETURN_CONSUMED_CAPACITY")  # 計測用
     
     # CORS設定
     ALLOWED_ORIGINS: List[str] = Field(
@@ -39,8 +57,114 @@ class Settings(BaseSettings):
         env="ALLOWED_ORIGINS"
     )
     
+    # メトリクス一括登録設定
+    METRICS_BATCH_MAX_ITEMS: int = Field(default=10000, env="METRICS_BATCH_MAX_ITEMS")
+    METRICS_BATCH_CONCURRENCY: int = Field(default=8, env="METRICS_BATCH_CONCURRENCY")  # 同時実行するBatchWriteItem数
+    METRICS_BATCH_MAX_RETRIES: int = Field(default=5, env="METRICS_BATCH_MAX_RETRIES")
+    METRICS_BATCH_RETRY_BASE_DELAY: float = Field(default=0.05, env="METRICS_BATCH_RETRY_BASE_DELAY")  # 秒
+    
+    # メトリクス書き込みモード設定
+    METRICS_WRITE_MODE: str = Field(default="sync", env="METRICS_WRITE_MODE")  # sync / write_behind / wal
+    WRITE_BUFFER_MAX_SIZE: int = Field(default=10000, env="WRITE_BUFFER_MAX_SIZE")  # 超過時は429
+    WRITE_BUFFER_BATCH_SIZE: int = Field(default=100, env="WRITE_BUFFER_BATCH_SIZE")
+    WRITE_BUFFER_FLUSH_INTERVAL: float = Field(default=0.05, env="WRITE_BUFFER_FLUSH_INTERVAL")  # 秒
+    WRITE_BUFFER_WORKERS: int = Field(default=2, env="WRITE_BUFFER_WORKERS")
+    WRITE_BUFFER_SHUTDOWN_TIMEOUT: float = Field(default=10.0, env="WRITE_BUFFER_SHUTDOWN_TIMEOUT")  # 秒
+    WRITE_BUFFER_DEAD_LETTER_FILE: str = Field(
+        default="data/write-buffer-dead-letter.jsonl", env="WRITE_BUFFER_DEAD_LETTER_FILE"
+    )  # 書き込めなかった項目の退避先
+    WAL_DIR: str = Field(default="data/wal", env="WAL_DIR")
+    WAL_SEGMENT_MAX_BYTES: int = Field(default=67108864, env="WAL_SEGMENT_MAX_BYTES")  # 64MB
+    WAL_MAX_BYTES: int = Field(default=1073741824, env="WAL_MAX_BYTES")  # 未再生の上限（超過時は429）
+    WAL_FSYNC_INTERVAL: float = Field(default=0.0, env="WAL_FSYNC_INTERVAL")  # グループコミットの待ち時間（秒）
+    WAL_REPLAY_BATCH_SIZE: int = Field(default=100, env="WAL_REPLAY_BATCH_SIZE")
+    WAL_REPLAY_MAX_RETRIES: int = Field(default=10, env="WAL_REPLAY_MAX_RETRIES")  # 超過したレコードはデッドレターへ退避
+    
+    # メトリクス集計（ロールアップ）設定
+    ROLLUP_MODE: str = Field(default="inline", env="ROLLUP_MODE")  # inline / disabled
+    
+    # デバイス履歴ストリーミング設定
+    DEVICE_METRICS_PAGE_SIZE: int = Field(default=500, env="DEVICE_METRICS_PAGE_SIZE")  # 1回のQueryで取得する件数
+    
+    # 時間バケット集計設定（/metrics/aggregate、超過時は400）
+    AGGREGATE_MAX_BUCKETS: int = Field(default=1440, env="AGGREGATE_MAX_BUCKETS")  # 期間の上限（バケット数）
+    AGGREGATE_MAX_POINTS: int = Field(default=200000, env="AGGREGATE_MAX_POINTS")  # 1回の集計で読み出す件数の上限
+    
+    # エンティティキャッシュ設定（ユーザー・メトリクス詳細）
+    CACHE_ENABLED: bool = Field(default=True, env="CACHE_ENABLED")
+    CACHE_TTL_SECONDS: float = Field(default=30.0, env="CACHE_TTL_SECONDS")
+    CACHE_MAX_ENTRIES: int = Field(default=10000, env="CACHE_MAX_ENTRIES")
+    CACHE_MAX_BYTES: int = Field(default=33554432, env="CACHE_MAX_BYTES")  # 32MB
+    CACHE_BACKEND: str = Field(default="memory", env="CACHE_BACKEND")  # memory / redis
+    CACHE_LATEST_TTL_SECONDS: float = Field(default=5.0, env="CACHE_LATEST_TTL_SECONDS")  # /metrics/latest用
+    CACHE_NEAR_TTL_SECONDS: float = Field(default=5.0, env="CACHE_NEAR_TTL_SECONDS")  # redis時のプロセス内L1（0で無効）
+    CACHE_INVALIDATION_CHANNEL: str = Field(default="portfolio:cache:invalidate", env="CACHE_INVALIDATION_CHANNEL")
+    REDIS_URL: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
+    
+    # 同一読み取りの同時実行をまとめる（single-flight）
+    SINGLE_FLIGHT_ENABLED: bool = Field(default=True, env="SINGLE_FLIGHT_ENABLED")
+    
+    # ライブ配信設定（SSE / WebSocket）
+    STREAM_QUEUE_SIZE: int = Field(default=100, env="STREAM_QUEUE_SIZE")  # 購読者ごとの未送信上限（超過で切断）
+    STREAM_MAX_SUBSCRIBERS: int = Field(default=1000, env="STREAM_MAX_SUBSCRIBERS")
+    STREAM_HEARTBEAT_SECONDS: float = Field(default=15.0, env="STREAM_HEARTBEAT_SECONDS")
+    
+    # レスポンス設定
+    RESPONSE_FAST_PATH: bool = Field(default=False, env="RESPONSE_FAST_PATH")  # 一覧APIでresponse_modelの再検証を省略
+    
+    # HTTPキャッシュ設定（ETag・Last-Modifiedによる条件付きGETとCache-Control）
+    HTTP_CACHE_ENABLED: bool = Field(default=True, env="HTTP_CACHE_ENABLED")
+    HTTP_CACHE_CONTROL_USER: str = Field(default="private, no-cache", env="HTTP_CACHE_CONTROL_USER")  # 共有キャッシュに保存しない
+    HTTP_CACHE_CONTROL_METRIC: str = Field(default="public, max-age=60", env="HTTP_CACHE_CONTROL_METRIC")
+    HTTP_CACHE_CONTROL_METRICS_SUMMARY: str = Field(
+        default="public, max-age=10, stale-while-revalidate=30", env="HTTP_CACHE_CONTROL_METRICS_SUMMARY"
+    )
+    
+    # レスポンス圧縮設定（Accept-Encodingに応じてzstd / br / gzipで圧縮）
+    COMPRESSION_ENABLED: bool = Field(default=True, env="COMPRESSION_ENABLED")
+    COMPRESSION_MIN_SIZE: int = Field(default=1024, env="COMPRESSION_MIN_SIZE")  # バイト（未満は圧縮しない）
+    COMPRESSION_ENCODINGS: str = Field(default="zstd,br,gzip", env="COMPRESSION_ENCODINGS")  # 優先順（未インストールの方式は除外）
+    COMPRESSION_CONTENT_TYPES: str = Field(
+        default="application/json,application/x-ndjson,text/plain", env="COMPRESSION_CONTENT_TYPES"
+    )
+    COMPRESSION_EXCLUDED_ROUTES: str = Field(default="", env="COMPRESSION_EXCLUDED_ROUTES")  # ルートのパステンプレート（カンマ区切り）
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6, env="COMPRESSION_GZIP_LEVEL")  # 1-9
+    COMPRESSION_BROTLI_QUALITY: int = Field(default=4, env="COMPRESSION_BROTLI_QUALITY")  # 0-11
+    COMPRESSION_ZSTD_LEVEL: int = Field(default=3, env="COMPRESSION_ZSTD_LEVEL")  # 1-22
+    COMPRESSION_STREAM_FLUSH_BYTES: int = Field(default=4096, env="COMPRESSION_STREAM_FLUSH_BYTES")  # 0でチャンクごと
+    
+    # ページネーション設定
+    CURSOR_SECRET_KEY: str = Field(default="", env="CURSOR_SECRET_KEY")  # カーソル署名用（DEBUG以外は必須）
+    
+    # 計測設定（Prometheusテキスト形式）
+    TELEMETRY_ENABLED: bool = Field(default=True, env="TELEMETRY_ENABLED")
+    TELEMETRY_METRICS_PATH: str = Field(default="/internal/metrics", env="TELEMETRY_METRICS_PATH")  # ALBから公開しないこと
+    TELEMETRY_METRICS_TOKEN: str = Field(default="", env="TELEMETRY_METRICS_TOKEN")  # Bearerトークン（空の場合はエンドポイントなし）
+    TELEMETRY_SLOW_REQUEST_SECONDS: float = Field(default=1.0, env="TELEMETRY_SLOW_REQUEST_SECONDS")  # 超過時にログ出力
+    TELEMETRY_SLOW_DYNAMODB_SECONDS: float = Field(default=0.5, env="TELEMETRY_SLOW_DYNAMODB_SECONDS")
+    
+    # トレース設定（OpenTelemetry互換のスパンをOTLP/JSONで出力）
+    TRACING_ENABLED: bool = Field(default=False, env="TRACING_ENABLED")
+    TRACING_EXPORTER: str = Field(default="file", env="TRACING_EXPORTER")  # file / otlp
+    TRACING_SERVICE_NAME: str = Field(default="portfolio-api", env="TRACING_SERVICE_NAME")
+    TRACING_FILE: str = Field(default="logs/traces.jsonl", env="TRACING_FILE")
+    TRACING_OTLP_ENDPOINT: str = Field(default="http://localhost:4318/v1/traces", env="TRACING_OTLP_ENDPOINT")
+    TRACING_SAMPLE_RATIO: float = Field(default=1.0, env="TRACING_SAMPLE_RATIO")  # traceparentがない場合のみ適用
+    TRACING_QUEUE_SIZE: int = Field(default=2048, env="TRACING_QUEUE_SIZE")  # 満杯時は破棄して件数を記録
+    TRACING_BATCH_SIZE: int = Field(default=256, env="TRACING_BATCH_SIZE")
+    
+    # 起動設定
+    STARTUP_MODE: str = Field(default="lazy", env="STARTUP_MODE")  # eager: 接続確認完了まで待つ / lazy: バックグラウンドで実行
+    
     # ログ設定
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
+    LOG_FILE: Optional[str] = Field(default="logs/portfolio-api.log", env="LOG_FILE")  # 空の場合はファイル出力なし
+    LOG_ASYNC: bool = Field(default=True, env="LOG_ASYNC")  # キュー経由で専用スレッドから書き込む
+    LOG_QUEUE_SIZE: int = Field(default=10000, env="LOG_QUEUE_SIZE")  # 満杯時は破棄して件数を記録
+    LOG_BATCH_SIZE: int = Field(default=256, env="LOG_BATCH_SIZE")
+    LOG_MAX_BYTES: int = Field(default=10485760, env="LOG_MAX_BYTES")  # 10MB
+    LOG_BACKUP_COUNT: int = Field(default=5, env="LOG_BACKUP_COUNT")
+    LOG_ROTATE_INTERVAL_SECONDS: float = Field(default=86400.0, env="LOG_ROTATE_INTERVAL_SECONDS")  # 0で無効
     
     # ヘルスチェック設定
     HEALTH_CHECK_TIMEOUT: int = Field(default=5, env="HEALTH_CHECK_TIMEOUT")
@@ -49,6 +173,18 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = True
     
+    @model_validator(mode="after")
+    def _check_cursor_secret_key(self) -> "Settings":
+        """
+        カーソル署名キーの確認
+        DEBUG時のみ未設定を許可し、プロセスごとのランダムなキーを使う（再起動・別プロセスのカーソルは無効になる）
+        """
+        if not self.CURSOR_SECRET_KEY:
+            if not self.DEBUG:
+                raise ValueError("CURSOR_SECRET_KEY must be set when DEBUG is false")
+            self.CURSOR_SECRET_KEY = secrets.token_bytes(32).hex()
+        return self
+    
     @staticmethod
     def get_current_timestamp() -> str:
         """現在のタイムスタンプを取得"""
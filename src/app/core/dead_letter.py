@@ -0,0 +1,61 @@
+"""
+Dead Letter File
+書き込めなかったレコードをエラー内容とともにローカルディスクへ退避する
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+
+class DeadLetterFile:
+    """
+    追記専用のデッドレターファイル
+    1行1レコード（{"record", "error", "failed_at"}のJSON）で追記し、追記ごとにfsyncする
+    件数は開いた時点の行数から数え始めるため、再起動後も累計が引き継がれる
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0
+
+    async def open(self) -> None:
+        """ディレクトリを準備し、既存のレコード数を読み込む"""
+        await _run_blocking(self._open)
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                self.records = sum(1 for _ in f)
+
+    async def write(self, entries: List[Tuple[Any, str]]) -> None:
+        """(レコード, エラー内容) の組を追記"""
+        if entries:
+            await _run_blocking(self._write, entries)
+
+    def _write(self, entries: List[Tuple[Any, str]]) -> None:
+        failed_at = datetime.now(timezone.utc).isoformat()
+        data = b"".join(
+            (json.dumps(
+                {"record": record, "error": error, "failed_at": failed_at}, separators=(",", ":"), default=str
+            ) + "\n").encode()
+            for record, error in entries
+        )
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.records += len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "records": self.records}
+
+
+async def _run_blocking(func, *args) -> Any:
+    """ファイルI/Oをスレッドプールで実行"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
@@ -0,0 +1,436 @@
+"""
+Async DynamoDB Table Adapters
+DynamoDBテーブル操作の非同期アダプター
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError, HTTPClientError
+
+from app.core.codec import decode_item, decode_items, encode_item
+from app.core.config import get_settings
+from app.core.logging import log_database_operation
+from app.core.telemetry import DYNAMODB_CONSUMED_CAPACITY, DYNAMODB_OPERATION_DURATION
+from app.core.tracing import SPAN_KIND_CLIENT, get_tracer
+
+logger = logging.getLogger(__name__)
+
+# Settings.DYNAMODB_BACKENDで選択可能なバックエンド
+BACKEND_SYNC = "sync"
+BACKEND_THREADPOOL = "threadpool"
+BACKEND_AIOBOTO3 = "aioboto3"
+
+# Settings.DYNAMODB_METRICS_CODECで選択可能な属性値の変換方式
+CODEC_RESOURCE = "resource"
+CODEC_NATIVE = "native"
+
+# リソースAPIの呼び出し時にfloatをDecimalに変換するパラメーター
+RESOURCE_VALUE_PARAMS = ('Item', 'Key', 'ExclusiveStartKey', 'ExpressionAttributeValues')
+
+# ReturnConsumedCapacityを指定できる操作
+CONSUMED_CAPACITY_OPERATIONS = frozenset({
+    'get_item', 'put_item', 'update_item', 'delete_item', 'query', 'scan',
+    'batch_get_item', 'batch_write_item', 'transact_get_items', 'transact_write_items'
+})
+
+
+@lru_cache()
+def get_dynamodb_executor() -> ThreadPoolExecutor:
+    """
+    boto3呼び出し用のスレッドプールを取得
+    ワーカー数を制限し、同時実行中のDynamoDB呼び出し数の上限とする
+    """
+    settings = get_settings()
+    return ThreadPoolExecutor(
+        max_workers=settings.DYNAMODB_EXECUTOR_MAX_WORKERS,
+        thread_name_prefix="dynamodb"
+    )
+
+
+@lru_cache()
+def get_botocore_config() -> Config:
+    """
+    全DynamoDBクライアントで共有するbotocore設定を取得
+    接続プールのサイズは同時実行数（スレッドプールのワーカー数等）以上にする
+    """
+    settings = get_settings()
+    return Config(
+        max_pool_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+        connect_timeout=settings.DYNAMODB_CONNECT_TIMEOUT,
+        read_timeout=settings.DYNAMODB_READ_TIMEOUT,
+        retries={
+            "mode": settings.DYNAMODB_RETRY_MODE,
+            "max_attempts": settings.DYNAMODB_MAX_ATTEMPTS
+        },
+        tcp_keepalive=settings.DYNAMODB_TCP_KEEPALIVE
+    )
+
+
+class _DiscardedConnectionCounter(logging.Filter):
+    """urllib3が接続プール満杯で接続を破棄した回数を数える"""
+
+    def __init__(self, metrics: "PoolMetrics"):
+        super().__init__()
+        self._metrics = metrics
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if str(record.msg).startswith("Connection pool is full"):
+            self._metrics.record_discarded_connection()
+        return True
+
+
+class PoolMetrics:
+    """
+    DynamoDB呼び出しの同時実行数と接続プールの飽和状況
+    同時実行数が接続プールを超えると、超過分の接続は使い捨て（毎回TLSハンドシェイク）になる
+    """
+
+    def __init__(self, max_pool_connections: int, max_workers: int):
+        self.max_pool_connections = max_pool_connections
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.saturated_calls = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        self.discarded_connections = 0
+
+    def acquire(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self.in_flight > self.max_pool_connections:
+                self.saturated_calls += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_queue_wait(self, seconds: float) -> None:
+        """スレッドプールの空き待ち時間を記録"""
+        with self._lock:
+            self.queue_wait_seconds += seconds
+            self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, seconds)
+
+    def record_discarded_connection(self) -> None:
+        with self._lock:
+            self.discarded_connections += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_pool_connections": self.max_pool_connections,
+            "executor_max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "calls": self.calls,
+            "saturated_calls": self.saturated_calls,
+            "avg_queue_wait_ms": round(self.queue_wait_seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_queue_wait_ms": round(self.max_queue_wait_seconds * 1000, 3),
+            "discarded_connections": self.discarded_connections
+        }
+
+
+@lru_cache()
+def get_pool_metrics() -> PoolMetrics:
+    """プロセス内で共有する接続プールの統計を取得"""
+    settings = get_settings()
+    metrics = PoolMetrics(settings.DYNAMODB_MAX_POOL_CONNECTIONS, settings.DYNAMODB_EXECUTOR_MAX_WORKERS)
+    logging.getLogger("urllib3.connectionpool").addFilter(_DiscardedConnectionCounter(metrics))
+    return metrics
+
+
+def to_dynamodb_value(value: Any) -> Any:
+    """floatをDecimalに変換（DynamoDBはfloatを受け付けない）"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: to_dynamodb_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_dynamodb_value(v) for v in value]
+    return value
+
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Pythonの辞書を低レベルクライアント用の型付き属性値に変換（float・Decimalのどちらも可）"""
+    return encode_item(item)
+
+
+def is_conditional_check_failed(error: Exception) -> bool:
+    """条件付き書き込みの条件不成立（ConditionalCheckFailedException）かどうか"""
+    return (
+        isinstance(error, ClientError)
+        and error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+    )
+
+
+# スループット超過等、時間をおいて再試行すれば成功し得るエラー
+THROTTLING_ERROR_CODES = frozenset((
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded'
+))
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """スロットリングによる失敗かどうか"""
+    return (
+        isinstance(error, ClientError)
+        and error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+    )
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """時間をおいて再試行すれば成功し得る失敗（スロットリング・接続エラー・タイムアウト）かどうか"""
+    return is_throttling_error(error) or isinstance(error, (BotocoreConnectionError, HTTPClientError))
+
+
+def transaction_condition_failures(error: Exception) -> Optional[List[int]]:
+    """
+    TransactWriteItemsのキャンセル理由から条件不成立となった項目の位置を取得
+    トランザクションのキャンセル以外の例外はNone
+    """
+    if not isinstance(error, ClientError):
+        return None
+    if error.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+        return None
+    reasons = error.response.get('CancellationReasons', [])
+    return [index for index, reason in enumerate(reasons) if reason.get('Code') == 'ConditionalCheckFailed']
+
+
+class AsyncTable(ABC):
+    """
+    DynamoDBテーブル操作の非同期インターフェース（実行方式ごとに_call・_call_clientを実装する）
+    clientにはclient_callで使う低レベルクライアントを渡す。リソースのmeta.clientは属性値を
+    自動変換するため、型付き属性値を渡すとシリアライズが二重になる（省略時はテスト用にmeta.clientを使う）
+    """
+
+    def __init__(self, table, client=None):
+        self._table = table
+        self._client = client
+
+    @property
+    def name(self) -> str:
+        return self._table.name
+
+    @property
+    def _low_level_client(self):
+        return self._client if self._client is not None else self._table.meta.client
+
+    @abstractmethod
+    async def _call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        """リソースAPIのテーブル操作を実行"""
+
+    @abstractmethod
+    async def _call_client(self, operation: str, **kwargs) -> Dict[str, Any]:
+        """低レベルクライアントAPIの操作を実行"""
+
+    async def _execute(self, operation: str, kwargs: Dict[str, Any], client: bool = False) -> Dict[str, Any]:
+        """
+        呼び出しのレイテンシ・消費キャパシティ・同時実行数を記録しながら実行
+        client=Trueの場合は低レベルクライアントAPIを呼び出す
+        """
+        settings = get_settings()
+        if settings.DYNAMODB_RETURN_CONSUMED_CAPACITY and operation in CONSUMED_CAPACITY_OPERATIONS:
+            kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
+        if not client:
+            # リソースAPIはfloatを受け付けないため、呼び出し元の値をここでDecimalに変換
+            for key in RESOURCE_VALUE_PARAMS:
+                if key in kwargs:
+                    kwargs[key] = to_dynamodb_value(kwargs[key])
+
+        metrics = get_pool_metrics()
+        table_name = str(self.name)
+        span_attributes = {"db.system": "dynamodb", "db.operation": operation, "aws.dynamodb.table_names": [table_name]}
+        with get_tracer().start_span(f"DynamoDB.{operation}", kind=SPAN_KIND_CLIENT, attributes=span_attributes) as span:
+            metrics.acquire()
+            outcome = "error"
+            started = time.perf_counter()
+            try:
+                if client:
+                    response = await self._call_client(operation, **kwargs)
+                else:
+                    response = await self._call(operation, **kwargs)
+                outcome = "ok"
+                consumed = _record_consumed_capacity(operation, table_name, response)
+                if consumed:
+                    span.set_attribute("aws.dynamodb.consumed_capacity", consumed)
+                return response
+            except ClientError as e:
+                outcome = e.response.get('Error', {}).get('Code', 'ClientError')
+                raise
+            finally:
+                metrics.release()
+                duration = time.perf_counter() - started
+                span.set_attribute("aws.dynamodb.outcome", outcome)
+                DYNAMODB_OPERATION_DURATION.observe(duration, operation=operation, table=table_name, outcome=outcome)
+                if duration >= settings.TELEMETRY_SLOW_DYNAMODB_SECONDS:
+                    log_database_operation(logger, operation, table_name, duration, outcome == "ok", outcome=outcome)
+
+    async def get_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._execute('get_item', kwargs)
+
+    async def put_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._execute('put_item', kwargs)
+
+    async def update_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._execute('update_item', kwargs)
+
+    async def delete_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._execute('delete_item', kwargs)
+
+    async def query(self, **kwargs) -> Dict[str, Any]:
+        return await self._execute('query', kwargs)
+
+    async def scan(self, **kwargs) -> Dict[str, Any]:
+        return await self._execute('scan', kwargs)
+
+    async def client_call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        """低レベルクライアントAPI（batch_write_item等）の呼び出し"""
+        return await self._execute(operation, kwargs, client=True)
+
+
+def _record_consumed_capacity(operation: str, table_name: str, response: Any) -> float:
+    """
+    レスポンスのConsumedCapacity（単一操作は辞書、バッチ・トランザクションはリスト）を集計
+    合計の消費キャパシティユニットを返す
+    """
+    if not isinstance(response, dict):
+        return 0.0
+    consumed = response.get('ConsumedCapacity')
+    if not consumed:
+        return 0.0
+    total = 0.0
+    for entry in consumed if isinstance(consumed, list) else [consumed]:
+        units = entry.get('CapacityUnits')
+        if units:
+            total += float(units)
+            DYNAMODB_CONSUMED_CAPACITY.inc(
+                float(units), operation=operation, table=entry.get('TableName', table_name)
+            )
+    return total
+
+
+class SyncTable(AsyncTable):
+    """同期boto3テーブルをそのまま呼び出すアダプター（テスト・デバッグ用）"""
+
+    async def _call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return getattr(self._table, operation)(**kwargs)
+
+    async def _call_client(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return getattr(self._low_level_client, operation)(**kwargs)
+
+
+class ThreadPoolTable(AsyncTable):
+    """同期boto3テーブルの呼び出しを制限付きスレッドプールへ逃がすアダプター"""
+
+    def __init__(self, table, executor: ThreadPoolExecutor, client=None):
+        super().__init__(table, client)
+        self._executor = executor
+
+    async def _run(self, func, **kwargs) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(_timed_call, func, time.monotonic(), **kwargs)
+        )
+
+    async def _call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return await self._run(getattr(self._table, operation), **kwargs)
+
+    async def _call_client(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return await self._run(getattr(self._low_level_client, operation), **kwargs)
+
+
+def _timed_call(func, submitted_at: float, **kwargs) -> Dict[str, Any]:
+    """スレッドプールの空き待ち時間を記録してから呼び出す"""
+    get_pool_metrics().record_queue_wait(time.monotonic() - submitted_at)
+    return func(**kwargs)
+
+
+class AioTable(AsyncTable):
+    """aioboto3のネイティブ非同期テーブルを呼び出すアダプター"""
+
+    async def _call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return await getattr(self._table, operation)(**kwargs)
+
+    async def _call_client(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return await getattr(self._low_level_client, operation)(**kwargs)
+
+
+class CodecTable(AsyncTable):
+    """
+    テーブル操作を低レベルクライアントAPIで実行し、属性値をapp.core.codecで直接変換するアダプター
+    リソースAPIのDecimal変換を経由せず、数値はint/floatで読み書きする（条件式は文字列のみ対応）
+    呼び出しは内側のアダプターのclient_callで行うため、実行方式・計測はそのまま引き継ぐ
+    """
+
+    # 項目として型付き属性値に変換するパラメーター
+    _ITEM_PARAMS = ('Item', 'Key', 'ExclusiveStartKey', 'ExpressionAttributeValues')
+    # 項目として変換するレスポンスのキー
+    _ITEM_RESPONSE_KEYS = ('Item', 'Attributes', 'LastEvaluatedKey')
+
+    async def _request(self, operation: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        request = {'TableName': self.name}
+        for key, value in kwargs.items():
+            request[key] = encode_item(value) if key in self._ITEM_PARAMS else value
+
+        response = await self._call_client(operation, **request)
+        for key in self._ITEM_RESPONSE_KEYS:
+            if key in response:
+                response[key] = decode_item(response[key])
+        if 'Items' in response:
+            response['Items'] = decode_items(response['Items'])
+        return response
+
+    async def get_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._request('get_item', kwargs)
+
+    async def put_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._request('put_item', kwargs)
+
+    async def update_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._request('update_item', kwargs)
+
+    async def delete_item(self, **kwargs) -> Dict[str, Any]:
+        return await self._request('delete_item', kwargs)
+
+    async def query(self, **kwargs) -> Dict[str, Any]:
+        return await self._request('query', kwargs)
+
+    async def scan(self, **kwargs) -> Dict[str, Any]:
+        return await self._request('scan', kwargs)
+
+    async def client_call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return await self._call_client(operation, **kwargs)
+
+    # 計測は内側のアダプターで行うため、公開メソッドは_executeを経由せずに以下を直接呼び出す
+    async def _call(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return await self._request(operation, kwargs)
+
+    async def _call_client(self, operation: str, **kwargs) -> Dict[str, Any]:
+        return await self._table.client_call(operation, **kwargs)
+
+
+def as_async_table(table, client=None) -> AsyncTable:
+    """
+    テーブルを非同期アダプターに変換
+    既にアダプターの場合はそのまま返し、同期boto3テーブルは設定に応じて包む
+    """
+    if isinstance(table, AsyncTable):
+        return table
+
+    if get_settings().DYNAMODB_BACKEND == BACKEND_SYNC:
+        return SyncTable(table, client)
+    return ThreadPoolTable(table, get_dynamodb_executor(), client)
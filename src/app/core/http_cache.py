@@ -0,0 +1,87 @@
+"""
+HTTP Caching
+ETag・Last-Modifiedの生成と条件付きGET（If-None-Match / If-Modified-Since）の判定
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+
+def _weak_etag(data: bytes) -> str:
+    # 圧縮等で表現のバイト列が変わっても同じ値を返すため弱いETagとする
+    return f'W/"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+def version_etag(resource_id: str, updated_at: datetime) -> str:
+    """IDとupdated_atから生成するETag（本体をシリアライズせずに算出）"""
+    return _weak_etag(f"{resource_id}:{updated_at.isoformat()}".encode())
+
+
+def content_etag(models: Iterable[BaseModel]) -> str:
+    """モデルのJSON表現のハッシュから生成するETag（更新日時を持たない集計結果用）"""
+    return _weak_etag(b'\n'.join(model.model_dump_json().encode() for model in models))
+
+
+def http_date(value: datetime) -> str:
+    """HTTP日付形式（秒単位・GMT）に変換（タイムゾーンなしの場合はUTCとみなす）"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Matchの判定（弱い比較）"""
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == opaque for candidate in if_none_match.split(','))
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    """If-Modified-Sinceの判定（解析できない日付は無視する）"""
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP日付は秒単位のため、Last-Modifiedも秒未満を切り捨てて比較
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: Optional[str] = None
+) -> Optional[Response]:
+    """
+    キャッシュ検証用ヘッダーをレスポンスに設定し、クライアントのキャッシュが有効な場合は304レスポンスを返す
+    If-None-Matchがある場合はIf-Modified-Sinceを評価しない（RFC 9110 13.2.2）
+    """
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get('if-modified-since')
+        not_modified = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified))
+
+    if not_modified:
+        # 304にも同じ検証用ヘッダー・Cache-Controlを付与する（RFC 9110 15.4.5）
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
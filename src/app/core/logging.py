@@ -3,16 +3,24 @@ Portfolio API Logging Configuration
 ログ設定
 """
 
-import json
+import atexit
 import logging
+import queue
 import sys
+import threading
+import time
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from logging.handlers import QueueHandler, RotatingFileHandler
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 
-# ログディレクトリの作成
-log_dir = Path("logs")
-log_dir.mkdir(exist_ok=True)
+import orjson
+
+from app.core.tracing import get_current_span, get_request_id
+
+_configured = False
+_listener: Optional["BatchingQueueListener"] = None
 
 
 class StructuredFormatter(logging.Formatter):
@@ -21,7 +29,8 @@ class StructuredFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         """ログレコードを構造化JSON形式に変換"""
         log_entry = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            # 書き込みスレッドで整形するため、現在時刻ではなくログ発生時刻を使う
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -47,12 +56,33 @@ class StructuredFormatter(logging.Formatter):
         # リクエスト情報がある場合
         if hasattr(record, 'request_id'):
             log_entry["request_id"] = record.request_id
+        if hasattr(record, 'trace_id'):
+            log_entry["trace_id"] = record.trace_id
+            log_entry["span_id"] = record.span_id
         if hasattr(record, 'user_id'):
             log_entry["user_id"] = record.user_id
         if hasattr(record, 'ip_address'):
             log_entry["ip_address"] = record.ip_address
         
-        return json.dumps(log_entry, ensure_ascii=False, default=str)
+        return orjson.dumps(log_entry, default=str).decode()
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    処理中のリクエストID・トレースIDをログレコードに付与
+    contextvarsから取得するため、ログ出力元のスレッド（キュー登録前）で実行する
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            request_id = get_request_id()
+            if request_id is not None:
+                record.request_id = request_id
+        span = get_current_span()
+        if span is not None and not hasattr(record, 'trace_id'):
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
 
 
 class ColoredFormatter(logging.Formatter):
@@ -75,14 +105,225 @@ class ColoredFormatter(logging.Formatter):
         return f"{color}{formatted}{reset}"
 
 
+class LogPipelineStats:
+    """非同期ログの統計（キュー投入・破棄・書き込み件数）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped: Counter = Counter()
+
+    def record_enqueued(self) -> None:
+        with self._lock:
+            self.enqueued += 1
+
+    def record_dropped(self, levelname: str) -> None:
+        with self._lock:
+            self.dropped[levelname] += 1
+
+    def record_batch(self, size: int) -> None:
+        with self._lock:
+            self.written += size
+            self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": sum(self.dropped.values()),
+                "dropped_by_level": dict(self.dropped)
+            }
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    ログレコードを上限付きキューに登録するハンドラー（呼び出し元はI/Oで待たない）
+    キューが高水位を超えたらWARNING未満を、満杯になったら全レベルを破棄して件数を記録する
+    """
+
+    def __init__(self, log_queue: queue.Queue, stats: LogPipelineStats, high_water_ratio: float = 0.8):
+        super().__init__(log_queue)
+        self.stats = stats
+        self.high_water = int(log_queue.maxsize * high_water_ratio) if log_queue.maxsize > 0 else 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 引数が後から変更されないよう、メッセージの展開のみ呼び出し元で行う
+        # JSON化は書き込みスレッドで行い、スレッド間のためexc_infoはそのまま渡す
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.high_water and record.levelno < logging.WARNING and self.queue.qsize() >= self.high_water:
+            self.stats.record_dropped(record.levelname)
+            return
+        try:
+            self.queue.put_nowait(record)
+            self.stats.record_enqueued()
+        except queue.Full:
+            self.stats.record_dropped(record.levelname)
+
+
+class BatchingStreamHandler(logging.StreamHandler):
+    """複数レコードを1回のwrite/flushで出力するStreamHandler"""
+
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        data = "".join(self.format(record) + self.terminator for record in records)
+        self.acquire()
+        try:
+            self.stream.write(data)
+            self.flush()
+        finally:
+            self.release()
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """
+    複数レコードを1回で書き込み、サイズまたは経過時間でファイルを切り替えるハンドラー
+    max_bytes・rotate_interval_secondsが0の場合はその条件では切り替えない
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        rotate_interval_seconds: float = 0,
+        encoding: str = "utf-8"
+    ):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True)
+        self.rotate_interval_seconds = rotate_interval_seconds
+        self._rollover_at = time.time() + rotate_interval_seconds if rotate_interval_seconds > 0 else None
+
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        data = "".join(self.format(record) + self.terminator for record in records)
+        self.acquire()
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            if self._should_rollover(len(data.encode(self.encoding or "utf-8"))):
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(data)
+            self.stream.flush()
+        finally:
+            self.release()
+
+    def _should_rollover(self, size: int) -> bool:
+        if self._rollover_at is not None and time.time() >= self._rollover_at:
+            return True
+        return self.maxBytes > 0 and self.stream.tell() > 0 and self.stream.tell() + size >= self.maxBytes
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        if self.rotate_interval_seconds > 0:
+            self._rollover_at = time.time() + self.rotate_interval_seconds
+
+
+class BatchingQueueListener:
+    """キューからレコードをまとめて取り出し、専用スレッドで各ハンドラーに書き込む"""
+
+    _SENTINEL = None
+
+    def __init__(self, log_queue: queue.Queue, handlers: List[logging.Handler], stats: LogPipelineStats, batch_size: int = 256):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.stats = stats
+        self.batch_size = batch_size
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """キューに残ったレコードを書き切ってから停止"""
+        if self._thread is None:
+            return
+        self.queue.put(self._SENTINEL)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            record = self.queue.get()
+            if record is self._SENTINEL:
+                break
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._SENTINEL:
+                    stopping = True
+                    break
+                batch.append(record)
+            self._write(batch)
+
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            records = [record for record in batch if record.levelno >= handler.level]
+            if not records:
+                continue
+            try:
+                handler.emit_batch(records)
+            except Exception:
+                handler.handleError(records[0])
+        self.stats.record_batch(len(batch))
+
+
+_stats = LogPipelineStats()
+
+
+def get_log_stats() -> Dict[str, Any]:
+    """非同期ログの統計を取得"""
+    return {"async": _listener is not None, **_stats.stats()}
+
+
+def shutdown_logging() -> None:
+    """書き込みスレッドを停止（キューに残ったログは書き切る）"""
+    global _listener
+    
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def setup_logging(
     log_level: str = "INFO",
     log_file: Optional[str] = None,
     enable_console: bool = True,
     enable_file: bool = True,
-    enable_structured: bool = True
+    enable_structured: bool = True,
+    force: bool = False,
+    async_logging: bool = True,
+    queue_size: int = 10000,
+    batch_size: int = 256,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    rotate_interval_seconds: float = 0
 ) -> None:
-    """ログ設定の初期化"""
+    """
+    ログ設定の初期化
+    async_logging=Trueの場合、ルートロガーにはキューへの登録のみ行うハンドラーを設定し、
+    整形・書き込みは専用スレッドでまとめて行う
+    2回目以降の呼び出しはforce=Trueの場合のみ再設定する
+    """
+    global _configured, _listener
+    
+    if _configured and not force:
+        return
+    _configured = True
+    shutdown_logging()
     
     # ルートロガーの設定
     root_logger = logging.getLogger()
@@ -92,9 +333,11 @@ def setup_logging(
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
     
+    handlers: List[logging.Handler] = []
+    
     # コンソールハンドラー
     if enable_console:
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = BatchingStreamHandler(sys.stdout)
         if enable_structured:
             console_formatter = StructuredFormatter()
         else:
@@ -102,11 +345,17 @@ def setup_logging(
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             )
         console_handler.setFormatter(console_formatter)
-        root_logger.addHandler(console_handler)
+        handlers.append(console_handler)
     
-    # ファイルハンドラー
+    # ファイルハンドラー（サイズ・時間でローテーション）
     if enable_file and log_file:
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        file_handler = BatchingRotatingFileHandler(
+            log_file,
+            max_bytes=max_bytes,
+            backup_count=backup_count,
+            rotate_interval_seconds=rotate_interval_seconds
+        )
         if enable_structured:
             file_formatter = StructuredFormatter()
         else:
@@ -114,7 +363,21 @@ def setup_logging(
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             )
         file_handler.setFormatter(file_formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    context_filter = RequestContextFilter()
+    if async_logging:
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        queue_handler = DroppingQueueHandler(log_queue, _stats)
+        queue_handler.addFilter(context_filter)
+        root_logger.addHandler(queue_handler)
+        _listener = BatchingQueueListener(log_queue, handlers, _stats, batch_size=batch_size)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    else:
+        for handler in handlers:
+            handler.addFilter(context_filter)
+            root_logger.addHandler(handler)
     
     # 特定のライブラリのログレベルを調整
     logging.getLogger("uvicorn").setLevel(logging.INFO)
@@ -215,13 +478,3 @@ def log_database_operation(
         f"Database {operation} on {table_name}: {'success' if success else 'failed'} ({duration:.3f}s)",
         extra={"extra_fields": extra_fields}
     )
-
-
-# デフォルト設定
-setup_logging(
-    log_level="INFO",
-    log_file="logs/portfolio-api.log",
-    enable_console=True,
-    enable_file=True,
-    enable_structured=True
-)
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Cursor Pagination Utilities
+カーソルベースのページネーション
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from app.core.exceptions import ValidationException
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    padding = "=" * (-len(data) % 4)
+    return base64.urlsafe_b64decode(data + padding)
+
+
+def _sign(payload: bytes, secret: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), payload, hashlib.sha256).digest())
+
+
+def encode_cursor(last_evaluated_key: Optional[Dict[str, Any]], secret: str, scope: str = "") -> Optional[str]:
+    """
+    LastEvaluatedKeyを署名付きの不透明なカーソル文字列に変換
+    scopeには一覧の種類やフィルター条件を渡し、別の一覧へのカーソル流用を防ぐ
+    """
+    if not last_evaluated_key:
+        return None
+
+    # Decimal等を含むキーをDynamoDBの型付き表現でJSON化
+    key = {name: _serializer.serialize(value) for name, value in last_evaluated_key.items()}
+    payload = json.dumps({"k": key, "s": scope}, separators=(",", ":"), sort_keys=True).encode()
+    return f"{_b64encode(payload)}.{_sign(payload, secret)}"
+
+
+def decode_cursor(cursor: Optional[str], secret: str, scope: str = "") -> Optional[Dict[str, Any]]:
+    """カーソル文字列を検証してExclusiveStartKeyに復元"""
+    if not cursor:
+        return None
+
+    try:
+        encoded_payload, signature = cursor.split(".", 1)
+        payload = _b64decode(encoded_payload)
+    except (ValueError, TypeError):
+        raise ValidationException("Invalid cursor format", field="cursor")
+
+    if not hmac.compare_digest(signature, _sign(payload, secret)):
+        raise ValidationException("Invalid cursor signature", field="cursor")
+
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        raise ValidationException("Invalid cursor payload", field="cursor")
+
+    if data.get("s") != scope:
+        raise ValidationException("Cursor does not match this query", field="cursor")
+
+    return {name: _deserializer.deserialize(value) for name, value in data.get("k", {}).items()}
+
+
+async def collect_items(operation, request_kwargs: Dict[str, Any], count: int) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    scan/queryをLastEvaluatedKeyで辿り、最大count件まで取得
+    1回あたりの読み取りはLimitで制限し、1MBページでの打ち切りも次ページとして継続する
+    """
+    items: List[Dict[str, Any]] = []
+    kwargs = dict(request_kwargs)
+    last_key = None
+
+    while len(items) < count:
+        kwargs['Limit'] = count - len(items)
+        response = await operation(**kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        kwargs['ExclusiveStartKey'] = last_key
+
+    return items, last_key
+
+
+async def iterate_items(operation, request_kwargs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """scan/queryの全ページを順に辿り、項目を1件ずつ返す"""
+    kwargs = dict(request_kwargs)
+
+    while True:
+        response = await operation(**kwargs)
+        for item in response.get('Items', []):
+            yield item
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        kwargs['ExclusiveStartKey'] = last_key
@@ -0,0 +1,48 @@
+"""
+Response Classes
+検証済みモデルを直接エンコードするレスポンス
+"""
+
+from decimal import Decimal
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# 呼び出し元のResponseから引き継がないヘッダー（レスポンス本体に合わせて再計算される）
+_BODY_HEADERS = frozenset(("content-length", "content-type"))
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    response_modelによる再検証・jsonable_encoderを経由しないJSONレスポンス
+    BaseModelはpydantic-coreのシリアライザー（デフォルトと同じ出力）、それ以外はorjsonでエンコードする
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode()
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def fast_json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    検証済みのモデルからレスポンスを作成
+    エンドポイントで受け取ったResponseに設定したヘッダーも引き継ぐ
+    """
+    headers: Optional[Mapping[str, str]] = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key not in _BODY_HEADERS}
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,70 @@
+"""
+Single-Flight Request Coalescing
+同一の読み取りリクエストの同時実行を1回にまとめる
+"""
+
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(operation: str, **params: Any) -> str:
+    """操作名と正規化したパラメーター（キー順・文字列化）から合流キーを作成"""
+    return f"{operation}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+class SingleFlight:
+    """
+    同一キーで実行中の処理があれば新たに実行せず、その結果を待つ
+    処理は独立したタスクで実行するため、最初の呼び出し元がキャンセルされても
+    待機中の他の呼び出し元には結果が返る
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """keyが同じ同時呼び出しを1回の実行にまとめ、同じ結果（または例外）を返す"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"Coalesced in-flight read: {key}")
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """実行・合流件数"""
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced
+        }
+
+
+@lru_cache()
+def _get_shared_single_flight() -> SingleFlight:
+    return SingleFlight()
+
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """プロセス内で共有するSingleFlightを取得（無効時はNone）"""
+    if not get_settings().SINGLE_FLIGHT_ENABLED:
+        return None
+    return _get_shared_single_flight()
@@ -0,0 +1,73 @@
+"""
+Application Startup
+起動時の初期化（DynamoDBクライアント作成・接続確認等）の実行と状態管理
+"""
+
+import inspect
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Settings.STARTUP_MODE
+STARTUP_MODE_EAGER = "eager"
+STARTUP_MODE_LAZY = "lazy"
+
+# (ステップ名, 処理) 処理は同期関数・awaitableを返す関数のどちらでもよい
+WarmUpStep = Tuple[str, Callable[[], Any]]
+
+
+class StartupState:
+    """
+    ウォームアップの進捗
+    eagerモードでは起動処理内で完了を待ち、lazyモードではバックグラウンドで実行する
+    """
+
+    def __init__(self):
+        self.mode: Optional[str] = None
+        self.status = "pending"
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.duration_ms: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    async def warm_up(self, steps: Sequence[WarmUpStep]) -> None:
+        """各ステップを順に実行（失敗したステップがあればdegraded）"""
+        self.status = "warming"
+        started = time.perf_counter()
+        failed = False
+
+        for name, func in steps:
+            step_started = time.perf_counter()
+            try:
+                result = func()
+                if inspect.isawaitable(result):
+                    await result
+                self.steps[name] = {"status": "ready"}
+            except Exception as e:
+                failed = True
+                logger.error(f"Warm-up step {name} failed: {e}")
+                self.steps[name] = {"status": "failed", "error": str(e)}
+            self.steps[name]["duration_ms"] = round((time.perf_counter() - step_started) * 1000, 2)
+
+        self.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.status = "degraded" if failed else "ready"
+        logger.info(f"Warm-up finished ({self.status}) in {self.duration_ms}ms")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "steps": self.steps
+        }
+
+
+@lru_cache()
+def get_startup_state() -> StartupState:
+    """プロセス内で共有する起動状態を取得"""
+    return StartupState()
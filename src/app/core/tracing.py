@@ -0,0 +1,452 @@
+"""
+Tracing
+リクエストID・トレースコンテキストの伝播と、OpenTelemetry互換のスパン記録・出力
+"""
+
+import functools
+import inspect
+import logging
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+# Settings.TRACING_EXPORTER
+TRACING_EXPORTER_FILE = "file"
+TRACING_EXPORTER_OTLP = "otlp"
+
+SPAN_KIND_INTERNAL = "internal"
+SPAN_KIND_SERVER = "server"
+SPAN_KIND_CLIENT = "client"
+
+# OTLPのSpanKind・StatusCodeの値
+_OTLP_SPAN_KINDS = {SPAN_KIND_INTERNAL: 1, SPAN_KIND_SERVER: 2, SPAN_KIND_CLIENT: 3}
+_OTLP_STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+# W3C Trace Context（version-trace_id-parent_id-flags）
+_TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    """処理中のリクエストのIDを取得"""
+    return _request_id.get()
+
+
+def set_request_id(request_id: Optional[str]) -> Token:
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token: Token) -> None:
+    _request_id.reset(token)
+
+
+def get_current_span() -> Optional["Span"]:
+    """処理中のスパンを取得（トレース無効時はNone）"""
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """traceparentヘッダーを (trace_id, 親span_id, サンプリング有無) に変換"""
+    if not header:
+        return None
+    match = _TRACEPARENT_PATTERN.match(header.strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 0x01)
+
+
+class Span:
+    """処理区間（開始・終了時刻、属性、成否）"""
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_span_id", "sampled",
+        "attributes", "status", "status_message", "start_time_ns", "end_time_ns"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        kind: str = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        sampled: bool = True
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.status = "unset"
+        self.status_message: Optional[str] = None
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+
+    @property
+    def recording(self) -> bool:
+        return True
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1_000_000
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_status(self, status: str, message: Optional[str] = None) -> None:
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, error: BaseException) -> None:
+        self.attributes["exception.type"] = type(error).__name__
+        self.attributes["exception.message"] = str(error)
+        self.set_status("error", str(error))
+
+    def end(self) -> None:
+        if self.end_time_ns is None:
+            self.end_time_ns = time.time_ns()
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON形式のスパン"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _OTLP_SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or self.start_time_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": _OTLP_STATUS_CODES[self.status]}
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NonRecordingSpan(Span):
+    """トレース無効時に返すスパン（属性等は記録しない）"""
+
+    def __init__(self):
+        super().__init__("", "0" * 32, sampled=False)
+
+    @property
+    def recording(self) -> bool:
+        return False
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_status(self, status: str, message: Optional[str] = None) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+
+_NON_RECORDING_SPAN = _NonRecordingSpan()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def encode_otlp(spans: List[Span], service_name: str) -> bytes:
+    """スパンをOTLP/JSONのExportTraceServiceRequestに変換"""
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in spans]}]
+        }]
+    }
+    return orjson.dumps(payload)
+
+
+class FileSpanExporter:
+    """
+    スパンをOTLP/JSON Lines形式でファイルに追記
+    OpenTelemetry Collectorのotlpjsonfileレシーバーでそのまま読み込める
+    """
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "ab") as f:
+            f.write(encode_otlp(spans, self.service_name) + b"\n")
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OtlpHttpSpanExporter:
+    """OTLP/HTTP（JSONエンコーディング）でCollectorに送信"""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]) -> None:
+        request = urllib.request.Request(
+            self.endpoint,
+            data=encode_otlp(spans, self.service_name),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class BatchSpanProcessor:
+    """
+    終了したスパンを上限付きキューに登録し、専用スレッドでまとめて出力
+    キューが満杯の場合は破棄して件数を記録する（リクエスト処理は出力を待たない）
+    """
+
+    _SENTINEL = None
+
+    def __init__(self, exporter, queue_size: int = 2048, batch_size: int = 256, flush_interval: float = 1.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self) -> None:
+        """キューに残ったスパンを出力してから停止"""
+        if self._thread is None:
+            return
+        self._queue.put(self._SENTINEL)
+        self._thread.join()
+        self._thread = None
+        self.exporter.shutdown()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.001))
+                except queue.Empty:
+                    break
+                if span is self._SENTINEL:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+
+class Tracer:
+    """スパンの生成・親子関係の管理（processorが未設定の場合は記録しない）"""
+
+    def __init__(self, service_name: str = "portfolio-api", processor: Optional[BatchSpanProcessor] = None, sample_ratio: float = 1.0):
+        self.service_name = service_name
+        self.processor = processor
+        self.sample_ratio = sample_ratio
+
+    @property
+    def enabled(self) -> bool:
+        return self.processor is not None
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        kind: str = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        traceparent: Optional[str] = None
+    ) -> Iterator[Span]:
+        """
+        処理中のスパンの子としてスパンを開始し、ブロックを抜けたら終了する
+        親がない場合はtraceparent（受信したヘッダー）を親とし、それもなければ新しいトレースを開始する
+        """
+        if not self.enabled:
+            yield _NON_RECORDING_SPAN
+            return
+
+        parent = _current_span.get()
+        if parent is not None:
+            trace_id, parent_span_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            remote = parse_traceparent(traceparent)
+            if remote is not None:
+                trace_id, parent_span_id, sampled = remote
+            else:
+                trace_id, parent_span_id = secrets.token_hex(16), None
+                sampled = random.random() < self.sample_ratio
+
+        span = Span(name, trace_id, parent_span_id, kind=kind, attributes=attributes, sampled=sampled)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            if span.sampled:
+                self.processor.on_end(span)
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        return {"enabled": True, "sample_ratio": self.sample_ratio, **self.processor.stats()}
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def setup_tracing(
+    enabled: bool,
+    exporter: str = TRACING_EXPORTER_FILE,
+    service_name: str = "portfolio-api",
+    file_path: str = "logs/traces.jsonl",
+    otlp_endpoint: str = "http://localhost:4318/v1/traces",
+    sample_ratio: float = 1.0,
+    queue_size: int = 2048,
+    batch_size: int = 256
+) -> Tracer:
+    """トレースの初期化（無効の場合は記録しないTracerを設定）"""
+    global _tracer
+
+    shutdown_tracing()
+    if not enabled:
+        _tracer = Tracer(service_name)
+        return _tracer
+
+    if exporter == TRACING_EXPORTER_OTLP:
+        span_exporter = OtlpHttpSpanExporter(otlp_endpoint, service_name)
+    elif exporter == TRACING_EXPORTER_FILE:
+        span_exporter = FileSpanExporter(file_path, service_name)
+    else:
+        raise ValueError(f"Unknown tracing exporter: {exporter}")
+
+    processor = BatchSpanProcessor(span_exporter, queue_size=queue_size, batch_size=batch_size)
+    processor.start()
+    _tracer = Tracer(service_name, processor, sample_ratio)
+    logger.info(f"Tracing enabled (exporter={exporter}, sample_ratio={sample_ratio})")
+    return _tracer
+
+
+def shutdown_tracing() -> None:
+    """未出力のスパンを出力してから停止"""
+    if _tracer.processor is not None:
+        _tracer.processor.shutdown()
+
+
+def traced(name: Optional[str] = None, kind: str = SPAN_KIND_INTERNAL) -> Callable:
+    """非同期関数の実行をスパンとして記録するデコレーター"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with get_tracer().start_span(span_name, kind=kind):
+                return await func(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls: type) -> type:
+    """クラスの公開コルーチンメソッドをすべてスパンとして記録するクラスデコレーター"""
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_") or not inspect.iscoroutinefunction(value) or getattr(value, "__traced__", False):
+            continue
+        setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+class TracedRoute(APIRoute):
+    """
+    エンドポイント関数の実行をスパンとして記録するルート
+    サーバースパンとの差分が依存関係の解決・リクエストの検証にかかった時間となる
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if inspect.iscoroutinefunction(endpoint) and not getattr(endpoint, "__traced__", False):
+            endpoint = traced(f"handler {endpoint.__name__}")(endpoint)
+        super().__init__(path, endpoint, **kwargs)
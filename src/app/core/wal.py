@@ -0,0 +1,410 @@
+"""
+Write-Ahead Log
+受け付けた書き込みをローカルディスクに追記し、バックグラウンドでDynamoDBへ再生する
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.dead_letter import DeadLetterFile
+from app.core.dynamodb import is_retryable_error
+from app.core.exceptions import RateLimitException, ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+CHECKPOINT_FILE = "checkpoint.json"
+# 再生できなかったレコードの退避先（セグメントとは別に保持し、再生・削除の対象にしない）
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+# (セグメント番号, セグメント内のバイト位置)
+Position = Tuple[int, int]
+
+
+class WriteAheadLog:
+    """
+    追記専用のWAL
+    1行1レコード（JSON）でセグメントファイルに追記し、segment_max_bytesを超えたら次のセグメントへ切り替える
+    同時に到着した追記はまとめて1回のfsyncで永続化する（グループコミット）
+    再生済みの位置はチェックポイントファイルに保存し、再生し終えたセグメントは削除する
+    再生できなかったレコードはデッドレターファイルに退避する
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        max_bytes: int = 1024 * 1024 * 1024,
+        fsync_interval: float = 0.0
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._segment_seq = 0
+        self._segment_size = 0
+        self._checkpoint: Position = (0, 0)
+        self._lag_bytes = 0
+        self._pending: List[Tuple[bytes, asyncio.Future]] = []
+        self._sync_task: Optional[asyncio.Task] = None
+        self._appended_event: Optional[asyncio.Event] = None
+        self._closed = True
+        self.appended = 0
+        self.fsyncs = 0
+        self._dead_letter = DeadLetterFile(os.path.join(directory, DEAD_LETTER_FILE))
+
+    @property
+    def dead_lettered(self) -> int:
+        return self._dead_letter.records
+
+    async def open(self) -> None:
+        """ディレクトリを準備し、チェックポイントを読み込んで新しいセグメントを開く"""
+        await _run_blocking(self._open)
+        await self._dead_letter.open()
+        self._appended_event = asyncio.Event()
+        self._closed = False
+        logger.info(
+            f"Opened WAL at {self.directory} (segment {self._segment_seq}, {self._lag_bytes} bytes to replay)"
+        )
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        checkpoint = self._load_checkpoint()
+        if checkpoint is None:
+            checkpoint = (segments[0], 0) if segments else (0, 0)
+        self._checkpoint = checkpoint
+        # 前回のプロセスが書き込み途中で終了した可能性があるため、既存のセグメントには追記しない
+        self._segment_seq = max(segments[-1] if segments else 0, checkpoint[0]) + 1
+        self._open_segment()
+        self._lag_bytes = self._compute_lag()
+
+    async def close(self) -> None:
+        """未fsyncの追記を書き切ってからファイルを閉じる"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._sync_task is not None:
+            await self._sync_task
+        if self._file is not None:
+            await _run_blocking(self._file.close)
+            self._file = None
+
+    async def append(self, record: Dict[str, Any]) -> None:
+        """
+        レコードを追記し、fsync完了まで待機
+        未再生のデータがmax_bytesを超えている場合はRateLimitException
+        """
+        if self._closed:
+            raise ServiceUnavailableException("write-ahead log", "Not accepting writes")
+        if self._lag_bytes >= self.max_bytes:
+            raise RateLimitException(retry_after=1)
+
+        line = (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((line, future))
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_pending())
+        await future
+
+    async def _sync_pending(self) -> None:
+        """待機中の追記をまとめて書き込み・fsyncする"""
+        while self._pending:
+            if self.fsync_interval > 0:
+                await asyncio.sleep(self.fsync_interval)
+            batch, self._pending = self._pending, []
+            data = b"".join(line for line, _ in batch)
+            try:
+                await _run_blocking(self._write_and_sync, data)
+            except Exception as e:
+                logger.error(f"Failed to append {len(batch)} records to WAL: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(ServiceUnavailableException("write-ahead log", str(e)))
+                continue
+
+            self.appended += len(batch)
+            self.fsyncs += 1
+            self._lag_bytes += len(data)
+            self._appended_event.set()
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def _write_and_sync(self, data: bytes) -> None:
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._segment_size += len(data)
+        if self._segment_size >= self.segment_max_bytes:
+            self._file.close()
+            self._segment_seq += 1
+            self._open_segment()
+
+    async def read_batch(self, max_records: int) -> Tuple[List[Dict[str, Any]], Position]:
+        """チェックポイント以降のレコードを最大max_records件読み出し、読み終えた位置とともに返す"""
+        # 読み出し後の追記をwait_for_appendで取りこぼさないよう、読み出し前にリセット
+        self._appended_event.clear()
+        return await _run_blocking(self._read_batch, max_records)
+
+    def _read_batch(self, max_records: int) -> Tuple[List[Dict[str, Any]], Position]:
+        seq, offset = self._checkpoint
+        records: List[Dict[str, Any]] = []
+        while len(records) < max_records:
+            # 開く前に書き込み中のセグメント番号を取得（読み出し中に追記・切り替えが起きても、
+            # これより前の封印済みセグメントのみ末尾まで読み終えたものとして次へ進む）
+            active_seq = self._segment_seq
+            path = self._segment_path(seq)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    while len(records) < max_records:
+                        line = f.readline()
+                        if not line.endswith(b"\n"):
+                            # 書き込み中、または異常終了で途中までしか書かれていない行
+                            break
+                        offset += len(line)
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            logger.warning(f"Skipping corrupt WAL record in segment {seq} at offset {offset}")
+            if len(records) >= max_records or seq >= active_seq:
+                break
+            # 書き込みが終わったセグメントは末尾まで読んだら次へ
+            seq, offset = seq + 1, 0
+        return records, (seq, offset)
+
+    async def commit(self, position: Position) -> None:
+        """再生済みの位置を保存し、不要になったセグメントを削除"""
+        await _run_blocking(self._commit, position)
+
+    def _commit(self, position: Position) -> None:
+        tmp_path = os.path.join(self.directory, f"{CHECKPOINT_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"segment": position[0], "offset": position[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.directory, CHECKPOINT_FILE))
+        self._checkpoint = position
+
+        for seq in self._segments():
+            if seq < position[0]:
+                os.remove(self._segment_path(seq))
+        self._lag_bytes = self._compute_lag()
+
+    async def dead_letter(self, entries: List[Tuple[Dict[str, Any], str]]) -> None:
+        """再生できなかったレコードをエラー内容とともにデッドレターファイルへ追記"""
+        await self._dead_letter.write(entries)
+
+    async def wait_for_append(self, timeout: float) -> None:
+        """前回のread_batch以降に追記があるかtimeout秒経過するまで待機"""
+        try:
+            await asyncio.wait_for(self._appended_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    @property
+    def checkpoint(self) -> Position:
+        return self._checkpoint
+
+    @property
+    def lag_bytes(self) -> int:
+        return self._lag_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "segment": self._segment_seq,
+            "checkpoint": {"segment": self._checkpoint[0], "offset": self._checkpoint[1]},
+            "lag_bytes": self._lag_bytes,
+            "max_bytes": self.max_bytes,
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "dead_letter": self._dead_letter.stats()
+        }
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:016d}{SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _open_segment(self) -> None:
+        self._file = open(self._segment_path(self._segment_seq), "ab")
+        self._segment_size = self._file.tell()
+
+    def _load_checkpoint(self) -> Optional[Position]:
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return data["segment"], data["offset"]
+
+    def _compute_lag(self) -> int:
+        seq, offset = self._checkpoint
+        segments = [s for s in self._segments() if s >= seq]
+        total = sum(os.path.getsize(self._segment_path(s)) for s in segments)
+        return total - offset if seq in segments else total
+
+
+class WalReplayer:
+    """
+    WALのレコードをDynamoDBへ再生するバックグラウンドタスク
+    バッチ全体が書き込めてからチェックポイントを進める（少なくとも1回の書き込み）
+    スロットリング・接続エラーで書き込めない間はバックオフしながら再試行を続け、
+    それ以外で書き込めないレコードはmax_retries回まで再試行した後、デッドレターファイルへ退避する
+    （再試行できない例外はレコードを1件ずつ書き込み直して原因のレコードのみを退避する）
+    """
+
+    def __init__(
+        self,
+        wal: WriteAheadLog,
+        write: Callable[[List[Dict[str, Any]]], Awaitable[Sequence[bool]]],
+        batch_size: int = 100,
+        idle_interval: float = 1.0,
+        retry_base_delay: float = 0.1,
+        retry_max_delay: float = 30.0,
+        max_retries: int = 10
+    ):
+        self.wal = wal
+        self._write = write
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_retries = max_retries
+        self._task: Optional[asyncio.Task] = None
+        self._behind_since: Optional[float] = None
+        self.replayed = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """再生を停止（未再生のレコードはWALに残り、次回起動時に再生される）"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def replay_once(self) -> int:
+        """チェックポイント以降の1バッチを再生し、再生した件数を返す"""
+        records, position = await self.wal.read_batch(self.batch_size)
+        if not records:
+            if position != self.wal.checkpoint:
+                # 末尾が途中までしか書かれていないセグメントを読み飛ばした
+                await self.wal.commit(position)
+            self._behind_since = None
+            return 0
+
+        if self._behind_since is None:
+            self._behind_since = time.time()
+        pending = records
+        dead: List[Tuple[Dict[str, Any], str]] = []
+        failures = 0
+        delay = self.retry_base_delay
+        while True:
+            pending, rejected, unavailable = await self._write_records(pending)
+            dead.extend(rejected)
+            if not pending:
+                break
+            if not unavailable:
+                failures += 1
+                if failures > self.max_retries:
+                    # 同じバッチの他のレコードの巻き添えで失敗している可能性があるため、1件ずつ書き込み直してから退避
+                    for record in pending:
+                        retry, rejected, _ = await self._write_records([record])
+                        dead.extend(rejected)
+                        dead.extend((r, self.last_error or "Not written") for r in retry)
+                    break
+            self.retries += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max_delay)
+
+        if dead:
+            await self.wal.dead_letter(dead)
+            self.dead_lettered += len(dead)
+            logger.error(f"Moved {len(dead)} WAL records to dead letter: {dead[-1][1]}")
+        await self.wal.commit(position)
+        self.replayed += len(records) - len(dead)
+        if self.wal.lag_bytes <= 0:
+            self._behind_since = None
+        return len(records)
+
+    async def _write_records(
+        self, records: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], str]], bool]:
+        """
+        レコードを書き込み、(再試行するレコード, 再試行しないレコードとエラー内容, スロットリング・接続エラーか) を返す
+        再試行できない例外の場合は、原因のレコードを特定するため1件ずつ書き込み直す
+        """
+        try:
+            results = await self._write(records)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.last_error = str(e)
+            if is_retryable_error(e):
+                logger.warning(f"WAL replay failed, retrying: {e}")
+                return records, [], True
+            if len(records) == 1:
+                return [], [(records[0], f"{type(e).__name__}: {e}")], False
+            retry: List[Dict[str, Any]] = []
+            rejected: List[Tuple[Dict[str, Any], str]] = []
+            for record in records:
+                record_retry, record_rejected, _ = await self._write_records([record])
+                retry.extend(record_retry)
+                rejected.extend(record_rejected)
+            return retry, rejected, False
+
+        failed = [record for record, ok in zip(records, results) if not ok]
+        if failed:
+            self.last_error = f"{len(failed)} records were not written"
+        return failed, [], False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await self.replay_once() == 0:
+                    await self.wal.wait_for_append(self.idle_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"WAL replayer error: {e}")
+                await asyncio.sleep(self.idle_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "replayed": self.replayed,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            # 未再生のレコードが残り続けている時間（追いついている場合は0）
+            "lag_seconds": round(time.time() - self._behind_since, 3) if self._behind_since else 0.0,
+            "last_error": self.last_error
+        }
+
+
+async def _run_blocking(func: Callable, *args) -> Any:
+    """ファイルI/Oをスレッドプールで実行"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
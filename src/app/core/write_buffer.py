@@ -0,0 +1,157 @@
+"""
+Write-Behind Buffer
+書き込みをキューに溜め、バックグラウンドでまとめて永続化する
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.dead_letter import DeadLetterFile
+from app.core.exceptions import RateLimitException, ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+# flushは項目ごとの成否（Trueで成功）を返す
+FlushFunc = Callable[[List[Any]], Awaitable[Sequence[bool]]]
+
+
+class WriteBehindBuffer:
+    """
+    上限付きキューとワーカーによるライトビハインド
+    ワーカーはbatch_size件たまるかflush_interval秒経過した時点でflushを呼び出す
+    キューが満杯の場合は待たずにRateLimitExceptionで呼び出し元へ背圧をかける
+    受け付け済みで書き込めなかった項目はdead_letterに退避する（未指定または退避失敗はlostとして記録）
+    """
+
+    def __init__(
+        self,
+        flush: FlushFunc,
+        max_size: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        workers: int = 2,
+        name: str = "write buffer",
+        dead_letter: Optional[DeadLetterFile] = None
+    ):
+        self._flush = flush
+        self.dead_letter = dead_letter
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.workers = workers
+        self.name = name
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.lost = 0
+        self.flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not self._closing
+
+    def start(self) -> None:
+        """ワーカーを起動"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._closing = False
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        logger.info(f"Started {self.name} with {self.workers} workers")
+
+    def enqueue(self, item: Any) -> None:
+        """項目をキューに登録（満杯時はRateLimitException）"""
+        if not self.running:
+            raise ServiceUnavailableException(self.name, "Not accepting writes")
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise RateLimitException(retry_after=1)
+        self.accepted += 1
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """新規登録を止め、キューを書き切ってからワーカーを停止"""
+        if not self._tasks:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{self.name} shutdown timed out; {self._queue.qsize()} items were not written")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info(f"Stopped {self.name}")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush_batch(batch)
+
+    async def _flush_batch(self, batch: List[Any]) -> None:
+        try:
+            try:
+                results = await self._flush(batch)
+                failed = [(item, "Not written") for item, ok in zip(batch, results) if not ok]
+            except Exception as e:
+                logger.error(f"{self.name}: failed to flush {len(batch)} items: {e}")
+                failed = [(item, f"{type(e).__name__}: {e}") for item in batch]
+            self.written += len(batch) - len(failed)
+            if failed:
+                self.failed += len(failed)
+                logger.error(f"{self.name}: {len(failed)}/{len(batch)} items failed to write")
+                await self._dead_letter_items(failed)
+        finally:
+            self.flushes += 1
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _dead_letter_items(self, failed: List[Tuple[Any, str]]) -> None:
+        """書き込めなかった項目をデッドレターファイルへ退避"""
+        if self.dead_letter is None:
+            self.lost += len(failed)
+            return
+        try:
+            await self.dead_letter.write(failed)
+            self.dead_lettered += len(failed)
+        except Exception as e:
+            self.lost += len(failed)
+            logger.error(f"{self.name}: failed to dead-letter {len(failed)} items, data lost: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+            "lost": self.lost,
+            "flushes": self.flushes,
+            "dead_letter": self.dead_letter.stats() if self.dead_letter is not None else None
+        }
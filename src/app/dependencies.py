@@ -3,17 +3,46 @@ FastAPI Dependencies
 共通の依存関係管理
 """
 
+import asyncio
 import logging
+from contextlib import AsyncExitStack
 from functools import lru_cache
+from typing import Optional
 
 import boto3
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 
+from app.cache import CACHE_BACKEND_REDIS, CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from app.core.cache import TTLCache
 from app.core.config import get_settings
+from app.core.dead_letter import DeadLetterFile
+from app.core.dynamodb import (
+    AsyncTable, AioTable, BACKEND_AIOBOTO3, CODEC_NATIVE, CodecTable, as_async_table, get_botocore_config,
+    get_dynamodb_executor
+)
+from app.core.wal import WalReplayer, WriteAheadLog
+from app.core.write_buffer import WriteBehindBuffer
+from app.services.metric_service import MetricService, WRITE_MODE_WAL, WRITE_MODE_WRITE_BEHIND
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# aioboto3リソースはasync with内でのみ有効なため、アプリ終了時まで保持する
+_aio_exit_stack = None
+_aio_resource = None
+_aio_client = None
+_aio_lock = asyncio.Lock()
+
+_cache_backend = None
+_cache_lock = asyncio.Lock()
+
+_write_buffer = None
+_write_buffer_lock = asyncio.Lock()
+
+_wal = None
+_wal_replayer = None
+_wal_lock = asyncio.Lock()
+
 
 @lru_cache()
 def get_dynamodb_client():
@@ -23,7 +52,7 @@ def get_dynamodb_client():
     """
     try:
         aws_config = settings.get_aws_config()
-        client = boto3.client('dynamodb', **aws_config)
+        client = boto3.client('dynamodb', config=get_botocore_config(), **aws_config)
         
         # 接続テスト
         client.list_tables()
@@ -49,7 +78,7 @@ def get_dynamodb_resource():
     """
     try:
         aws_config = settings.get_aws_config()
-        resource = boto3.resource('dynamodb', **aws_config)
+        resource = boto3.resource('dynamodb', config=get_botocore_config(), **aws_config)
         
         logger.info("DynamoDB resource created successfully")
         return resource
@@ -59,13 +88,237 @@ def get_dynamodb_resource():
         raise
 
 
-def get_users_table():
-    """Users DynamoDBテーブルを取得"""
-    dynamodb = get_dynamodb_resource()
-    return dynamodb.Table(settings.DYNAMODB_USERS_TABLE)
+async def get_aio_dynamodb_resource():
+    """
+    aioboto3のDynamoDBリソースを取得
+    初回呼び出し時に作成し、close_dynamodb_resources()まで再利用
+    """
+    global _aio_exit_stack, _aio_resource, _aio_client
+    
+    async with _aio_lock:
+        if _aio_resource is None:
+            import aioboto3
+            
+            stack = AsyncExitStack()
+            try:
+                session = aioboto3.Session()
+                aws_config = settings.get_aws_config()
+                _aio_resource = await stack.enter_async_context(
+                    session.resource('dynamodb', config=get_botocore_config(), **aws_config)
+                )
+                # client_call用の低レベルクライアント（リソースのmeta.clientは属性値を自動変換するため別に作成）
+                _aio_client = await stack.enter_async_context(
+                    session.client('dynamodb', config=get_botocore_config(), **aws_config)
+                )
+                _aio_exit_stack = stack
+                logger.info("aioboto3 DynamoDB resource created successfully")
+            except Exception as e:
+                await stack.aclose()
+                logger.error(f"Failed to create aioboto3 DynamoDB resource: {e}")
+                raise
+    
+    return _aio_resource
+
 
+async def close_dynamodb_resources() -> None:
+    """DynamoDB関連のリソース（aioboto3セッション・スレッドプール）を解放"""
+    global _aio_exit_stack, _aio_resource, _aio_client
+    
+    if _aio_exit_stack is not None:
+        await _aio_exit_stack.aclose()
+        _aio_exit_stack = None
+        _aio_resource = None
+        _aio_client = None
+    
+    get_dynamodb_executor().shutdown(wait=False)
+    get_dynamodb_executor.cache_clear()
 
-def get_metrics_table():
-    """Metrics DynamoDBテーブルを取得"""
+
+async def _get_table(table_name: str) -> AsyncTable:
+    """設定されたバックエンドでテーブルの非同期アダプターを取得"""
+    if settings.DYNAMODB_BACKEND == BACKEND_AIOBOTO3:
+        resource = await get_aio_dynamodb_resource()
+        return AioTable(await resource.Table(table_name), _aio_client)
+    
     dynamodb = get_dynamodb_resource()
-    return dynamodb.Table(settings.DYNAMODB_METRICS_TABLE)
\ No newline at end of file
+    return as_async_table(dynamodb.Table(table_name), get_dynamodb_client())
+
+
+async def get_users_table() -> AsyncTable:
+    """Users DynamoDBテーブルを取得"""
+    return await _get_table(settings.DYNAMODB_USERS_TABLE)
+
+
+async def get_user_reservations_table() -> Optional[AsyncTable]:
+    """
+    User Reservations DynamoDBテーブルを取得（username/emailの一意性予約）
+    USER_RESERVATIONS_ENABLED=falseの場合はNone（GSIによる重複確認にフォールバック）
+    """
+    if not settings.USER_RESERVATIONS_ENABLED:
+        return None
+    return await _get_table(settings.DYNAMODB_USER_RESERVATIONS_TABLE)
+
+
+async def get_metrics_table() -> AsyncTable:
+    """Metrics DynamoDBテーブルを取得（nativeの場合は数値をDecimalを経由せずint/floatで読み書きする）"""
+    table = await _get_table(settings.DYNAMODB_METRICS_TABLE)
+    if settings.DYNAMODB_METRICS_CODEC == CODEC_NATIVE:
+        return CodecTable(table)
+    return table
+
+
+async def get_rollups_table():
+    """Metric Rollups DynamoDBテーブルを取得（ロールアップ無効時はNone）"""
+    if settings.ROLLUP_MODE == "disabled":
+        return None
+    return await _get_table(settings.DYNAMODB_ROLLUPS_TABLE)
+
+
+async def get_entity_cache() -> Optional[CacheBackend]:
+    """
+    ユーザー・メトリクスのキャッシュバックエンドを取得（無効時はNone）
+    初回呼び出し時に作成し、close_cache_backend()まで全リクエストで共有
+    """
+    global _cache_backend
+    
+    if not settings.CACHE_ENABLED:
+        return None
+    
+    async with _cache_lock:
+        if _cache_backend is None:
+            backend = _create_cache_backend()
+            await backend.start()
+            _cache_backend = backend
+    
+    return _cache_backend
+
+
+def _create_cache_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == CACHE_BACKEND_REDIS:
+        import redis.asyncio as aioredis
+        
+        near_cache = None
+        if settings.CACHE_NEAR_TTL_SECONDS > 0:
+            near_cache = TTLCache(
+                max_entries=settings.CACHE_MAX_ENTRIES,
+                max_bytes=settings.CACHE_MAX_BYTES,
+                ttl_seconds=settings.CACHE_NEAR_TTL_SECONDS
+            )
+        logger.info("Redis cache backend created")
+        return RedisCacheBackend(
+            aioredis.from_url(settings.REDIS_URL),
+            channel=settings.CACHE_INVALIDATION_CHANNEL,
+            ttl_seconds=settings.CACHE_TTL_SECONDS,
+            near_cache=near_cache
+        )
+    
+    return MemoryCacheBackend(TTLCache(
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        max_bytes=settings.CACHE_MAX_BYTES,
+        ttl_seconds=settings.CACHE_TTL_SECONDS
+    ))
+
+
+async def close_cache_backend() -> None:
+    """キャッシュバックエンド（Redis接続・購読）を解放"""
+    global _cache_backend
+    
+    if _cache_backend is not None:
+        await _cache_backend.close()
+        _cache_backend = None
+
+
+async def get_metric_write_buffer() -> Optional[WriteBehindBuffer]:
+    """
+    メトリクスのライトビハインドバッファーを取得（METRICS_WRITE_MODEがwrite_behind以外はNone）
+    初回呼び出し時にワーカーを起動し、close_metric_write_buffer()まで共有
+    """
+    global _write_buffer
+    
+    if settings.METRICS_WRITE_MODE != WRITE_MODE_WRITE_BEHIND:
+        return None
+    
+    async with _write_buffer_lock:
+        if _write_buffer is None:
+            writer = MetricService(
+                await get_metrics_table(),
+                await get_rollups_table(),
+                await get_entity_cache()
+            )
+            dead_letter = DeadLetterFile(settings.WRITE_BUFFER_DEAD_LETTER_FILE)
+            await dead_letter.open()
+            buffer = WriteBehindBuffer(
+                writer.write_buffered,
+                max_size=settings.WRITE_BUFFER_MAX_SIZE,
+                batch_size=settings.WRITE_BUFFER_BATCH_SIZE,
+                flush_interval=settings.WRITE_BUFFER_FLUSH_INTERVAL,
+                workers=settings.WRITE_BUFFER_WORKERS,
+                name="metrics write buffer",
+                dead_letter=dead_letter
+            )
+            buffer.start()
+            _write_buffer = buffer
+    
+    return _write_buffer
+
+
+async def close_metric_write_buffer() -> None:
+    """キューに残ったメトリクスを書き切ってからワーカーを停止"""
+    global _write_buffer
+    
+    if _write_buffer is not None:
+        await _write_buffer.close(timeout=settings.WRITE_BUFFER_SHUTDOWN_TIMEOUT)
+        _write_buffer = None
+
+
+async def get_metric_wal() -> Optional[WriteAheadLog]:
+    """
+    メトリクスのWALを取得（METRICS_WRITE_MODEがwal以外はNone）
+    初回呼び出し時にWALを開いて再生を開始し、close_metric_wal()まで共有
+    """
+    global _wal, _wal_replayer
+    
+    if settings.METRICS_WRITE_MODE != WRITE_MODE_WAL:
+        return None
+    
+    async with _wal_lock:
+        if _wal is None:
+            wal = WriteAheadLog(
+                settings.WAL_DIR,
+                segment_max_bytes=settings.WAL_SEGMENT_MAX_BYTES,
+                max_bytes=settings.WAL_MAX_BYTES,
+                fsync_interval=settings.WAL_FSYNC_INTERVAL
+            )
+            await wal.open()
+            writer = MetricService(
+                await get_metrics_table(),
+                await get_rollups_table(),
+                await get_entity_cache()
+            )
+            _wal_replayer = WalReplayer(
+                wal,
+                writer.write_buffered,
+                batch_size=settings.WAL_REPLAY_BATCH_SIZE,
+                max_retries=settings.WAL_REPLAY_MAX_RETRIES
+            )
+            _wal_replayer.start()
+            _wal = wal
+    
+    return _wal
+
+
+def get_wal_replayer() -> Optional[WalReplayer]:
+    """WALの再生タスクを取得（未開始時はNone）"""
+    return _wal_replayer
+
+
+async def close_metric_wal() -> None:
+    """再生を停止してWALを閉じる（未再生のレコードは次回起動時に再生）"""
+    global _wal, _wal_replayer
+    
+    if _wal_replayer is not None:
+        await _wal_replayer.close()
+        _wal_replayer = None
+    if _wal is not None:
+        await _wal.close()
+        _wal = None
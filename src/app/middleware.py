@@ -0,0 +1,228 @@
+"""
+ASGI Middleware
+リクエストIDの付与・トレース・リクエスト単位の計測・レスポンス圧縮
+"""
+
+import logging
+import re
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.compression import create_compressor, negotiate_encoding
+from app.core.config import get_settings
+from app.core.logging import log_response
+from app.core.telemetry import HTTP_REQUEST_DURATION
+from app.core.tracing import SPAN_KIND_SERVER, get_request_id, get_tracer, reset_request_id, set_request_id
+
+logger = logging.getLogger(__name__)
+
+# ルーティングされなかったリクエストのrouteラベル（パスをそのまま使うとラベルが無制限に増えるため）
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# 呼び出し元から受け取るリクエストIDの形式（ログに書き込むため英数字と一部記号に制限）
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+def _get_header(scope, name: bytes):
+    for key, value in scope.get("headers") or ():
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestContextMiddleware:
+    """
+    リクエストIDの付与（X-Request-IDヘッダーを引き継ぐか新規発行し、レスポンスにも付与）と
+    リクエスト全体のサーバースパンの記録（traceparentヘッダーがあればそのトレースを継続）
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _get_header(scope, REQUEST_ID_HEADER.encode())
+        if request_id is None or not _REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        token = set_request_id(request_id)
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), (REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+
+        method = scope["method"]
+        attributes = {"http.request.method": method, "url.path": scope["path"], "request_id": request_id}
+        try:
+            with get_tracer().start_span(
+                method, kind=SPAN_KIND_SERVER, attributes=attributes,
+                traceparent=_get_header(scope, b"traceparent")
+            ) as span:
+                try:
+                    await self.app(scope, receive, send_with_request_id)
+                finally:
+                    route = getattr(scope.get("route"), "path", None)
+                    if route is not None:
+                        span.update_name(f"{method} {route}")
+                        span.set_attribute("http.route", route)
+                    span.set_attribute("http.response.status_code", status_code)
+                    if status_code >= 500:
+                        span.set_status("error")
+        finally:
+            reset_request_id(token)
+
+
+class RequestMetricsMiddleware:
+    """
+    リクエストのレイテンシをルートのパステンプレート・メソッド・ステータス別に記録
+    閾値を超えたリクエストはレスポンスログを出力する
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            # ルーティング後にscopeへ設定されるルートからパステンプレート（/metrics/{metric_id}等）を取得
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            HTTP_REQUEST_DURATION.observe(duration, route=route, method=scope["method"], status=str(status_code))
+            if duration >= get_settings().TELEMETRY_SLOW_REQUEST_SECONDS:
+                log_response(logger, get_request_id() or "-", status_code, duration, route=route, method=scope["method"])
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encodingに応じたレスポンス圧縮（zstd / br / gzip）
+    対象外のContent-Type・最小サイズ未満・除外ルート・Cache-Control: no-transformのレスポンスは圧縮しない
+    ストリーミングレスポンスはstream_flush_bytes以上たまるごとにフラッシュし、NDJSONの行を
+    クライアントへ逐次届ける（0の場合はチャンクごと。行ごとのフラッシュは圧縮率が大きく下がる）
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        encodings: Iterable[str] = ("gzip",),
+        content_types: Iterable[str] = ("application/json",),
+        excluded_routes: Iterable[str] = (),
+        levels: Optional[Dict[str, int]] = None,
+        stream_flush_bytes: int = 4096
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = [encoding.strip().lower() for encoding in encodings if encoding.strip()]
+        self.content_types = frozenset(content_type.strip().lower() for content_type in content_types)
+        self.excluded_routes = frozenset(route.strip() for route in excluded_routes if route.strip())
+        self.levels = levels or {}
+        self.stream_flush_bytes = stream_flush_bytes
+
+    def _should_compress(self, scope, message) -> bool:
+        """レスポンスヘッダー送信時点で圧縮対象かを判定（ルートはルーティング後にscopeへ設定される）"""
+        if message["status"] < 200 or message["status"] in (204, 304):
+            return False
+        headers = MutableHeaders(scope=message)
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", "").lower():
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type not in self.content_types:
+            return False
+        return getattr(scope.get("route"), "path", None) not in self.excluded_routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(_get_header(scope, b"accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 最初の本体チャンクを見てから圧縮するか決めるため、ヘッダーの送信を保留する
+        pending_start = None
+        compressor = None
+        unflushed = 0  # 前回のフラッシュ以降に圧縮器へ渡したバイト数
+
+        async def send_compressed(message):
+            nonlocal pending_start, compressor, unflushed
+            if message["type"] == "http.response.start":
+                if self._should_compress(scope, message):
+                    pending_start = message
+                    return
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body" or (pending_start is None and compressor is None):
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is not None:
+                if more_body:
+                    body = compress_chunk(body)
+                    if not body:
+                        return
+                else:
+                    body = compressor.finish(body)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            start, pending_start = pending_start, None
+            headers = MutableHeaders(scope=start)
+            headers.add_vary_header("Accept-Encoding")
+            content_length = int(headers.get("content-length", -1))
+            if (not more_body and len(body) < self.minimum_size) or 0 <= content_length < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+
+            compressor = create_compressor(encoding, self.levels.get(encoding))
+            headers["Content-Encoding"] = encoding
+            if more_body:
+                # ストリーミング時は圧縮後の長さが分からないためchunked転送とする
+                del headers["Content-Length"]
+                body = compress_chunk(body)
+            else:
+                body = compressor.finish(body)
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        def compress_chunk(body: bytes) -> bytes:
+            nonlocal unflushed
+            compressed = compressor.compress(body)
+            unflushed += len(body)
+            if unflushed >= self.stream_flush_bytes:
+                compressed += compressor.flush()
+                unflushed = 0
+            return compressed
+
+        await self.app(scope, receive, send_compressed)
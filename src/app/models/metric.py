@@ -30,7 +30,7 @@ class MetricBase(BaseModel):
 
 class MetricCreate(MetricBase):
     """メトリクス作成用モデル"""
-    pass
+    timestamp: Optional[datetime] = Field(None, description="計測日時（省略時は受信日時、タイムゾーンなしはUTC）")
 
 
 class MetricUpdate(BaseModel):
@@ -58,11 +58,28 @@ class MetricListResponse(BaseModel):
     total_count: int
     limit: int
     offset: int
+    next_cursor: Optional[str] = Field(None, description="次ページ取得用カーソル")
     
     class Config:
         from_attributes = True
 
 
+class MetricBatchItemResult(BaseModel):
+    """メトリクス一括登録の項目別結果"""
+    index: int = Field(..., description="リクエスト内の位置")
+    metric_id: Optional[str] = Field(None, description="メトリクスID")
+    success: bool = Field(..., description="登録成否")
+    error: Optional[str] = Field(None, description="エラー内容")
+
+
+class MetricBatchResponse(BaseModel):
+    """メトリクス一括登録レスポンス用モデル"""
+    total_count: int
+    success_count: int
+    failure_count: int
+    results: list[MetricBatchItemResult]
+
+
 class MetricSummary(BaseModel):
     """メトリクス集計用モデル"""
     device_id: str
@@ -73,4 +90,28 @@ class MetricSummary(BaseModel):
     max_value: float
     latest_timestamp: datetime
     latest_value: float
-    latest_status: MetricStatus
\ No newline at end of file
+    latest_status: MetricStatus
+
+
+class MetricAggregateBucket(BaseModel):
+    """時間バケット単位の集計値"""
+    timestamp: datetime = Field(..., description="バケット開始日時")
+    count: int = Field(..., description="バケット内の件数")
+    avg: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    sum: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+
+class MetricAggregateResponse(BaseModel):
+    """時間バケット集計レスポンス用モデル"""
+    device_id: str
+    metric_name: str
+    bucket: str
+    aggregations: list[str]
+    point_count: int = Field(..., description="集計対象の元データ件数")
+    buckets: list[MetricAggregateBucket]
@@ -47,6 +47,7 @@ class UserListResponse(BaseModel):
     total_count: int
     limit: int
     offset: int
+    next_cursor: Optional[str] = Field(None, description="次ページ取得用カーソル")
     
     class Config:
         from_attributes = True
\ No newline at end of file
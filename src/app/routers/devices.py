@@ -0,0 +1,93 @@
+"""
+Devices Router
+デバイス別メトリクス履歴エンドポイント
+"""
+
+import logging
+from datetime import datetime
+from typing import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.config import get_settings
+from app.core.exceptions import PortfolioAPIException, ValidationException
+from app.core.tracing import TracedRoute
+from app.dependencies import get_metrics_table
+from app.models.metric import MetricResponse
+from app.services.metric_service import MetricService
+
+logger = logging.getLogger(__name__)
+router = APIRouter(route_class=TracedRoute)
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+async def _encode_ndjson(first: MetricResponse, metrics: AsyncIterator[MetricResponse]) -> AsyncIterator[bytes]:
+    """メトリクスを1行1件のNDJSONとして出力"""
+    yield first.model_dump_json().encode() + b"\n"
+    async for metric in metrics:
+        yield metric.model_dump_json().encode() + b"\n"
+
+
+async def _encode_json_array(first: MetricResponse, metrics: AsyncIterator[MetricResponse]) -> AsyncIterator[bytes]:
+    """メトリクスをチャンク分割したJSON配列として出力"""
+    yield b"[" + first.model_dump_json().encode()
+    async for metric in metrics:
+        yield b"," + metric.model_dump_json().encode()
+    yield b"]"
+
+
+@router.get("/devices/{device_id}/metrics")
+async def get_device_metrics(
+    device_id: str,
+    start: datetime = Query(..., description="開始日時"),
+    end: datetime = Query(..., description="終了日時"),
+    format: str = Query(default="ndjson", pattern="^(ndjson|json)$", description="出力形式 (ndjson / json)"),
+    metrics_table=Depends(get_metrics_table)
+) -> StreamingResponse:
+    """
+    デバイスのメトリクス履歴取得（ストリーミング）
+    
+    Args:
+        device_id: デバイスID
+        start: 開始日時
+        end: 終了日時
+        format: 出力形式
+        
+    Returns:
+        時間範囲内のメトリクス（古い順）
+    """
+    if start > end:
+        raise ValidationException("start must be earlier than end", field="start", value=start)
+    
+    try:
+        metric_service = MetricService(metrics_table)
+        metrics = metric_service.iter_device_metrics(
+            device_id,
+            start=start,
+            end=end,
+            page_size=get_settings().DEVICE_METRICS_PAGE_SIZE
+        )
+        
+        # 最初のページはレスポンス開始前に取得し、DynamoDBエラーを500として返す
+        try:
+            first = await metrics.__anext__()
+        except StopAsyncIteration:
+            empty = b"" if format == "ndjson" else b"[]"
+            return StreamingResponse(iter([empty]), media_type=STREAM_MEDIA_TYPES[format])
+        
+        encoder = _encode_ndjson if format == "ndjson" else _encode_json_array
+        return StreamingResponse(encoder(first, metrics), media_type=STREAM_MEDIA_TYPES[format])
+        
+    except PortfolioAPIException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get metrics for device {device_id}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="デバイスのメトリクス履歴の取得に失敗しました"
+        )
@@ -8,17 +8,29 @@ import time
 from typing import Dict, Any
 
 from fastapi import APIRouter, Depends, HTTPException
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
+from starlette.concurrency import run_in_threadpool
 
+from app.core.broadcast import get_broadcast_hub
 from app.core.config import get_settings
-from app.dependencies import get_dynamodb_client
+from app.core.logging import get_log_stats
+from app.core.singleflight import get_single_flight
+from app.core.startup import get_startup_state
+from app.core.tracing import TracedRoute, get_tracer
+
+# botocore・app.dependencies（boto3・numpyを読み込む）は各ハンドラー内でimportし、
+# このモジュールのimportと /health の応答をDynamoDB関連の読み込みから切り離す
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 settings = get_settings()
 
 
+async def _get_dynamodb_client():
+    """DynamoDBクライアントを取得（初回は接続確認を伴うためスレッドプールで実行）"""
+    from app.dependencies import get_dynamodb_client
+    return await run_in_threadpool(get_dynamodb_client)
+
+
 @router.get("/health")
 async def health_check() -> Dict[str, Any]:
     """
@@ -35,18 +47,23 @@ async def health_check() -> Dict[str, Any]:
 
 @router.get("/health/detailed")
 async def detailed_health_check(
-    dynamodb_client = Depends(get_dynamodb_client)
+    dynamodb_client = Depends(_get_dynamodb_client)
 ) -> Dict[str, Any]:
     """
     詳細なヘルスチェック
     外部依存関係を含めた健全性確認
     """
+    from botocore.exceptions import ClientError
+    
     start_time = time.time()
     health_status = {
         "status": "healthy",
         "timestamp": settings.get_current_timestamp(),
         "version": settings.APP_VERSION,
         "service": "portfolio-api",
+        "startup": get_startup_state().stats(),
+        "logging": get_log_stats(),
+        "tracing": get_tracer().stats(),
         "checks": {}
     }
     
@@ -105,20 +122,96 @@ async def detailed_health_check(
         }
         health_status["status"] = "unhealthy"
     
+    # ライトビハインドの書き込み失敗チェック（202で受け付け済みの項目）
+    from app.dependencies import get_metric_write_buffer
+    
+    write_buffer = await get_metric_write_buffer()
+    if write_buffer is not None:
+        buffer_stats = write_buffer.stats()
+        health_status["checks"]["metrics_write_buffer"] = {
+            "status": "healthy" if buffer_stats["failed"] == 0 else "degraded",
+            "failed": buffer_stats["failed"],
+            "dead_lettered": buffer_stats["dead_lettered"],
+            "lost": buffer_stats["lost"],
+            "message": (
+                "No failed writes" if buffer_stats["failed"] == 0
+                else "Accepted metrics failed to write; see the dead letter file"
+            )
+        }
+        if buffer_stats["failed"] and health_status["status"] == "healthy":
+            health_status["status"] = "degraded"
+    
     # レスポンス時間追加
     health_status["response_time_ms"] = round((time.time() - start_time) * 1000, 2)
     
     return health_status
 
 
+@router.get("/health/cache")
+async def cache_health_check() -> Dict[str, Any]:
+    """
+    エンティティキャッシュの統計情報
+    ヒット・ミス・追い出し件数を確認
+    """
+    from app.dependencies import get_entity_cache
+    
+    cache = await get_entity_cache()
+    single_flight = get_single_flight()
+    return {
+        "status": "enabled" if cache is not None else "disabled",
+        "timestamp": settings.get_current_timestamp(),
+        "stats": await cache.stats() if cache is not None else {},
+        "single_flight": single_flight.stats() if single_flight is not None else {}
+    }
+
+
+@router.get("/health/stream")
+async def stream_health_check() -> Dict[str, Any]:
+    """
+    ライブ配信（SSE / WebSocket）の統計情報
+    購読者数・配信件数・切断した遅い購読者数を確認
+    """
+    return {
+        "timestamp": settings.get_current_timestamp(),
+        "stats": get_broadcast_hub().stats()
+    }
+
+
+@router.get("/health/ingest")
+async def ingest_health_check() -> Dict[str, Any]:
+    """
+    メトリクス書き込みモードとライトビハインドキュー・WALの統計情報
+    キュー滞留・429件数・書き込み失敗件数・WALの再生遅延を確認
+    """
+    from app.dependencies import get_metric_wal, get_metric_write_buffer, get_wal_replayer
+    
+    write_buffer = await get_metric_write_buffer()
+    wal = await get_metric_wal()
+    stats: Dict[str, Any] = {}
+    if write_buffer is not None:
+        stats = write_buffer.stats()
+    elif wal is not None:
+        replayer = get_wal_replayer()
+        stats = {**wal.stats(), "replay": replayer.stats() if replayer is not None else {}}
+    return {
+        "mode": settings.METRICS_WRITE_MODE,
+        "timestamp": settings.get_current_timestamp(),
+        "stats": stats
+    }
+
+
 @router.get("/health/db")
 async def database_health_check(
-    dynamodb_client = Depends(get_dynamodb_client)
+    dynamodb_client = Depends(_get_dynamodb_client)
 ) -> Dict[str, Any]:
     """
     データベース専用ヘルスチェック
     DynamoDBの接続と基本操作を確認
     """
+    from botocore.exceptions import ClientError
+    
+    from app.core.dynamodb import get_pool_metrics
+    
     try:
         # テーブル一覧取得テスト
         response = dynamodb_client.list_tables()
@@ -134,6 +227,7 @@ async def database_health_check(
                 settings.DYNAMODB_USERS_TABLE,
                 settings.DYNAMODB_METRICS_TABLE
             ],
+            "connection_pool": get_pool_metrics().stats(),
             "message": "Database connection successful"
         }
         
@@ -3,28 +3,57 @@ Metrics Router
 メトリクス管理エンドポイント
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError as PydanticValidationError
 
+from app.core.broadcast import Subscription, get_broadcast_hub
+from app.core.config import get_settings
+from app.core.exceptions import PortfolioAPIException, ServiceUnavailableException, ValidationException
+from app.core.http_cache import conditional_get, content_etag, version_etag
+from app.core.responses import fast_json_response
+from app.core.tracing import TracedRoute
 from app.models.metric import (
     MetricCreate, MetricUpdate, MetricResponse, 
-    MetricListResponse, MetricSummary, MetricStatus
+    MetricListResponse, MetricSummary, MetricStatus,
+    MetricBatchResponse, MetricAggregateResponse
 )
-from app.dependencies import get_metrics_table
+from app.dependencies import (
+    get_entity_cache, get_metric_wal, get_metric_write_buffer, get_metrics_table, get_rollups_table
+)
+from app.services.aggregation_service import parse_aggregations
 from app.services.metric_service import MetricService
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+QUERY_PLAN_HEADER = "X-Query-Plan"
+SSE_CONTENT_TYPE = "text/event-stream"
+
+
+def _set_query_plan_header(response: Response, metric_service: MetricService) -> None:
+    """DEBUG時のみ、選択されたクエリプランをレスポンスヘッダーに出力"""
+    if get_settings().DEBUG and metric_service.last_query_plan:
+        response.headers[QUERY_PLAN_HEADER] = metric_service.last_query_plan.describe()
 
 
 @router.get("/metrics", response_model=MetricListResponse)
 async def get_metrics(
+    response: Response,
     limit: int = Query(default=10, ge=1, le=100, description="取得件数"),
-    offset: int = Query(default=0, ge=0, description="オフセット"),
+    offset: int = Query(default=0, ge=0, description="オフセット（非推奨: cursorを使用）"),
     device_id: Optional[str] = Query(default=None, description="デバイスIDフィルター"),
     status: Optional[MetricStatus] = Query(default=None, description="ステータスフィルター"),
+    cursor: Optional[str] = Query(default=None, description="前ページのnext_cursor"),
+    start: Optional[datetime] = Query(default=None, description="開始日時（timestamp）"),
+    end: Optional[datetime] = Query(default=None, description="終了日時（timestamp）"),
     metrics_table=Depends(get_metrics_table)
 ) -> MetricListResponse:
     """
@@ -32,9 +61,12 @@ async def get_metrics(
     
     Args:
         limit: 取得件数 (1-100)
-        offset: オフセット
+        offset: オフセット（非推奨）
         device_id: デバイスIDでフィルター
         status: ステータスでフィルター
+        cursor: 次ページ取得用カーソル
+        start: 開始日時
+        end: 終了日時
         
     Returns:
         メトリクス一覧
@@ -45,10 +77,19 @@ async def get_metrics(
             limit=limit, 
             offset=offset,
             device_id=device_id,
-            status=status
+            status=status,
+            cursor=cursor,
+            start=start,
+            end=end
         )
+        _set_query_plan_header(response, metric_service)
+        if get_settings().RESPONSE_FAST_PATH:
+            # サービス層で検証済みのため、response_modelによる再検証を省略してエンコード
+            return fast_json_response(result, response)
         return result
         
+    except PortfolioAPIException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get metrics: {e}")
         raise HTTPException(
@@ -61,7 +102,8 @@ async def get_metrics(
 async def get_latest_metrics(
     device_id: Optional[str] = Query(default=None, description="デバイスIDフィルター"),
     limit: int = Query(default=10, ge=1, le=50, description="取得件数"),
-    metrics_table=Depends(get_metrics_table)
+    metrics_table=Depends(get_metrics_table),
+    cache=Depends(get_entity_cache)
 ) -> List[MetricResponse]:
     """
     最新メトリクス取得
@@ -74,7 +116,7 @@ async def get_latest_metrics(
         最新のメトリクス一覧
     """
     try:
-        metric_service = MetricService(metrics_table)
+        metric_service = MetricService(metrics_table, cache=cache)
         result = await metric_service.get_latest_metrics(
             device_id=device_id,
             limit=limit
@@ -89,10 +131,121 @@ async def get_latest_metrics(
         )
 
 
+def _format_sse(metric: MetricResponse) -> str:
+    """メトリクスをSSEのイベント形式に変換"""
+    return f"id: {metric.metric_id}\nevent: metric\ndata: {metric.model_dump_json()}\n\n"
+
+
+async def _sse_events(request: Request, subscription: Subscription) -> AsyncIterator[str]:
+    """購読したメトリクスをSSEとして送信（無通信時はハートビートのコメント行を送る）"""
+    heartbeat = get_settings().STREAM_HEARTBEAT_SECONDS
+    try:
+        while not await request.is_disconnected():
+            try:
+                metric = await subscription.get(timeout=heartbeat)
+            except StopAsyncIteration:
+                yield f"event: close\ndata: {json.dumps({'reason': subscription.close_reason})}\n\n"
+                break
+            yield ": heartbeat\n\n" if metric is None else _format_sse(metric)
+    finally:
+        subscription.close()
+
+
+@router.get("/metrics/stream")
+async def stream_metrics(
+    request: Request,
+    device_id: Optional[List[str]] = Query(default=None, description="購読するデバイスID（複数指定可、未指定は全デバイス）")
+) -> StreamingResponse:
+    """
+    新規メトリクスのライブ配信（Server-Sent Events）
+    
+    Args:
+        device_id: 購読するデバイスID
+        
+    Returns:
+        text/event-streamのレスポンス
+    """
+    subscription = get_broadcast_hub().subscribe(device_id)
+    return StreamingResponse(
+        _sse_events(request, subscription),
+        media_type=SSE_CONTENT_TYPE,
+        # no-transform: 圧縮ミドルウェア・プロキシによるバッファリングを避ける
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _send_metrics(websocket: WebSocket, subscription: Subscription) -> None:
+    """購読したメトリクスをWebSocketへ送信"""
+    async for metric in subscription:
+        await websocket.send_text(json.dumps({"event": "metric", "data": json.loads(metric.model_dump_json())}))
+
+
+async def _receive_commands(websocket: WebSocket, subscription: Subscription) -> None:
+    """
+    クライアントからの購読変更を反映
+    {"action": "subscribe" | "unsubscribe", "device_ids": [...]}
+    """
+    while True:
+        message = await websocket.receive_json()
+        device_ids = message.get("device_ids") or ()
+        if message.get("action") == "subscribe":
+            subscription.add_devices(device_ids)
+        elif message.get("action") == "unsubscribe":
+            subscription.remove_devices(device_ids)
+        else:
+            await websocket.send_json({"event": "error", "detail": "Unknown action"})
+            continue
+        await websocket.send_json({
+            "event": "subscribed",
+            "device_ids": sorted(subscription.device_ids),
+            "all_devices": subscription.all_devices
+        })
+
+
+@router.websocket("/metrics/ws")
+async def metrics_websocket(
+    websocket: WebSocket,
+    device_id: Optional[List[str]] = Query(default=None)
+) -> None:
+    """
+    新規メトリクスのライブ配信（WebSocket）
+    device_idクエリで初期購読を指定し、接続後はsubscribe/unsubscribeメッセージで変更する
+    """
+    try:
+        subscription = get_broadcast_hub().subscribe(device_id)
+    except ServiceUnavailableException:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    
+    await websocket.accept()
+    tasks = [
+        asyncio.create_task(_send_metrics(websocket, subscription)),
+        asyncio.create_task(_receive_commands(websocket, subscription))
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None \
+                    and not isinstance(task.exception(), WebSocketDisconnect):
+                logger.warning(f"Metrics websocket error: {task.exception()}")
+        if subscription.closed and subscription.close_reason:
+            # 遅い購読者として切断された場合・終了時
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=subscription.close_reason)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscription.close()
+
+
 @router.get("/metrics/summary", response_model=List[MetricSummary])
 async def get_metrics_summary(
+    request: Request,
+    response: Response,
     device_id: Optional[str] = Query(default=None, description="デバイスIDフィルター"),
-    metrics_table=Depends(get_metrics_table)
+    metrics_table=Depends(get_metrics_table),
+    rollups_table=Depends(get_rollups_table)
 ) -> List[MetricSummary]:
     """
     メトリクス集計情報取得
@@ -104,8 +257,18 @@ async def get_metrics_summary(
         メトリクス集計情報
     """
     try:
-        metric_service = MetricService(metrics_table)
+        metric_service = MetricService(metrics_table, rollups_table)
         result = await metric_service.get_metrics_summary(device_id=device_id)
+        _set_query_plan_header(response, metric_service)
+        
+        # 削除・過去分の更新はlatest_timestampに反映されないため、Last-Modifiedは付与せず内容のハッシュで検証
+        settings = get_settings()
+        if settings.HTTP_CACHE_ENABLED:
+            not_modified = conditional_get(
+                request, response, content_etag(result), cache_control=settings.HTTP_CACHE_CONTROL_METRICS_SUMMARY
+            )
+            if not_modified:
+                return not_modified
         return result
         
     except Exception as e:
@@ -116,10 +279,72 @@ async def get_metrics_summary(
         )
 
 
+@router.get(
+    "/metrics/aggregate",
+    response_model=MetricAggregateResponse,
+    response_model_exclude_none=True
+)
+async def get_metric_aggregates(
+    response: Response,
+    device_id: str = Query(..., description="デバイスID"),
+    metric_name: str = Query(..., description="メトリクス名"),
+    bucket: str = Query(default="5m", description="バケット幅（1m/5m/1h/1d）"),
+    agg: str = Query(default="avg,min,max", description="集計種別（カンマ区切り: avg,min,max,sum,count,p50,p90,p95,p99）"),
+    start: Optional[datetime] = Query(default=None, description="開始日時（省略時はendからAGGREGATE_MAX_BUCKETS個のバケット前）"),
+    end: Optional[datetime] = Query(default=None, description="終了日時（省略時は現在時刻）"),
+    metrics_table=Depends(get_metrics_table)
+) -> MetricAggregateResponse:
+    """
+    時間バケット単位のメトリクス集計取得（チャート用ダウンサンプリング）
+    
+    Args:
+        device_id: デバイスID
+        metric_name: メトリクス名
+        bucket: バケット幅
+        agg: 集計種別
+        start: 開始日時
+        end: 終了日時
+        
+    Returns:
+        バケットごとの集計値（期間・件数が上限を超える場合は400）
+    """
+    try:
+        if start and end and start > end:
+            raise ValidationException("start must be before end", field="start")
+        
+        settings = get_settings()
+        metric_service = MetricService(metrics_table)
+        result = await metric_service.get_metric_aggregates(
+            device_id=device_id,
+            metric_name=metric_name,
+            bucket=bucket,
+            aggregations=parse_aggregations(agg),
+            start=start,
+            end=end,
+            page_size=settings.DEVICE_METRICS_PAGE_SIZE,
+            max_buckets=settings.AGGREGATE_MAX_BUCKETS,
+            max_points=settings.AGGREGATE_MAX_POINTS
+        )
+        _set_query_plan_header(response, metric_service)
+        return result
+        
+    except PortfolioAPIException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get metric aggregates: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="メトリクス集計の取得に失敗しました"
+        )
+
+
 @router.get("/metrics/{metric_id}", response_model=MetricResponse)
 async def get_metric(
     metric_id: str,
-    metrics_table=Depends(get_metrics_table)
+    request: Request,
+    response: Response,
+    metrics_table=Depends(get_metrics_table),
+    cache=Depends(get_entity_cache)
 ) -> MetricResponse:
     """
     メトリクス詳細取得
@@ -131,7 +356,7 @@ async def get_metric(
         メトリクス詳細情報
     """
     try:
-        metric_service = MetricService(metrics_table)
+        metric_service = MetricService(metrics_table, cache=cache)
         metric = await metric_service.get_metric(metric_id)
         
         if not metric:
@@ -139,6 +364,15 @@ async def get_metric(
                 status_code=404,
                 detail="メトリクスが見つかりません"
             )
+        
+        settings = get_settings()
+        if settings.HTTP_CACHE_ENABLED:
+            not_modified = conditional_get(
+                request, response, version_etag(metric.metric_id, metric.updated_at),
+                last_modified=metric.updated_at, cache_control=settings.HTTP_CACHE_CONTROL_METRIC
+            )
+            if not_modified:
+                return not_modified
             
         return metric
         
@@ -155,22 +389,32 @@ async def get_metric(
 @router.post("/metrics", response_model=MetricResponse, status_code=201)
 async def create_metric(
     metric_data: MetricCreate,
-    metrics_table=Depends(get_metrics_table)
+    response: Response,
+    metrics_table=Depends(get_metrics_table),
+    rollups_table=Depends(get_rollups_table),
+    cache=Depends(get_entity_cache),
+    write_buffer=Depends(get_metric_write_buffer),
+    wal=Depends(get_metric_wal)
 ) -> MetricResponse:
     """
     メトリクス作成
+    ライトビハインド・WALモードではキュー/WALへの登録のみ行い202を返す（上限超過時は429）
     
     Args:
         metric_data: メトリクス作成データ
         
     Returns:
-        作成されたメトリクス情報
+        作成（受付）されたメトリクス情報
     """
     try:
-        metric_service = MetricService(metrics_table)
+        metric_service = MetricService(metrics_table, rollups_table, cache, write_buffer=write_buffer, wal=wal)
         new_metric = await metric_service.create_metric(metric_data)
+        if write_buffer is not None or wal is not None:
+            response.status_code = 202
         return new_metric
         
+    except PortfolioAPIException:
+        raise
     except Exception as e:
         logger.error(f"Failed to create metric: {e}")
         raise HTTPException(
@@ -179,11 +423,72 @@ async def create_metric(
         )
 
 
+@router.post("/metrics/batch", response_model=MetricBatchResponse)
+async def create_metrics_batch(
+    request: Request,
+    metrics_table=Depends(get_metrics_table),
+    rollups_table=Depends(get_rollups_table),
+    cache=Depends(get_entity_cache)
+) -> MetricBatchResponse:
+    """
+    メトリクス一括作成
+    
+    リクエストボディはMetricCreateのJSON配列、またはNDJSON
+    (Content-Type: application/x-ndjson) を受け付ける
+    
+    Returns:
+        項目別の登録結果
+    """
+    try:
+        settings = get_settings()
+        body = await request.body()
+        content_type = request.headers.get("content-type", "")
+        
+        try:
+            if any(t in content_type for t in NDJSON_CONTENT_TYPES):
+                raw_items = [json.loads(line) for line in body.splitlines() if line.strip()]
+            else:
+                raw_items = json.loads(body)
+        except ValueError as e:
+            raise ValidationException(f"Invalid request body: {e}", field="body")
+        
+        if not isinstance(raw_items, list):
+            raise ValidationException("Request body must be a JSON array or NDJSON", field="body")
+        if len(raw_items) > settings.METRICS_BATCH_MAX_ITEMS:
+            raise ValidationException(
+                f"Too many items (max {settings.METRICS_BATCH_MAX_ITEMS})",
+                field="body",
+                value=len(raw_items)
+            )
+        
+        # 項目ごとにバリデーションし、不正な項目は個別の失敗として返す
+        metrics = []
+        for raw_item in raw_items:
+            try:
+                metrics.append(MetricCreate.model_validate(raw_item))
+            except PydanticValidationError as e:
+                metrics.append(e)
+        
+        metric_service = MetricService(metrics_table, rollups_table, cache)
+        return await metric_service.create_metrics_batch(metrics)
+        
+    except PortfolioAPIException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to create metrics batch: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="メトリクスの一括作成に失敗しました"
+        )
+
+
 @router.put("/metrics/{metric_id}", response_model=MetricResponse)
 async def update_metric(
     metric_id: str,
     metric_data: MetricUpdate,
-    metrics_table=Depends(get_metrics_table)
+    metrics_table=Depends(get_metrics_table),
+    rollups_table=Depends(get_rollups_table),
+    cache=Depends(get_entity_cache)
 ) -> MetricResponse:
     """
     メトリクス更新
@@ -196,21 +501,13 @@ async def update_metric(
         更新されたメトリクス情報
     """
     try:
-        metric_service = MetricService(metrics_table)
-        
-        # メトリクス存在確認
-        existing_metric = await metric_service.get_metric(metric_id)
-        if not existing_metric:
-            raise HTTPException(
-                status_code=404,
-                detail="メトリクスが見つかりません"
-            )
+        metric_service = MetricService(metrics_table, rollups_table, cache)
         
         # 更新実行
         updated_metric = await metric_service.update_metric(metric_id, metric_data)
         return updated_metric
         
-    except HTTPException:
+    except PortfolioAPIException:
         raise
     except Exception as e:
         logger.error(f"Failed to update metric {metric_id}: {e}")
@@ -223,7 +520,9 @@ async def update_metric(
 @router.delete("/metrics/{metric_id}")
 async def delete_metric(
     metric_id: str,
-    metrics_table=Depends(get_metrics_table)
+    metrics_table=Depends(get_metrics_table),
+    rollups_table=Depends(get_rollups_table),
+    cache=Depends(get_entity_cache)
 ) -> dict:
     """
     メトリクス削除
@@ -235,15 +534,7 @@ async def delete_metric(
         削除結果
     """
     try:
-        metric_service = MetricService(metrics_table)
-        
-        # メトリクス存在確認
-        existing_metric = await metric_service.get_metric(metric_id)
-        if not existing_metric:
-            raise HTTPException(
-                status_code=404,
-                detail="メトリクスが見つかりません"
-            )
+        metric_service = MetricService(metrics_table, rollups_table, cache)
         
         # 削除実行
         await metric_service.delete_metric(metric_id)
@@ -253,7 +544,7 @@ async def delete_metric(
             "metric_id": metric_id
         }
         
-    except HTTPException:
+    except PortfolioAPIException:
         raise
     except Exception as e:
         logger.error(f"Failed to delete metric {metric_id}: {e}")
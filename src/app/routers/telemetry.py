@@ -0,0 +1,33 @@
+"""
+Telemetry Router
+計測値（Prometheusテキスト形式）の内部向けエンドポイント
+"""
+
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import get_settings
+from app.core.telemetry import PROMETHEUS_CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+settings = get_settings()
+
+
+def verify_metrics_token(authorization: Optional[str] = Header(default=None)) -> None:
+    """
+    Authorization: Bearer <TELEMETRY_METRICS_TOKEN> を検証
+    ルート別のレイテンシやテーブル名を含むため、トークンが一致しない場合は401
+    """
+    token = get_settings().TELEMETRY_METRICS_TOKEN
+    expected = f"Bearer {token}".encode()
+    if not token or authorization is None or not hmac.compare_digest(authorization.encode(), expected):
+        raise HTTPException(status_code=401, detail="Unauthorized", headers={"WWW-Authenticate": "Bearer"})
+
+
+@router.get(settings.TELEMETRY_METRICS_PATH, include_in_schema=False, dependencies=[Depends(verify_metrics_token)])
+async def prometheus_metrics() -> PlainTextResponse:
+    """計測値（Prometheusテキスト形式）"""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
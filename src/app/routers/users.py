@@ -4,23 +4,29 @@ Users Router
 """
 
 import logging
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from botocore.exceptions import ClientError
 
+from app.core.config import get_settings
+from app.core.exceptions import PortfolioAPIException
+from app.core.http_cache import conditional_get, version_etag
+from app.core.responses import fast_json_response
+from app.core.tracing import TracedRoute
 from app.models.user import UserCreate, UserUpdate, UserResponse, UserListResponse
-from app.dependencies import get_users_table
+from app.dependencies import get_entity_cache, get_user_reservations_table, get_users_table
 from app.services.user_service import UserService
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 
 @router.get("/users", response_model=UserListResponse)
 async def get_users(
     limit: int = Query(default=10, ge=1, le=100, description="取得件数"),
-    offset: int = Query(default=0, ge=0, description="オフセット"),
+    offset: int = Query(default=0, ge=0, description="オフセット（非推奨: cursorを使用）"),
+    cursor: Optional[str] = Query(default=None, description="前ページのnext_cursor"),
     users_table=Depends(get_users_table)
 ) -> UserListResponse:
     """
@@ -28,16 +34,22 @@ async def get_users(
     
     Args:
         limit: 取得件数 (1-100)
-        offset: オフセット
+        offset: オフセット（非推奨）
+        cursor: 次ページ取得用カーソル
         
     Returns:
         ユーザー一覧
     """
     try:
         user_service = UserService(users_table)
-        result = await user_service.get_users(limit=limit, offset=offset)
+        result = await user_service.get_users(limit=limit, offset=offset, cursor=cursor)
+        if get_settings().RESPONSE_FAST_PATH:
+            # サービス層で検証済みのため、response_modelによる再検証を省略してエンコード
+            return fast_json_response(result)
         return result
         
+    except PortfolioAPIException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get users: {e}")
         raise HTTPException(
@@ -49,7 +61,10 @@ async def get_users(
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
-    users_table=Depends(get_users_table)
+    request: Request,
+    response: Response,
+    users_table=Depends(get_users_table),
+    cache=Depends(get_entity_cache)
 ) -> UserResponse:
     """
     ユーザー詳細取得
@@ -61,7 +76,7 @@ async def get_user(
         ユーザー詳細情報
     """
     try:
-        user_service = UserService(users_table)
+        user_service = UserService(users_table, cache)
         user = await user_service.get_user(user_id)
         
         if not user:
@@ -69,6 +84,15 @@ async def get_user(
                 status_code=404,
                 detail="ユーザーが見つかりません"
             )
+        
+        settings = get_settings()
+        if settings.HTTP_CACHE_ENABLED:
+            not_modified = conditional_get(
+                request, response, version_etag(user.user_id, user.updated_at),
+                last_modified=user.updated_at, cache_control=settings.HTTP_CACHE_CONTROL_USER
+            )
+            if not_modified:
+                return not_modified
             
         return user
         
@@ -85,7 +109,9 @@ async def get_user(
 @router.post("/users", response_model=UserResponse, status_code=201)
 async def create_user(
     user_data: UserCreate,
-    users_table=Depends(get_users_table)
+    users_table=Depends(get_users_table),
+    cache=Depends(get_entity_cache),
+    reservations_table=Depends(get_user_reservations_table)
 ) -> UserResponse:
     """
     ユーザー作成
@@ -97,29 +123,13 @@ async def create_user(
         作成されたユーザー情報
     """
     try:
-        user_service = UserService(users_table)
+        user_service = UserService(users_table, cache, reservations_table)
         
-        # ユーザー名の重複チェック
-        existing_user = await user_service.get_user_by_username(user_data.username)
-        if existing_user:
-            raise HTTPException(
-                status_code=400,
-                detail="このユーザー名は既に使用されています"
-            )
-        
-        # メールアドレスの重複チェック
-        existing_email = await user_service.get_user_by_email(str(user_data.email))
-        if existing_email:
-            raise HTTPException(
-                status_code=400,
-                detail="このメールアドレスは既に使用されています"
-            )
-        
-        # ユーザー作成
+        # ユーザー作成（username/emailの重複はUserAlreadyExistsException）
         new_user = await user_service.create_user(user_data)
         return new_user
         
-    except HTTPException:
+    except PortfolioAPIException:
         raise
     except Exception as e:
         logger.error(f"Failed to create user: {e}")
@@ -133,7 +143,9 @@ async def create_user(
 async def update_user(
     user_id: str,
     user_data: UserUpdate,
-    users_table=Depends(get_users_table)
+    users_table=Depends(get_users_table),
+    cache=Depends(get_entity_cache),
+    reservations_table=Depends(get_user_reservations_table)
 ) -> UserResponse:
     """
     ユーザー情報更新
@@ -146,21 +158,13 @@ async def update_user(
         更新されたユーザー情報
     """
     try:
-        user_service = UserService(users_table)
-        
-        # ユーザー存在確認
-        existing_user = await user_service.get_user(user_id)
-        if not existing_user:
-            raise HTTPException(
-                status_code=404,
-                detail="ユーザーが見つかりません"
-            )
+        user_service = UserService(users_table, cache, reservations_table)
         
         # 更新実行
         updated_user = await user_service.update_user(user_id, user_data)
         return updated_user
         
-    except HTTPException:
+    except PortfolioAPIException:
         raise
     except Exception as e:
         logger.error(f"Failed to update user {user_id}: {e}")
@@ -173,7 +177,9 @@ async def update_user(
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: str,
-    users_table=Depends(get_users_table)
+    users_table=Depends(get_users_table),
+    cache=Depends(get_entity_cache),
+    reservations_table=Depends(get_user_reservations_table)
 ) -> dict:
     """
     ユーザー削除
@@ -185,15 +191,7 @@ async def delete_user(
         削除結果
     """
     try:
-        user_service = UserService(users_table)
-        
-        # ユーザー存在確認
-        existing_user = await user_service.get_user(user_id)
-        if not existing_user:
-            raise HTTPException(
-                status_code=404,
-                detail="ユーザーが見つかりません"
-            )
+        user_service = UserService(users_table, cache, reservations_table)
         
         # 削除実行
         await user_service.delete_user(user_id)
@@ -203,7 +201,7 @@ async def delete_user(
             "user_id": user_id
         }
         
-    except HTTPException:
+    except PortfolioAPIException:
         raise
     except Exception as e:
         logger.error(f"Failed to delete user {user_id}: {e}")
@@ -0,0 +1,156 @@
+"""
+Aggregation Service
+時間バケット単位のメトリクス集計（ダウンサンプリング）
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.exceptions import ValidationException
+
+# バケット幅（秒）
+BUCKET_SECONDS: Dict[str, int] = {
+    "1m": 60,
+    "5m": 300,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+# パーセンタイル集計（集計名 -> 分位点）
+PERCENTILES: Dict[str, float] = {
+    "p50": 0.50,
+    "p90": 0.90,
+    "p95": 0.95,
+    "p99": 0.99,
+}
+
+SUPPORTED_AGGREGATIONS: Tuple[str, ...] = ("avg", "min", "max", "sum", "count") + tuple(PERCENTILES)
+
+
+def parse_bucket(bucket: str) -> int:
+    """バケット指定（1m/5m/1h/1d）を秒数に変換"""
+    try:
+        return BUCKET_SECONDS[bucket]
+    except KeyError:
+        raise ValidationException(
+            f"Unsupported bucket (allowed: {', '.join(BUCKET_SECONDS)})",
+            field="bucket",
+            value=bucket
+        )
+
+
+def parse_aggregations(agg: str) -> List[str]:
+    """カンマ区切りの集計指定を検証してリストに変換（重複は除外）"""
+    aggregations: List[str] = []
+    for name in (part.strip().lower() for part in agg.split(",")):
+        if not name:
+            continue
+        if name not in SUPPORTED_AGGREGATIONS:
+            raise ValidationException(
+                f"Unsupported aggregation (allowed: {', '.join(SUPPORTED_AGGREGATIONS)})",
+                field="agg",
+                value=name
+            )
+        if name not in aggregations:
+            aggregations.append(name)
+
+    if not aggregations:
+        raise ValidationException("At least one aggregation is required", field="agg")
+    return aggregations
+
+
+def resolve_window(
+    bucket_seconds: int,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    max_buckets: int
+) -> Tuple[datetime, datetime]:
+    """
+    集計対象の期間を決定
+    endの省略時は現在時刻、startの省略時はendのmax_buckets個分のバケット前とし、
+    期間がmax_buckets個のバケットを超える場合はValidationException
+    """
+    max_window = timedelta(seconds=bucket_seconds * max_buckets)
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - max_window
+
+    if start > end:
+        raise ValidationException("start must be before end", field="start")
+    if end - start > max_window:
+        raise ValidationException(
+            f"Time window too large for the bucket (max {max_buckets} buckets); narrow start/end or use a wider bucket",
+            field="start",
+            value=start.isoformat()
+        )
+    return start, end
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def to_epoch_seconds(timestamps: Sequence[str]) -> np.ndarray:
+    """保存形式のISO 8601タイムスタンプ列をUNIX秒の配列に変換"""
+    def _parse(value: str) -> float:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+    return np.fromiter((_parse(ts) for ts in timestamps), dtype=np.float64, count=len(timestamps))
+
+
+def bucket_aggregate(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    bucket_seconds: int,
+    aggregations: Iterable[str]
+) -> Dict[str, np.ndarray]:
+    """
+    UNIX秒・値の列配列をバケット単位に集計
+    (バケット, 値)で1回ソートし、各バケットの区間に対するreduceat/インデックス参照で
+    全集計をまとめて計算する（項目ごとのPythonループは行わない）
+
+    Returns:
+        "bucket"（バケット開始のUNIX秒）、"count"と指定集計ごとの配列
+    """
+    aggregations = list(aggregations)
+    if timestamps.size == 0:
+        empty = {"bucket": np.empty(0, dtype=np.int64), "count": np.empty(0, dtype=np.int64)}
+        empty.update({name: np.empty(0, dtype=np.float64) for name in aggregations if name != "count"})
+        return empty
+
+    bucket_ids = np.floor_divide(timestamps, bucket_seconds).astype(np.int64)
+    order = np.lexsort((values, bucket_ids))
+    bucket_ids = bucket_ids[order]
+    sorted_values = values[order].astype(np.float64, copy=False)
+
+    # バケットごとの先頭位置と件数
+    buckets, starts, counts = np.unique(bucket_ids, return_index=True, return_counts=True)
+    ends = starts + counts - 1
+
+    result: Dict[str, np.ndarray] = {"bucket": buckets * bucket_seconds, "count": counts}
+    sums = None
+    for name in aggregations:
+        if name == "count":
+            continue
+        if name in ("sum", "avg"):
+            if sums is None:
+                sums = np.add.reduceat(sorted_values, starts)
+            result[name] = sums if name == "sum" else sums / counts
+        elif name == "min":
+            # バケット内は値の昇順に並んでいるため先頭が最小
+            result[name] = sorted_values[starts]
+        elif name == "max":
+            result[name] = sorted_values[ends]
+        else:
+            # 線形補間のパーセンタイル（numpy.percentileの既定と同じ定義）
+            position = starts + PERCENTILES[name] * (counts - 1)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            fraction = position - lower
+            result[name] = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+    return result
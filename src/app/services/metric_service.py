@@ -3,82 +3,259 @@ Metric Service
 メトリクス管理ビジネスロジック
 """
 
+import asyncio
+import functools
+import json
 import logging
-from datetime import datetime, timezone
-from typing import Optional, List
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, List, Tuple, Union
 import uuid
+from dataclasses import dataclass, field
 
+import numpy as np
+
+from app.cache import CacheBackend
+from app.core.broadcast import BroadcastHub, get_broadcast_hub
+from app.core.config import get_settings
+from app.core.dynamodb import (
+    as_async_table, is_conditional_check_failed, is_throttling_error, serialize_item, to_dynamodb_value
+)
+from app.core.exceptions import MetricNotFoundException, ValidationException
+from app.core.singleflight import SingleFlight, get_single_flight, make_key
+from app.core.tracing import trace_methods
+from app.core.wal import WriteAheadLog
+from app.core.write_buffer import WriteBehindBuffer
+from app.core.pagination import collect_items, decode_cursor, encode_cursor, iterate_items
 from app.models.metric import (
     MetricCreate, MetricUpdate, MetricResponse, 
-    MetricListResponse, MetricSummary, MetricStatus
+    MetricListResponse, MetricSummary, MetricStatus,
+    MetricBatchItemResult, MetricBatchResponse,
+    MetricAggregateBucket, MetricAggregateResponse
 )
+from app.services.aggregation_service import bucket_aggregate, parse_bucket, resolve_window, to_epoch_seconds
+from app.services.rollup_service import RollupService, aggregate_items, rollup_to_summary
 
 logger = logging.getLogger(__name__)
 
+# BatchWriteItemの1リクエストあたりの最大件数
+BATCH_WRITE_CHUNK_SIZE = 25
+
+# metric_idで項目を引くGSI（テーブルのキーはdevice_id + timestamp）
+METRIC_ID_INDEX = "metric-id-index"
+
+# Settings.ROLLUP_MODE
+ROLLUP_MODE_INLINE = "inline"
+ROLLUP_MODE_DISABLED = "disabled"
+
+# Settings.METRICS_WRITE_MODE
+WRITE_MODE_SYNC = "sync"
+WRITE_MODE_WRITE_BEHIND = "write_behind"
+WRITE_MODE_WAL = "wal"
+
+
+def _to_timestamp_key(value: datetime) -> str:
+    """datetimeを保存形式（UTCのISO 8601文字列）に変換"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def _make_keys_unique(items: Iterable[Dict[str, Any]]) -> None:
+    """
+    同一デバイスでtimestampが重複する項目を1マイクロ秒ずつずらす
+    （BatchWriteItem内でキー（device_id + timestamp）が重複するとチャンク全体が拒否されるため）
+    """
+    used = set()
+    for item in items:
+        key = (item['device_id'], item['timestamp'])
+        if key in used:
+            timestamp = datetime.fromisoformat(item['timestamp'])
+            while key in used:
+                timestamp += timedelta(microseconds=1)
+                key = (item['device_id'], _to_timestamp_key(timestamp))
+            item['timestamp'] = key[1]
+        used.add(key)
+
+
+def _latest_cache_tag(device_id: Optional[str]) -> str:
+    """最新メトリクスのキャッシュタグ（device_id未指定は全デバイス分）"""
+    return f"metrics:latest:{device_id or '*'}"
+
 
+@dataclass
+class QueryPlan:
+    """メトリクス読み取りのクエリプラン"""
+    operation: str
+    index_name: Optional[str] = None
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    
+    def describe(self) -> str:
+        """デバッグヘッダー用のプラン表記"""
+        if self.operation == 'scan':
+            return 'scan'
+        return f"query:{self.index_name or 'primary'}"
+
+
+@trace_methods
 class MetricService:
     """メトリクス管理サービス"""
     
-    def __init__(self, metrics_table):
-        self.metrics_table = metrics_table
+    def __init__(
+        self,
+        metrics_table,
+        rollups_table=None,
+        cache: Optional[CacheBackend] = None,
+        single_flight: Optional[SingleFlight] = None,
+        broadcast_hub: Optional[BroadcastHub] = None,
+        write_buffer: Optional[WriteBehindBuffer] = None,
+        wal: Optional[WriteAheadLog] = None
+    ):
+        self.metrics_table = as_async_table(metrics_table)
+        self.cache = cache
+        self.single_flight = single_flight if single_flight is not None else get_single_flight()
+        self.broadcast_hub = broadcast_hub if broadcast_hub is not None else get_broadcast_hub()
+        self.write_buffer = write_buffer
+        self.wal = wal
+        self.rollup_service = RollupService(rollups_table) if rollups_table is not None else None
+        self.last_query_plan: Optional[QueryPlan] = None
+    
+    async def _coalesce(self, operation: str, func, **params) -> Any:
+        """同一パラメーターで実行中の読み取りがあれば、その結果を共有する"""
+        if self.single_flight is None:
+            return await func(**params)
+        key = make_key(f"metrics:{self.metrics_table.name}:{operation}", **params)
+        return await self.single_flight.do(key, functools.partial(func, **params))
+    
+    def plan_metrics_query(
+        self,
+        device_id: Optional[str] = None,
+        status: Optional[MetricStatus] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        metric_name: Optional[str] = None
+    ) -> QueryPlan:
+        """
+        メトリクス読み取りのクエリプランを作成
+        キー（device_id + timestamp / status-index）で絞り込める場合はQuery、
+        該当するキーがない場合のみScanにフォールバック
+        """
+        names: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+        filters: List[str] = []
+        
+        # 時間範囲条件（ソートキーのtimestampに対するBETWEEN/比較）
+        range_condition = None
+        if start or end:
+            names['#ts'] = 'timestamp'
+            if start and end:
+                range_condition = "#ts BETWEEN :start AND :end"
+            elif start:
+                range_condition = "#ts >= :start"
+            else:
+                range_condition = "#ts <= :end"
+            if start:
+                values[':start'] = _to_timestamp_key(start)
+            if end:
+                values[':end'] = _to_timestamp_key(end)
+        
+        if device_id:
+            # プライマリキー（device_id + timestamp）でQuery
+            operation, index_name = 'query', None
+            key_conditions = ["device_id = :device_id"]
+            values[':device_id'] = device_id
+            if status:
+                names['#status'] = 'status'
+                values[':status'] = status.value
+                filters.append("#status = :status")
+        elif status:
+            # status-index（status + timestamp）でQuery
+            operation, index_name = 'query', 'status-index'
+            names['#status'] = 'status'
+            values[':status'] = status.value
+            key_conditions = ["#status = :status"]
+        else:
+            # 利用できるキーがないためScan
+            operation, index_name = 'scan', None
+            key_conditions = []
+        
+        if metric_name:
+            names['#metric_name'] = 'metric_name'
+            values[':metric_name'] = metric_name
+            filters.append("#metric_name = :metric_name")
+        
+        if range_condition:
+            if key_conditions:
+                key_conditions.append(range_condition)
+            else:
+                filters.append(range_condition)
+        
+        kwargs: Dict[str, Any] = {}
+        if index_name:
+            kwargs['IndexName'] = index_name
+        if key_conditions:
+            kwargs['KeyConditionExpression'] = " AND ".join(key_conditions)
+        if filters:
+            kwargs['FilterExpression'] = " AND ".join(filters)
+        if names:
+            kwargs['ExpressionAttributeNames'] = names
+        if values:
+            kwargs['ExpressionAttributeValues'] = values
+        
+        plan = QueryPlan(operation=operation, index_name=index_name, kwargs=kwargs)
+        self.last_query_plan = plan
+        logger.debug(f"Metrics query plan: {plan.describe()}")
+        return plan
+    
+    async def _execute_plan(self, plan: QueryPlan, **kwargs) -> Dict[str, Any]:
+        """クエリプランを1回実行"""
+        operation = getattr(self.metrics_table, plan.operation)
+        return await operation(**plan.kwargs, **kwargs)
     
     async def get_metrics(
         self, 
         limit: int = 10, 
         offset: int = 0,
         device_id: Optional[str] = None,
-        status: Optional[MetricStatus] = None
+        status: Optional[MetricStatus] = None,
+        cursor: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
     ) -> MetricListResponse:
         """メトリクス一覧取得"""
         try:
-            # フィルター条件を構築
-            filter_expression = None
-            expression_attribute_values = {}
-            
-            if device_id:
-                filter_expression = "device_id = :device_id"
-                expression_attribute_values[':device_id'] = device_id
-                
-            if status:
-                if filter_expression:
-                    filter_expression += " AND #status = :status"
-                else:
-                    filter_expression = "#status = :status"
-                expression_attribute_values[':status'] = status.value
-                expression_attribute_values['#status'] = 'status'
+            settings = get_settings()
+            plan = self.plan_metrics_query(device_id=device_id, status=status, start=start, end=end)
+            # カーソルは同じプラン・同じ条件の一覧でのみ有効
+            conditions = json.dumps(plan.kwargs.get('ExpressionAttributeValues', {}), sort_keys=True)
+            scope = f"metrics:{plan.describe()}:{conditions}"
+            request_kwargs = {}
             
-            # DynamoDBからメトリクス一覧を取得
-            scan_kwargs = {
-                'Limit': limit
-            }
+            # カーソルがある場合はExclusiveStartKeyから続きを取得
+            start_key = decode_cursor(cursor, settings.CURSOR_SECRET_KEY, scope=scope)
+            if start_key:
+                request_kwargs['ExclusiveStartKey'] = start_key
             
-            if filter_expression:
-                scan_kwargs['FilterExpression'] = filter_expression
-                scan_kwargs['ExpressionAttributeValues'] = expression_attribute_values
-                
-            if filter_expression and '#status' in expression_attribute_values:
-                scan_kwargs['ExpressionAttributeNames'] = {'#status': 'status'}
+            # 後方互換のoffset指定（カーソル未指定時のみ、offset+limit件までの有界な読み取り）
+            skip = offset if offset and offset > 0 and not start_key else 0
             
-            # offsetがある場合は簡易的な実装
-            if offset and offset > 0:
-                response = self.metrics_table.scan()
-                items = response.get('Items', [])
-                if offset < len(items):
-                    items = items[offset:offset + limit]
-                else:
-                    items = []
-                count = len(items)
+            if skip:
+                items, last_key = await collect_items(
+                    functools.partial(self._execute_plan, plan), request_kwargs, skip + limit
+                )
+                items = items[skip:]
             else:
-                response = self.metrics_table.scan(**scan_kwargs)
+                response = await self._execute_plan(plan, Limit=limit, **request_kwargs)
                 items = response.get('Items', [])
-                count = response.get('Count', 0)
+                last_key = response.get('LastEvaluatedKey')
             
             metrics = [MetricResponse(**item) for item in items]
             return MetricListResponse(
                 metrics=metrics,
-                total_count=count,
+                total_count=len(metrics),
                 limit=limit,
-                offset=offset
+                offset=offset,
+                next_cursor=encode_cursor(last_key, settings.CURSOR_SECRET_KEY, scope=scope)
             )
         except Exception as e:
             logger.error(f"Failed to get metrics: {e}")
@@ -91,136 +268,345 @@ class MetricService:
     ) -> List[MetricResponse]:
         """最新メトリクス取得"""
         try:
-            if device_id:
-                # 特定デバイスの最新メトリクス（timestamp-indexを使用）
-                response = self.metrics_table.query(
-                    IndexName='timestamp-index',
-                    KeyConditionExpression='device_id = :device_id',
-                    ExpressionAttributeValues={':device_id': device_id},
-                    ScanIndexForward=False,  # 降順（最新順）
-                    Limit=limit
-                )
-            else:
-                # 全デバイスの最新メトリクス
-                response = self.metrics_table.scan(
-                    Limit=limit
-                )
-            
-            items = response.get('Items', [])
-            # タイムスタンプでソート（最新順）
-            items.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+            cache_key = f"metrics:latest:{device_id or '*'}:{limit}"
+            if self.cache is not None:
+                cached = await self.cache.get(cache_key, List[MetricResponse])
+                if cached is not None:
+                    return cached
             
-            return [MetricResponse(**item) for item in items[:limit]]
+            return await self._coalesce(
+                'latest', self._load_latest_metrics, cache_key=cache_key, device_id=device_id, limit=limit
+            )
         except Exception as e:
             logger.error(f"Failed to get latest metrics: {e}")
             raise
     
+    async def _load_latest_metrics(self, cache_key: str, device_id: Optional[str], limit: int) -> List[MetricResponse]:
+        """最新メトリクスをDynamoDBから読み出してキャッシュに登録"""
+        plan = self.plan_metrics_query(device_id=device_id)
+        if plan.operation == 'query':
+            # 特定デバイスの最新メトリクス（timestampソートキーの降順）
+            response = await self._execute_plan(plan, ScanIndexForward=False, Limit=limit)
+        else:
+            # 全デバイスの最新メトリクス
+            response = await self._execute_plan(plan, Limit=limit)
+        
+        items = response.get('Items', [])
+        # タイムスタンプでソート（最新順）
+        items.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+        
+        metrics = [MetricResponse(**item) for item in items[:limit]]
+        if self.cache is not None:
+            await self.cache.set(
+                cache_key,
+                metrics,
+                List[MetricResponse],
+                tags=(_latest_cache_tag(device_id),),
+                ttl_seconds=get_settings().CACHE_LATEST_TTL_SECONDS
+            )
+        return metrics
+    
+    async def iter_device_metrics(
+        self,
+        device_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[MetricResponse]:
+        """
+        デバイスの時間範囲内メトリクスを古い順に1件ずつ取得
+        キー範囲のQueryをページ単位で辿るため、全件をメモリに保持しない
+        """
+        plan = self.plan_metrics_query(device_id=device_id, start=start, end=end)
+        async for item in iterate_items(
+            functools.partial(self._execute_plan, plan),
+            {'Limit': page_size, 'ScanIndexForward': True}
+        ):
+            yield MetricResponse(**item)
+    
+    async def get_metric_aggregates(
+        self,
+        device_id: str,
+        metric_name: str,
+        bucket: str,
+        aggregations: List[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        page_size: int = 1000,
+        max_buckets: int = 1440,
+        max_points: int = 200000
+    ) -> MetricAggregateResponse:
+        """
+        時間バケット単位のメトリクス集計取得
+        キー範囲のQueryでtimestampとvalueのみを読み出し、ページごとに列配列へ変換して
+        NumPyでまとめて集計する
+        期間はmax_buckets個のバケット、読み出す件数はmax_points件までとし、超える場合はValidationException
+        """
+        try:
+            return await self._coalesce(
+                'aggregate',
+                self._compute_metric_aggregates,
+                device_id=device_id,
+                metric_name=metric_name,
+                bucket=bucket,
+                aggregations=aggregations,
+                start=start,
+                end=end,
+                page_size=page_size,
+                max_buckets=max_buckets,
+                max_points=max_points
+            )
+        except Exception as e:
+            logger.error(f"Failed to get metric aggregates: {e}")
+            raise
+    
+    async def _compute_metric_aggregates(
+        self,
+        device_id: str,
+        metric_name: str,
+        bucket: str,
+        aggregations: List[str],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        page_size: int,
+        max_buckets: int,
+        max_points: int
+    ) -> MetricAggregateResponse:
+        bucket_seconds = parse_bucket(bucket)
+        start, end = resolve_window(bucket_seconds, start, end, max_buckets)
+        plan = self.plan_metrics_query(device_id=device_id, start=start, end=end, metric_name=metric_name)
+        plan.kwargs['ProjectionExpression'] = "#ts, #value"
+        plan.kwargs['ExpressionAttributeNames'] = {
+            **plan.kwargs.get('ExpressionAttributeNames', {}),
+            '#ts': 'timestamp',
+            '#value': 'value'
+        }
+        
+        timestamp_chunks: List[np.ndarray] = []
+        value_chunks: List[np.ndarray] = []
+        request_kwargs: Dict[str, Any] = {'Limit': page_size}
+        point_count = 0
+        while True:
+            response = await self._execute_plan(plan, **request_kwargs)
+            items = response.get('Items', [])
+            point_count += len(items)
+            if point_count > max_points:
+                raise ValidationException(
+                    f"Too many points in the time window (max {max_points}); narrow start/end",
+                    field="end",
+                    value=end.isoformat()
+                )
+            if items:
+                timestamp_chunks.append(to_epoch_seconds([item['timestamp'] for item in items]))
+                value_chunks.append(np.array([item['value'] for item in items], dtype=np.float64))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            request_kwargs['ExclusiveStartKey'] = last_key
+        
+        timestamps = np.concatenate(timestamp_chunks) if timestamp_chunks else np.empty(0, dtype=np.float64)
+        values = np.concatenate(value_chunks) if value_chunks else np.empty(0, dtype=np.float64)
+        columns = bucket_aggregate(timestamps, values, bucket_seconds, aggregations)
+        
+        value_columns = {name: columns[name].tolist() for name in aggregations if name != 'count'}
+        buckets = [
+            MetricAggregateBucket(
+                timestamp=datetime.fromtimestamp(bucket_start, tz=timezone.utc),
+                count=count,
+                **{name: column[i] for name, column in value_columns.items()}
+            )
+            for i, (bucket_start, count) in enumerate(zip(columns['bucket'].tolist(), columns['count'].tolist()))
+        ]
+        
+        return MetricAggregateResponse(
+            device_id=device_id,
+            metric_name=metric_name,
+            bucket=bucket,
+            aggregations=aggregations,
+            point_count=int(timestamps.size),
+            buckets=buckets
+        )
+    
     async def get_metrics_summary(
         self, 
         device_id: Optional[str] = None
     ) -> List[MetricSummary]:
         """メトリクス集計取得"""
         try:
-            # フィルター条件を構築
-            filter_expression = None
-            expression_attribute_values = {}
-            
-            if device_id:
-                filter_expression = "device_id = :device_id"
-                expression_attribute_values[':device_id'] = device_id
-            
-            # DynamoDBからメトリクスを取得
-            scan_kwargs = {}
-            if filter_expression:
-                scan_kwargs['FilterExpression'] = filter_expression
-                scan_kwargs['ExpressionAttributeValues'] = expression_attribute_values
-            
-            response = self.metrics_table.scan(**scan_kwargs)
-            items = response.get('Items', [])
-            
-            # デバイス別に集計
-            device_summaries = {}
-            for item in items:
-                dev_id = item.get('device_id', 'unknown')
-                if dev_id not in device_summaries:
-                    device_summaries[dev_id] = {
-                        'device_id': dev_id,
-                        'total_metrics': 0,
-                        'active_metrics': 0,
-                        'latest_timestamp': None,
-                        'metric_types': set()
-                    }
-                
-                summary = device_summaries[dev_id]
-                summary['total_metrics'] += 1
-                
-                if item.get('status') == MetricStatus.ACTIVE:
-                    summary['active_metrics'] += 1
-                
-                timestamp = item.get('timestamp')
-                if timestamp and (summary['latest_timestamp'] is None or timestamp > summary['latest_timestamp']):
-                    summary['latest_timestamp'] = timestamp
-                
-                metric_name = item.get('metric_name')
-                if metric_name:
-                    summary['metric_types'].add(metric_name)
-            
-            # MetricSummaryオブジェクトに変換
-            summaries = []
-            for dev_id, summary_data in device_summaries.items():
-                summary = MetricSummary(
-                    device_id=dev_id,
-                    total_metrics=summary_data['total_metrics'],
-                    active_metrics=summary_data['active_metrics'],
-                    latest_timestamp=summary_data['latest_timestamp'],
-                    metric_types=list(summary_data['metric_types'])
-                )
-                summaries.append(summary)
-            
-            return summaries
+            return await self._coalesce('summary', self._load_metrics_summary, device_id=device_id)
         except Exception as e:
             logger.error(f"Failed to get metrics summary: {e}")
             raise
     
+    async def _load_metrics_summary(self, device_id: Optional[str]) -> List[MetricSummary]:
+        if self.rollup_service:
+            return await self._get_rollup_summaries(device_id)
+        
+        # device_id指定時はプライマリキーでQuery、未指定時のみScan
+        plan = self.plan_metrics_query(device_id=device_id)
+        items = [item async for item in iterate_items(functools.partial(self._execute_plan, plan), {})]
+        
+        # ロールアップ表がない場合は元データから集計
+        return [rollup_to_summary(rollup) for rollup in aggregate_items(items).values()]
+    
+    async def _get_rollup_summaries(self, device_id: Optional[str] = None) -> List[MetricSummary]:
+        """ロールアップ表から集計を取得（再集計が予約された項目のみ元データを読む）"""
+        rollups = await self.rollup_service.get_rollups(device_id)
+        summaries = []
+        
+        for rollup in rollups:
+            if rollup.get('needs_rebuild'):
+                plan = self.plan_metrics_query(device_id=rollup['device_id'])
+                items = [
+                    item async for item in iterate_items(functools.partial(self._execute_plan, plan), {})
+                    if item.get('metric_name') == rollup['metric_name']
+                ]
+                rollup = await self.rollup_service.rebuild(rollup['device_id'], rollup['metric_name'], items)
+                if rollup is None:
+                    continue
+            summaries.append(rollup_to_summary(rollup))
+        
+        return summaries
+    
+    async def rebuild_rollups(self) -> Dict[str, int]:
+        """
+        メトリクス表の全件からロールアップ表を再構築（バックフィル・不整合の修復用）
+        メトリクス表をScanするため、運用中はscripts/rebuild_metric_rollups.pyから実行する
+        """
+        if not self.rollup_service:
+            raise ValueError("Rollups table is not configured")
+        
+        plan = self.plan_metrics_query()
+        items = [item async for item in iterate_items(functools.partial(self._execute_plan, plan), {})]
+        
+        counts = await self.rollup_service.replace_all(aggregate_items(items))
+        return {'metrics': len(items), **counts}
+    
+    async def _invalidate_metric(self, metric_id: Optional[str] = None, device_ids: Iterable[str] = ()) -> None:
+        """メトリクス詳細と、対象デバイス・全デバイスの最新メトリクスのキャッシュを無効化"""
+        if self.cache is None:
+            return
+        if metric_id:
+            await self.cache.delete(f"metric:{metric_id}")
+        device_ids = set(device_ids)
+        if device_ids:
+            await self.cache.invalidate_tags(
+                _latest_cache_tag(None), *(_latest_cache_tag(device_id) for device_id in device_ids)
+            )
+    
+    def _publish(self, metrics: Iterable[MetricResponse]) -> None:
+        """作成したメトリクスをライブ配信の購読者へ送信（待機しない）"""
+        for metric in metrics:
+            self.broadcast_hub.publish(metric.device_id, metric)
+    
+    async def _apply_rollup(self, operation: str, *args) -> None:
+        """
+        ロールアップへの反映（インラインモード時のみ）
+        メトリクス本体の書き込みは成功しているため、失敗時は例外を返さず再集計を予約する
+        """
+        if not self.rollup_service or get_settings().ROLLUP_MODE != ROLLUP_MODE_INLINE:
+            return
+        try:
+            await getattr(self.rollup_service, operation)(*args)
+        except Exception as e:
+            logger.error(f"Failed to update metric rollup ({operation}): {e}")
+            # 対象のロールアップは増分が欠けている可能性があるため、次回の集計取得時に元データから再計算
+            try:
+                await self.rollup_service.mark_rebuild(args[-1])
+            except Exception as mark_error:
+                logger.error(
+                    f"Failed to mark metric rollup for rebuild "
+                    f"({args[-1].get('device_id')}/{args[-1].get('metric_name')}): {mark_error}"
+                )
+    
     async def get_metric(self, metric_id: str) -> Optional[MetricResponse]:
         """メトリクス詳細取得"""
         try:
-            response = self.metrics_table.get_item(
-                Key={'metric_id': metric_id}
-            )
+            cache_key = f"metric:{metric_id}"
+            if self.cache is not None:
+                cached = await self.cache.get(cache_key, MetricResponse)
+                if cached is not None:
+                    return cached
             
-            if 'Item' in response:
-                return MetricResponse(**response['Item'])
-            return None
+            return await self._coalesce('get', self._load_metric, cache_key=cache_key, metric_id=metric_id)
         except Exception as e:
             logger.error(f"Failed to get metric {metric_id}: {e}")
             raise
     
+    async def _load_metric(self, cache_key: str, metric_id: str) -> Optional[MetricResponse]:
+        """メトリクスをDynamoDBから読み出してキャッシュに登録"""
+        item = await self._find_metric_item(metric_id)
+        
+        if item is not None:
+            metric = MetricResponse(**item)
+            if self.cache is not None:
+                await self.cache.set(cache_key, metric, MetricResponse)
+            return metric
+        return None
+    
+    async def _find_metric_item(self, metric_id: str) -> Optional[Dict[str, Any]]:
+        """metric-id-indexでメトリクスの項目を取得（GSIのため結果整合性の読み取り）"""
+        response = await self.metrics_table.query(
+            IndexName=METRIC_ID_INDEX,
+            KeyConditionExpression='metric_id = :metric_id',
+            ExpressionAttributeValues={':metric_id': metric_id},
+            Limit=1
+        )
+        items = response.get('Items', [])
+        return items[0] if items else None
+    
+    async def _write_metric(self, metric_id: str, write) -> Dict[str, Any]:
+        """
+        metric_idの項目のキー（device_id + timestamp）を解決し、write(key)で条件付きの書き込みを実行
+        キャッシュにある場合はキャッシュから解決し、条件不成立の場合のみGSIで解決し直して再実行する
+        （作成直後でGSIに未反映の項目もキャッシュから解決できる）
+        """
+        if self.cache is not None:
+            cached = await self.cache.get(f"metric:{metric_id}", MetricResponse)
+            if cached is not None:
+                try:
+                    return await write({'device_id': cached.device_id, 'timestamp': _to_timestamp_key(cached.timestamp)})
+                except Exception as e:
+                    if not is_conditional_check_failed(e):
+                        raise
+        
+        item = await self._find_metric_item(metric_id)
+        if item is None:
+            raise MetricNotFoundException(metric_id)
+        try:
+            return await write({'device_id': item['device_id'], 'timestamp': item['timestamp']})
+        except Exception as e:
+            if is_conditional_check_failed(e):
+                # 解決後に削除された
+                raise MetricNotFoundException(metric_id)
+            raise
+    
     async def create_metric(self, metric_data: MetricCreate) -> MetricResponse:
         """メトリクス作成"""
         try:
-            metric_id = str(uuid.uuid4())
             now = datetime.now(timezone.utc)
+            metric_item = self._build_metric_item(metric_data, now)
+            metric_id = metric_item['metric_id']
             
-            metric_item = {
-                'metric_id': metric_id,
-                'device_id': metric_data.device_id,
-                'metric_name': metric_data.metric_name,
-                'value': metric_data.value,
-                'unit': metric_data.unit,
-                'status': metric_data.status.value,
-                'metadata': metric_data.metadata or {},
-                'timestamp': now.isoformat(),
-                'created_at': now.isoformat(),
-                'updated_at': now.isoformat()
-            }
+            if self.wal is not None:
+                # WAL: ローカルに永続化した時点で受け付け、DynamoDBへはWalReplayerが書き込む
+                await self.wal.append(metric_item)
+                logger.debug(f"Metric accepted to WAL: {metric_id}")
+                return MetricResponse(**metric_item)
+            
+            if self.write_buffer is not None:
+                # ライトビハインド: キューに登録して即時に返す（満杯時はRateLimitException）
+                self.write_buffer.enqueue(metric_item)
+                logger.debug(f"Metric accepted for write-behind: {metric_id}")
+                return MetricResponse(**metric_item)
             
             # DynamoDBに保存
-            self.metrics_table.put_item(Item=metric_item)
+            await self.metrics_table.put_item(Item=metric_item)
+            await self._apply_rollup('record_created', metric_item)
             
             logger.info(f"Metric created successfully: {metric_id}")
             
-            return MetricResponse(
+            metric = MetricResponse(
                 metric_id=metric_id,
                 device_id=metric_data.device_id,
                 metric_name=metric_data.metric_name,
@@ -228,68 +614,185 @@ class MetricService:
                 unit=metric_data.unit,
                 status=metric_data.status,
                 metadata=metric_data.metadata,
-                timestamp=now,
+                timestamp=metric_item['timestamp'],
                 created_at=now,
                 updated_at=now
             )
+            # ライトスルー: 作成直後の参照をキャッシュから返す
+            if self.cache is not None:
+                await self._invalidate_metric(device_ids=[metric.device_id])
+                await self.cache.set(f"metric:{metric_id}", metric, MetricResponse)
+            self._publish([metric])
+            return metric
         except Exception as e:
             logger.error(f"Failed to create metric: {e}")
             raise
     
+    async def create_metrics_batch(self, metrics: List[Union[MetricCreate, Exception]]) -> MetricBatchResponse:
+        """
+        メトリクス一括作成
+        25件ずつのBatchWriteItemを並行実行し、未処理項目はジッター付きバックオフで再試行
+        バリデーション済みでない項目（例外）は失敗として結果に含める
+        """
+        now = datetime.now(timezone.utc)
+        results: List[MetricBatchItemResult] = []
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        
+        for index, metric_data in enumerate(metrics):
+            if isinstance(metric_data, Exception):
+                results.append(MetricBatchItemResult(index=index, success=False, error=str(metric_data)))
+                continue
+            pending.append((index, self._build_metric_item(metric_data, now)))
+        
+        results.extend(await self._write_items(pending))
+        results.sort(key=lambda r: r.index)
+        success_count = sum(1 for r in results if r.success)
+        logger.info(f"Metric batch processed: {success_count}/{len(results)} succeeded")
+        
+        return MetricBatchResponse(
+            total_count=len(results),
+            success_count=success_count,
+            failure_count=len(results) - success_count,
+            results=results
+        )
+    
+    async def write_buffered(self, items: List[Dict[str, Any]]) -> List[bool]:
+        """ライトビハインドのキューから取り出した項目を書き込み、項目ごとの成否を返す"""
+        results = await self._write_items(list(enumerate(items)))
+        succeeded = {r.index for r in results if r.success}
+        return [index in succeeded for index in range(len(items))]
+    
+    async def _write_items(self, pending: List[Tuple[int, Dict[str, Any]]]) -> List[MetricBatchItemResult]:
+        """
+        項目を25件ずつのBatchWriteItemで並行して書き込み、
+        書き込めた項目をロールアップ・キャッシュ無効化・ライブ配信へ反映
+        """
+        _make_keys_unique(item for _, item in pending)
+        chunks = [pending[i:i + BATCH_WRITE_CHUNK_SIZE] for i in range(0, len(pending), BATCH_WRITE_CHUNK_SIZE)]
+        semaphore = asyncio.Semaphore(get_settings().METRICS_BATCH_CONCURRENCY)
+        
+        async def write_with_limit(chunk):
+            async with semaphore:
+                return await self._write_chunk(chunk)
+        
+        results: List[MetricBatchItemResult] = []
+        for chunk_results in await asyncio.gather(*(write_with_limit(chunk) for chunk in chunks)):
+            results.extend(chunk_results)
+        
+        # 登録できた項目をdevice_id/metric_name単位にまとめてロールアップへ反映
+        written_ids = {r.metric_id for r in results if r.success}
+        rollups = aggregate_items(item for _, item in pending if item['metric_id'] in written_ids)
+        await asyncio.gather(*(self._apply_rollup('merge', rollup) for rollup in rollups.values()))
+        await self._invalidate_metric(device_ids=(device_id for device_id, _ in rollups))
+        if self.broadcast_hub.has_subscribers:
+            self._publish(MetricResponse(**item) for _, item in pending if item['metric_id'] in written_ids)
+        return results
+    
+    async def _write_chunk(self, chunk: List[Tuple[int, Dict[str, Any]]]) -> List[MetricBatchItemResult]:
+        """
+        最大25件のBatchWriteItemを実行し、UnprocessedItems・スロットリングのみ再試行
+        それ以外のエラーは再試行せず、未書き込みの項目を失敗として返す
+        """
+        settings = get_settings()
+        table_name = self.metrics_table.name
+        requests = [{'PutRequest': {'Item': serialize_item(item)}} for _, item in chunk]
+        error = None
+        
+        for attempt in range(settings.METRICS_BATCH_MAX_RETRIES + 1):
+            if attempt > 0:
+                # フルジッター付き指数バックオフ
+                await asyncio.sleep(random.uniform(0, settings.METRICS_BATCH_RETRY_BASE_DELAY * (2 ** attempt)))
+            try:
+                response = await self.metrics_table.client_call(
+                    'batch_write_item',
+                    RequestItems={table_name: requests}
+                )
+            except Exception as e:
+                error = str(e)
+                if not is_throttling_error(e):
+                    logger.error(f"BatchWriteItem failed: {e}")
+                    break
+                logger.warning(f"BatchWriteItem throttled (attempt {attempt + 1}): {e}")
+                continue
+            
+            requests = response.get('UnprocessedItems', {}).get(table_name, [])
+            if not requests:
+                break
+            error = "Unprocessed after retries"
+        
+        failed_ids = {request['PutRequest']['Item']['metric_id']['S'] for request in requests}
+        return [
+            MetricBatchItemResult(
+                index=index,
+                metric_id=item['metric_id'],
+                success=item['metric_id'] not in failed_ids,
+                error=error if item['metric_id'] in failed_ids else None
+            )
+            for index, item in chunk
+        ]
+    
+    def _build_metric_item(self, metric_data: MetricCreate, now: datetime) -> Dict[str, Any]:
+        """MetricCreateからDynamoDB保存用の項目を構築"""
+        return {
+            'metric_id': str(uuid.uuid4()),
+            'device_id': metric_data.device_id,
+            'metric_name': metric_data.metric_name,
+            'value': metric_data.value,
+            'unit': metric_data.unit,
+            'status': metric_data.status.value,
+            'metadata': metric_data.metadata or {},
+            'timestamp': _to_timestamp_key(metric_data.timestamp or now),
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat()
+        }
+    
     async def update_metric(self, metric_id: str, metric_data: MetricUpdate) -> MetricResponse:
         """メトリクス更新"""
         try:
             now = datetime.now(timezone.utc)
+            changes = metric_data.model_dump(exclude_none=True, mode='json')
             
-            # 更新するフィールドを構築
+            # 更新するフィールドを構築（value/status等の予約語に備えて属性名は常に置換）
             update_expression = "SET updated_at = :updated_at"
             expression_attribute_values = {':updated_at': now.isoformat()}
+            expression_attribute_names = {}
             
-            if metric_data.value is not None:
-                update_expression += ", #value = :value"
-                expression_attribute_values[':value'] = metric_data.value
-                expression_attribute_values['#value'] = 'value'
-                
-            if metric_data.unit is not None:
-                update_expression += ", unit = :unit"
-                expression_attribute_values[':unit'] = metric_data.unit
-                
-            if metric_data.status is not None:
-                update_expression += ", #status = :status"
-                expression_attribute_values[':status'] = metric_data.status.value
-                expression_attribute_values['#status'] = 'status'
-                
-            if metric_data.metadata is not None:
-                update_expression += ", metadata = :metadata"
-                expression_attribute_values[':metadata'] = metric_data.metadata
+            for name, value in changes.items():
+                expression_attribute_names[f"#{name}"] = name
+                update_expression += f", #{name} = :{name}"
+                expression_attribute_values[f":{name}"] = to_dynamodb_value(value)
             
-            # DynamoDBを更新
+            # 対象のメトリクス（metric_id一致）が存在する場合のみ更新
+            expression_attribute_values[':metric_id'] = metric_id
             update_kwargs = {
-                'Key': {'metric_id': metric_id},
                 'UpdateExpression': update_expression,
+                'ConditionExpression': 'metric_id = :metric_id',
                 'ExpressionAttributeValues': expression_attribute_values,
-                'ReturnValues': 'ALL_NEW'
+                # ロールアップの差分計算に更新前の値が必要なため、更新後の値は更新前＋変更内容から組み立てる
+                'ReturnValues': 'ALL_OLD'
             }
-            
-            # ExpressionAttributeNamesが必要な場合
-            if '#value' in expression_attribute_values or '#status' in expression_attribute_values:
-                expression_attribute_names = {}
-                if '#value' in expression_attribute_values:
-                    expression_attribute_names['#value'] = 'value'
-                if '#status' in expression_attribute_values:
-                    expression_attribute_names['#status'] = 'status'
+            if expression_attribute_names:
                 update_kwargs['ExpressionAttributeNames'] = expression_attribute_names
             
-            self.metrics_table.update_item(**update_kwargs)
+            # キーの解決後、条件付きの1回の書き込みで更新（事後の読み取りなし）
+            response = await self._write_metric(
+                metric_id, lambda key: self.metrics_table.update_item(Key=key, **update_kwargs)
+            )
+            
+            old_item = response['Attributes']
+            new_item = {**old_item, **changes, 'updated_at': now.isoformat()}
+            await self._apply_rollup('record_updated', old_item, new_item)
             
-            # 更新後のメトリクス情報を取得
-            updated_metric = await self.get_metric(metric_id)
-            if not updated_metric:
-                raise ValueError(f"Metric {metric_id} not found after update")
+            updated_metric = MetricResponse(**new_item)
+            await self._invalidate_metric(metric_id, [old_item['device_id']])
+            if self.cache is not None:
+                await self.cache.set(f"metric:{metric_id}", updated_metric, MetricResponse)
                 
             logger.info(f"Metric updated successfully: {metric_id}")
             return updated_metric
             
+        except MetricNotFoundException:
+            raise
         except Exception as e:
             logger.error(f"Failed to update metric {metric_id}: {e}")
             raise
@@ -297,13 +800,25 @@ class MetricService:
     async def delete_metric(self, metric_id: str) -> bool:
         """メトリクス削除"""
         try:
-            # DynamoDBから削除
-            self.metrics_table.delete_item(
-                Key={'metric_id': metric_id}
+            # 存在する場合のみ削除し、削除した項目でロールアップを調整
+            response = await self._write_metric(
+                metric_id,
+                lambda key: self.metrics_table.delete_item(
+                    Key=key,
+                    ConditionExpression='metric_id = :metric_id',
+                    ExpressionAttributeValues={':metric_id': metric_id},
+                    ReturnValues='ALL_OLD'
+                )
             )
             
+            old_item = response['Attributes']
+            await self._invalidate_metric(metric_id, [old_item['device_id']])
+            await self._apply_rollup('record_deleted', old_item)
+            
             logger.info(f"Metric deleted successfully: {metric_id}")
             return True
+        except MetricNotFoundException:
+            raise
         except Exception as e:
             logger.error(f"Failed to delete metric {metric_id}: {e}")
             raise
\ No newline at end of file
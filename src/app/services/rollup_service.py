@@ -0,0 +1,280 @@
+"""
+Rollup Service
+メトリクス集計値（ロールアップ）の増分管理
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from app.core.dynamodb import as_async_table, is_conditional_check_failed, to_dynamodb_value
+from app.core.tracing import trace_methods
+from app.models.metric import MetricSummary
+
+logger = logging.getLogger(__name__)
+
+
+def aggregate_items(items: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """メトリクス項目をdevice_id/metric_name単位のロールアップ値に集計"""
+    rollups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    for item in items:
+        key = (item.get('device_id', 'unknown'), item.get('metric_name', 'unknown'))
+        # 読み出し元の数値型（codecの場合はint/float、リソースAPIの場合はDecimal）のまま集計
+        value = item.get('value', 0)
+        timestamp = item.get('timestamp')
+        rollup = rollups.get(key)
+
+        if rollup is None:
+            rollups[key] = {
+                'device_id': key[0],
+                'metric_name': key[1],
+                'total_count': 1,
+                'sum_value': value,
+                'min_value': value,
+                'max_value': value,
+                'latest_value': value,
+                'latest_timestamp': timestamp,
+                'latest_status': item.get('status')
+            }
+            continue
+
+        rollup['total_count'] += 1
+        rollup['sum_value'] += value
+        rollup['min_value'] = min(rollup['min_value'], value)
+        rollup['max_value'] = max(rollup['max_value'], value)
+        if timestamp and (rollup['latest_timestamp'] is None or timestamp > rollup['latest_timestamp']):
+            rollup['latest_value'] = value
+            rollup['latest_timestamp'] = timestamp
+            rollup['latest_status'] = item.get('status')
+
+    return rollups
+
+
+def rollup_to_summary(rollup: Dict[str, Any]) -> MetricSummary:
+    """ロールアップ値をMetricSummaryに変換"""
+    total_count = int(rollup['total_count'])
+    return MetricSummary(
+        device_id=rollup['device_id'],
+        metric_name=rollup['metric_name'],
+        total_count=total_count,
+        avg_value=float(rollup['sum_value']) / total_count if total_count else 0.0,
+        min_value=float(rollup['min_value']),
+        max_value=float(rollup['max_value']),
+        latest_timestamp=rollup['latest_timestamp'],
+        latest_value=float(rollup['latest_value']),
+        latest_status=rollup['latest_status']
+    )
+
+
+@trace_methods
+class RollupService:
+    """
+    メトリクスロールアップ管理サービス
+    device_id/metric_name単位で件数・合計・最小・最大・最新値を保持し、
+    集計APIを全件走査ではなくデバイス数に比例した読み取りで返す
+    """
+
+    def __init__(self, rollups_table):
+        self.rollups_table = as_async_table(rollups_table)
+
+    @staticmethod
+    def _key(item: Dict[str, Any]) -> Dict[str, str]:
+        return {'device_id': item['device_id'], 'metric_name': item['metric_name']}
+
+    async def record_created(self, item: Dict[str, Any]) -> None:
+        """メトリクス作成をロールアップに反映"""
+        for rollup in aggregate_items([item]).values():
+            await self.merge(rollup)
+
+    async def merge(self, rollup: Dict[str, Any]) -> None:
+        """
+        集計済みの値（1件または一括登録分）をロールアップにマージ
+        通常は1回の書き込みで済み、最新値の逆転や最小・最大の拡張時のみ条件付き更新を追加
+        """
+        response = await self.rollups_table.update_item(
+            Key=self._key(rollup),
+            UpdateExpression=(
+                "ADD total_count :count, sum_value :sum "
+                "SET latest_value = :latest_value, latest_timestamp = :ts, latest_status = :status"
+            ),
+            ExpressionAttributeValues={
+                ':count': rollup['total_count'],
+                ':sum': rollup['sum_value'],
+                ':latest_value': rollup['latest_value'],
+                ':ts': rollup['latest_timestamp'],
+                ':status': rollup['latest_status']
+            },
+            ReturnValues='ALL_OLD'
+        )
+        old = response.get('Attributes', {})
+
+        # より新しい最新値を上書きしていた場合は元に戻す
+        if old.get('latest_timestamp') and old['latest_timestamp'] > rollup['latest_timestamp']:
+            await self._conditional_update(
+                rollup,
+                "SET latest_value = :old_value, latest_timestamp = :old_ts, latest_status = :old_status",
+                "latest_timestamp = :ts",
+                {
+                    ':old_value': old['latest_value'],
+                    ':old_ts': old['latest_timestamp'],
+                    ':old_status': old['latest_status'],
+                    ':ts': rollup['latest_timestamp']
+                }
+            )
+
+        await self._extend_bounds(rollup, rollup['min_value'], rollup['max_value'], old)
+
+    async def record_updated(self, old_item: Dict[str, Any], new_item: Dict[str, Any]) -> None:
+        """メトリクス更新をロールアップに反映"""
+        old_value = to_dynamodb_value(old_item['value'])
+        new_value = to_dynamodb_value(new_item['value'])
+        response = await self.rollups_table.update_item(
+            Key=self._key(new_item),
+            UpdateExpression="ADD sum_value :delta",
+            ExpressionAttributeValues={':delta': new_value - old_value},
+            ReturnValues='ALL_NEW'
+        )
+        current = response.get('Attributes', {})
+
+        if current.get('latest_timestamp') == new_item['timestamp']:
+            await self._conditional_update(
+                new_item,
+                "SET latest_value = :value, latest_status = :status",
+                "latest_timestamp = :ts",
+                {':value': new_value, ':status': new_item['status'], ':ts': new_item['timestamp']}
+            )
+
+        if new_value != old_value:
+            # 旧値が最小・最大だった場合は増分では正確に更新できないため再集計を予約
+            if old_value in (current.get('min_value'), current.get('max_value')):
+                await self.mark_rebuild(new_item)
+            await self._extend_bounds(new_item, new_value, new_value, current)
+
+    async def record_deleted(self, old_item: Dict[str, Any]) -> None:
+        """メトリクス削除をロールアップに反映"""
+        value = to_dynamodb_value(old_item['value'])
+        response = await self.rollups_table.update_item(
+            Key=self._key(old_item),
+            UpdateExpression="ADD total_count :minus_one, sum_value :minus_value",
+            ExpressionAttributeValues={':minus_one': -1, ':minus_value': -value},
+            ReturnValues='ALL_NEW'
+        )
+        current = response.get('Attributes', {})
+
+        if current.get('total_count', 0) <= 0:
+            try:
+                await self.rollups_table.delete_item(
+                    Key=self._key(old_item),
+                    ConditionExpression="total_count <= :zero",
+                    ExpressionAttributeValues={':zero': 0}
+                )
+            except ClientError as e:
+                if not is_conditional_check_failed(e):
+                    raise
+            return
+
+        if (
+            value in (current.get('min_value'), current.get('max_value'))
+            or old_item.get('timestamp') == current.get('latest_timestamp')
+        ):
+            await self.mark_rebuild(old_item)
+
+    async def mark_rebuild(self, item: Dict[str, Any]) -> None:
+        """ロールアップの再集計を予約（次回の集計取得時に元データから再計算する）"""
+        await self.rollups_table.update_item(
+            Key=self._key(item),
+            UpdateExpression="SET needs_rebuild = :true",
+            ExpressionAttributeValues={':true': True}
+        )
+
+    async def get_rollups(self, device_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """ロールアップ値を取得（デバイス指定時はQuery、未指定時はロールアップ表のScan）"""
+        if device_id:
+            operation = self.rollups_table.query
+            kwargs: Dict[str, Any] = {
+                'KeyConditionExpression': "device_id = :device_id",
+                'ExpressionAttributeValues': {':device_id': device_id}
+            }
+        else:
+            operation = self.rollups_table.scan
+            kwargs = {}
+
+        rollups: List[Dict[str, Any]] = []
+        while True:
+            response = await operation(**kwargs)
+            rollups.extend(response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return rollups
+            kwargs['ExclusiveStartKey'] = last_key
+
+    async def rebuild(self, device_id: str, metric_name: str, items: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """元データからロールアップ値を再計算して保存"""
+        rollup = aggregate_items(items).get((device_id, metric_name))
+        if rollup is None:
+            await self.rollups_table.delete_item(Key={'device_id': device_id, 'metric_name': metric_name})
+            return None
+
+        await self.rollups_table.put_item(Item=rollup)
+        logger.info(f"Rollup rebuilt: {device_id}/{metric_name}")
+        return rollup
+
+    async def replace_all(self, rollups: Dict[Tuple[str, str], Dict[str, Any]]) -> Dict[str, int]:
+        """
+        元データ全件から集計したロールアップ値で表全体を置き換え（バックフィル・再構築用）
+        元データが存在しなくなったロールアップは削除する
+        """
+        stale = {(rollup['device_id'], rollup['metric_name']) for rollup in await self.get_rollups()} - set(rollups)
+
+        for rollup in rollups.values():
+            await self.rollups_table.put_item(Item=rollup)
+        for device_id, metric_name in stale:
+            await self.rollups_table.delete_item(Key={'device_id': device_id, 'metric_name': metric_name})
+
+        logger.info(f"Rollups rebuilt: {len(rollups)} written, {len(stale)} removed")
+        return {'rollups': len(rollups), 'removed': len(stale)}
+
+    async def _extend_bounds(
+        self,
+        item: Dict[str, Any],
+        min_value: Decimal,
+        max_value: Decimal,
+        current: Dict[str, Any]
+    ) -> None:
+        """最小値・最大値を条件付き更新で拡張"""
+        if current.get('min_value') is None or min_value < current['min_value']:
+            await self._conditional_update(
+                item,
+                "SET min_value = :value",
+                "attribute_not_exists(min_value) OR min_value > :value",
+                {':value': min_value}
+            )
+        if current.get('max_value') is None or max_value > current['max_value']:
+            await self._conditional_update(
+                item,
+                "SET max_value = :value",
+                "attribute_not_exists(max_value) OR max_value < :value",
+                {':value': max_value}
+            )
+
+    async def _conditional_update(
+        self,
+        item: Dict[str, Any],
+        update_expression: str,
+        condition_expression: str,
+        values: Dict[str, Any]
+    ) -> None:
+        """条件付き更新（条件不成立は他の書き込みが先行したものとして無視）"""
+        try:
+            await self.rollups_table.update_item(
+                Key=self._key(item),
+                UpdateExpression=update_expression,
+                ConditionExpression=condition_expression,
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            if not is_conditional_check_failed(e):
+                raise
@@ -3,52 +3,115 @@ User Service
 ユーザー管理ビジネスロジック
 """
 
+import functools
 import logging
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import uuid
 import hashlib
 
+from app.cache import CacheBackend
+from app.core.config import get_settings
+from app.core.dynamodb import (
+    as_async_table, is_conditional_check_failed, serialize_item, transaction_condition_failures
+)
+from app.core.exceptions import DynamoDBException, UserAlreadyExistsException, UserNotFoundException
+from app.core.singleflight import SingleFlight, get_single_flight, make_key
+from app.core.tracing import trace_methods
+from app.core.pagination import collect_items, decode_cursor, encode_cursor
 from app.models.user import UserCreate, UserUpdate, UserResponse, UserListResponse
 
 logger = logging.getLogger(__name__)
 
+USERS_CURSOR_SCOPE = "users"
 
+
+# username/email一意性予約の種別
+RESERVATION_USERNAME = "username"
+RESERVATION_EMAIL = "email"
+
+
+def _reservation_key(kind: str, value: str) -> str:
+    """予約表のキー（メールアドレスは大文字小文字を区別しない）"""
+    if kind == RESERVATION_EMAIL:
+        value = value.lower()
+    return f"{kind}#{value}"
+
+
+def _user_cache_tag(user_id: str) -> str:
+    """ユーザーに紐づくキャッシュキー（ID・ユーザー名・メール）をまとめるタグ"""
+    return f"user:{user_id}"
+
+
+@trace_methods
 class UserService:
     """ユーザー管理サービス"""
     
-    def __init__(self, users_table):
-        self.users_table = users_table
+    def __init__(
+        self,
+        users_table,
+        cache: Optional[CacheBackend] = None,
+        reservations_table=None,
+        single_flight: Optional[SingleFlight] = None
+    ):
+        self.users_table = as_async_table(users_table)
+        self.cache = cache
+        self.reservations_table = as_async_table(reservations_table) if reservations_table is not None else None
+        self.single_flight = single_flight if single_flight is not None else get_single_flight()
     
-    async def get_users(self, limit: int = 10, offset: int = 0) -> UserListResponse:
+    async def _coalesce(self, operation: str, func, **params) -> Any:
+        """同一パラメーターで実行中の読み取りがあれば、その結果を共有する"""
+        if self.single_flight is None:
+            return await func(**params)
+        key = make_key(f"users:{self.users_table.name}:{operation}", **params)
+        return await self.single_flight.do(key, functools.partial(func, **params))
+    
+    async def _cache_get(self, key: str) -> Optional[UserResponse]:
+        if self.cache is None:
+            return None
+        return await self.cache.get(key, UserResponse)
+    
+    async def _cache_user(self, user: UserResponse) -> None:
+        """ID・ユーザー名・メールの各キーでユーザーをキャッシュ"""
+        if self.cache is None:
+            return
+        tags = (_user_cache_tag(user.user_id),)
+        for key in (f"user:{user.user_id}", f"user:username:{user.username}", f"user:email:{user.email}"):
+            await self.cache.set(key, user, UserResponse, tags=tags)
+    
+    async def _invalidate_user(self, user_id: str) -> None:
+        if self.cache is not None:
+            await self.cache.invalidate_tags(_user_cache_tag(user_id))
+    
+    async def get_users(self, limit: int = 10, offset: int = 0, cursor: Optional[str] = None) -> UserListResponse:
         """ユーザー一覧取得"""
         try:
-            # DynamoDBのscan操作でユーザー一覧取得
-            scan_kwargs = {
-                'Limit': limit
-            }
+            settings = get_settings()
+            scan_kwargs = {}
             
-            # offsetがある場合はExclusiveStartKeyを設定
-            if offset and offset > 0:
-                # 簡易的なoffset実装（実際のプロダクションではより効率的な方法を使用）
-                response = self.users_table.scan()
-                items = response.get('Items', [])
-                if offset < len(items):
-                    items = items[offset:offset + limit]
-                else:
-                    items = []
-                count = len(items)
+            # カーソルがある場合はExclusiveStartKeyから続きを取得
+            start_key = decode_cursor(cursor, settings.CURSOR_SECRET_KEY, scope=USERS_CURSOR_SCOPE)
+            if start_key:
+                scan_kwargs['ExclusiveStartKey'] = start_key
+            
+            # 後方互換のoffset指定（カーソル未指定時のみ、offset+limit件までの有界な読み取り）
+            skip = offset if offset and offset > 0 and not start_key else 0
+            
+            if skip:
+                items, last_key = await collect_items(self.users_table.scan, scan_kwargs, skip + limit)
+                items = items[skip:]
             else:
-                response = self.users_table.scan(**scan_kwargs)
+                response = await self.users_table.scan(Limit=limit, **scan_kwargs)
                 items = response.get('Items', [])
-                count = response.get('Count', 0)
+                last_key = response.get('LastEvaluatedKey')
             
             users = [UserResponse(**item) for item in items]
             return UserListResponse(
                 users=users,
-                total_count=count,
+                total_count=len(users),
                 limit=limit,
-                offset=offset
+                offset=offset,
+                next_cursor=encode_cursor(last_key, settings.CURSOR_SECRET_KEY, scope=USERS_CURSOR_SCOPE)
             )
         except Exception as e:
             logger.error(f"Failed to get users: {e}")
@@ -57,31 +120,51 @@ class UserService:
     async def get_user(self, user_id: str) -> Optional[UserResponse]:
         """ユーザー詳細取得"""
         try:
-            response = self.users_table.get_item(
-                Key={'user_id': user_id}
-            )
+            cached = await self._cache_get(f"user:{user_id}")
+            if cached is not None:
+                return cached
             
-            if 'Item' in response:
-                return UserResponse(**response['Item'])
-            return None
+            return await self._coalesce('get', self._load_user, user_id=user_id)
         except Exception as e:
             logger.error(f"Failed to get user {user_id}: {e}")
             raise
     
+    async def _load_user(self, user_id: str) -> Optional[UserResponse]:
+        """ユーザーをDynamoDBから読み出してキャッシュに登録"""
+        response = await self.users_table.get_item(
+            Key={'user_id': user_id}
+        )
+        
+        if 'Item' in response:
+            user = UserResponse(**response['Item'])
+            await self._cache_user(user)
+            return user
+        return None
+    
+    async def _load_user_by_index(self, attribute: str, value: str) -> Optional[UserResponse]:
+        """GSI（username-index / email-index）でユーザーを読み出してキャッシュに登録"""
+        response = await self.users_table.query(
+            IndexName=f'{attribute}-index',
+            KeyConditionExpression=f'{attribute} = :{attribute}',
+            ExpressionAttributeValues={f':{attribute}': value}
+        )
+        
+        items = response.get('Items', [])
+        if items:
+            user = UserResponse(**items[0])
+            await self._cache_user(user)
+            return user
+        return None
+    
     async def get_user_by_username(self, username: str) -> Optional[UserResponse]:
         """ユーザー名でユーザー取得"""
         try:
-            # GSI(username-index)を使用して取得
-            response = self.users_table.query(
-                IndexName='username-index',
-                KeyConditionExpression='username = :username',
-                ExpressionAttributeValues={':username': username}
-            )
+            cached = await self._cache_get(f"user:username:{username}")
+            if cached is not None:
+                return cached
             
-            items = response.get('Items', [])
-            if items:
-                return UserResponse(**items[0])
-            return None
+            # GSI(username-index)を使用して取得
+            return await self._coalesce('username', self._load_user_by_index, attribute='username', value=username)
         except Exception as e:
             logger.error(f"Failed to get user by username {username}: {e}")
             raise
@@ -89,23 +172,21 @@ class UserService:
     async def get_user_by_email(self, email: str) -> Optional[UserResponse]:
         """メールアドレスでユーザー取得"""
         try:
-            # GSI(email-index)を使用して取得
-            response = self.users_table.query(
-                IndexName='email-index',
-                KeyConditionExpression='email = :email',
-                ExpressionAttributeValues={':email': email}
-            )
+            cached = await self._cache_get(f"user:email:{email}")
+            if cached is not None:
+                return cached
             
-            items = response.get('Items', [])
-            if items:
-                return UserResponse(**items[0])
-            return None
+            # GSI(email-index)を使用して取得
+            return await self._coalesce('email', self._load_user_by_index, attribute='email', value=email)
         except Exception as e:
             logger.error(f"Failed to get user by email {email}: {e}")
             raise
     
     async def create_user(self, user_data: UserCreate) -> UserResponse:
-        """ユーザー作成"""
+        """
+        ユーザー作成
+        予約表がある場合は、ユーザー本体とusername/emailの予約項目を1回のTransactWriteItemsで書き込む
+        """
         try:
             user_id = str(uuid.uuid4())
             now = datetime.now(timezone.utc)
@@ -126,12 +207,32 @@ class UserService:
             if hashed_password:
                 user_item['hashed_password'] = hashed_password
             
-            # DynamoDBに保存
-            self.users_table.put_item(Item=user_item)
+            if self.reservations_table is not None:
+                await self._transact_write(
+                    [
+                        {
+                            'Put': {
+                                'TableName': self.users_table.name,
+                                'Item': serialize_item(user_item),
+                                'ConditionExpression': 'attribute_not_exists(user_id)'
+                            }
+                        },
+                        self._reservation_put(RESERVATION_USERNAME, user_data.username, user_id),
+                        self._reservation_put(RESERVATION_EMAIL, user_data.email, user_id)
+                    ],
+                    {1: {'username': user_data.username}, 2: {'email': user_data.email}}
+                )
+            else:
+                # 予約表がない場合はGSIで重複確認（同時登録の競合は防げない）
+                if await self.get_user_by_username(user_data.username):
+                    raise UserAlreadyExistsException(username=user_data.username)
+                if await self.get_user_by_email(user_data.email):
+                    raise UserAlreadyExistsException(email=user_data.email)
+                await self.users_table.put_item(Item=user_item)
             
             logger.info(f"User created successfully: {user_id}")
             
-            return UserResponse(
+            user = UserResponse(
                 user_id=user_id,
                 username=user_data.username,
                 email=user_data.email,
@@ -140,6 +241,11 @@ class UserService:
                 created_at=now,
                 updated_at=now
             )
+            # ライトスルー: 作成直後の参照をキャッシュから返す
+            await self._cache_user(user)
+            return user
+        except UserAlreadyExistsException:
+            raise
         except Exception as e:
             logger.error(f"Failed to create user: {e}")
             raise
@@ -169,40 +275,210 @@ class UserService:
                 update_expression += ", is_active = :is_active"
                 expression_attribute_values[':is_active'] = user_data.is_active
             
-            # DynamoDBを更新
-            self.users_table.update_item(
-                Key={'user_id': user_id},
-                UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ReturnValues='ALL_NEW'
-            )
+            if self.reservations_table is not None and (user_data.username is not None or user_data.email is not None):
+                # username/email変更時は予約の付け替えと同一トランザクションで更新
+                updated_user = await self._update_user_with_reservations(
+                    user_id, user_data, update_expression, expression_attribute_values
+                )
+            else:
+                # 存在する場合のみ更新し、更新後の値をそのまま返す（事前・事後の読み取りなし）
+                try:
+                    response = await self.users_table.update_item(
+                        Key={'user_id': user_id},
+                        UpdateExpression=update_expression,
+                        ConditionExpression='attribute_exists(user_id)',
+                        ExpressionAttributeValues=expression_attribute_values,
+                        ReturnValues='ALL_NEW'
+                    )
+                except Exception as e:
+                    if is_conditional_check_failed(e):
+                        raise UserNotFoundException(user_id)
+                    raise
+                updated_user = UserResponse(**response['Attributes'])
             
-            # 更新後のユーザー情報を取得
-            updated_user = await self.get_user(user_id)
-            if not updated_user:
-                raise ValueError(f"User {user_id} not found after update")
+            # 旧ユーザー名・メールのキーも含めて無効化してから最新値を登録
+            await self._invalidate_user(user_id)
+            await self._cache_user(updated_user)
                 
             logger.info(f"User updated successfully: {user_id}")
             return updated_user
             
+        except (UserNotFoundException, UserAlreadyExistsException):
+            raise
         except Exception as e:
             logger.error(f"Failed to update user {user_id}: {e}")
             raise
     
+    async def _update_user_with_reservations(
+        self,
+        user_id: str,
+        user_data: UserUpdate,
+        update_expression: str,
+        expression_attribute_values: Dict[str, Any]
+    ) -> UserResponse:
+        """
+        username/emailを変更するユーザー更新
+        現在値を読み、ユーザー更新・新しい予約の作成・古い予約の削除を1つのトランザクションで実行
+        現在値から変更されていないこと（username/email一致）を条件とし、並行更新との競合を防ぐ
+        """
+        response = await self.users_table.get_item(Key={'user_id': user_id}, ConsistentRead=True)
+        current = response.get('Item')
+        if not current:
+            raise UserNotFoundException(user_id)
+        
+        transact_items = [{
+            'Update': {
+                'TableName': self.users_table.name,
+                'Key': serialize_item({'user_id': user_id}),
+                'UpdateExpression': update_expression,
+                'ConditionExpression': 'attribute_exists(user_id) AND username = :current_username AND email = :current_email',
+                'ExpressionAttributeValues': serialize_item({
+                    **expression_attribute_values,
+                    ':current_username': current['username'],
+                    ':current_email': current['email']
+                })
+            }
+        }]
+        conflicts: Dict[int, Dict[str, str]] = {}
+        for kind, new_value in ((RESERVATION_USERNAME, user_data.username), (RESERVATION_EMAIL, user_data.email)):
+            if new_value is None or _reservation_key(kind, new_value) == _reservation_key(kind, current[kind]):
+                continue
+            conflicts[len(transact_items)] = {kind: new_value}
+            transact_items.append(self._reservation_put(kind, new_value, user_id))
+            transact_items.append(self._reservation_delete(kind, current[kind], user_id))
+        
+        failed = await self._transact_write(transact_items, conflicts)
+        if failed is not None:
+            # 読み取り後にユーザーが削除・更新された場合
+            raise DynamoDBException(
+                "update_user",
+                "User was modified concurrently",
+                table_name=self.users_table.name
+            )
+        
+        changes = user_data.model_dump(exclude_none=True)
+        return UserResponse(**{**current, **changes, 'updated_at': expression_attribute_values[':updated_at']})
+    
     async def delete_user(self, user_id: str) -> bool:
         """ユーザー削除"""
         try:
-            # DynamoDBから削除
-            self.users_table.delete_item(
-                Key={'user_id': user_id}
-            )
+            # 存在する場合のみ削除
+            try:
+                response = await self.users_table.delete_item(
+                    Key={'user_id': user_id},
+                    ConditionExpression='attribute_exists(user_id)',
+                    ReturnValues='ALL_OLD'
+                )
+            except Exception as e:
+                if is_conditional_check_failed(e):
+                    raise UserNotFoundException(user_id)
+                raise
+            await self._invalidate_user(user_id)
+            
+            # 削除したユーザーのusername/email予約を解放
+            old_item = response.get('Attributes')
+            if self.reservations_table is not None and old_item:
+                await self._release_reservations(old_item)
             
             logger.info(f"User deleted successfully: {user_id}")
             return True
+        except UserNotFoundException:
+            raise
         except Exception as e:
             logger.error(f"Failed to delete user {user_id}: {e}")
             raise
     
+    async def backfill_reservations(self) -> Dict[str, int]:
+        """
+        既存ユーザーのusername/email予約項目を作成（USER_RESERVATIONS_ENABLEDを有効にする前に実行）
+        同じユーザーの予約が既にある場合はそのまま、別のユーザーが予約済みの場合は重複として数える
+        """
+        counts = {'users': 0, 'reserved': 0, 'conflicts': 0}
+        scan_kwargs: Dict[str, Any] = {}
+        while True:
+            response = await self.users_table.scan(**scan_kwargs)
+            for item in response.get('Items', []):
+                counts['users'] += 1
+                for kind in (RESERVATION_USERNAME, RESERVATION_EMAIL):
+                    try:
+                        await self.reservations_table.put_item(
+                            Item={'reservation_key': _reservation_key(kind, item[kind]), 'user_id': item['user_id']},
+                            ConditionExpression='attribute_not_exists(reservation_key) OR user_id = :user_id',
+                            ExpressionAttributeValues={':user_id': item['user_id']}
+                        )
+                        counts['reserved'] += 1
+                    except Exception as e:
+                        if not is_conditional_check_failed(e):
+                            raise
+                        counts['conflicts'] += 1
+                        logger.warning(f"Duplicate {kind} '{item[kind]}' for user {item['user_id']}: already reserved")
+            
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return counts
+            scan_kwargs['ExclusiveStartKey'] = last_key
+    
+    def _reservation_put(self, kind: str, value: str, user_id: str) -> Dict[str, Any]:
+        """予約項目の作成（未予約の場合のみ）"""
+        return {
+            'Put': {
+                'TableName': self.reservations_table.name,
+                'Item': serialize_item({
+                    'reservation_key': _reservation_key(kind, value),
+                    'user_id': user_id
+                }),
+                'ConditionExpression': 'attribute_not_exists(reservation_key)'
+            }
+        }
+    
+    def _reservation_delete(self, kind: str, value: str, user_id: str) -> Dict[str, Any]:
+        """予約項目の削除（同じユーザーの予約の場合のみ）"""
+        return {
+            'Delete': {
+                'TableName': self.reservations_table.name,
+                'Key': serialize_item({'reservation_key': _reservation_key(kind, value)}),
+                'ConditionExpression': 'attribute_not_exists(reservation_key) OR user_id = :user_id',
+                'ExpressionAttributeValues': serialize_item({':user_id': user_id})
+            }
+        }
+    
+    async def _transact_write(
+        self,
+        transact_items: List[Dict[str, Any]],
+        conflicts: Dict[int, Dict[str, str]]
+    ) -> Optional[List[int]]:
+        """
+        TransactWriteItemsを実行
+        予約項目（conflictsの位置）の条件不成立はUserAlreadyExistsExceptionとし、
+        それ以外の条件不成立は失敗位置のリストを返す
+        """
+        try:
+            await self.users_table.client_call('transact_write_items', TransactItems=transact_items)
+            return None
+        except Exception as e:
+            failed = transaction_condition_failures(e)
+            if not failed:
+                raise
+            duplicated: Dict[str, str] = {}
+            for index in failed:
+                duplicated.update(conflicts.get(index, {}))
+            if duplicated:
+                raise UserAlreadyExistsException(**duplicated)
+            return failed
+    
+    async def _release_reservations(self, user_item: Dict[str, Any]) -> None:
+        """ユーザーのusername/email予約を削除（失敗してもユーザー削除は成功扱い）"""
+        for kind in (RESERVATION_USERNAME, RESERVATION_EMAIL):
+            try:
+                await self.reservations_table.delete_item(
+                    Key={'reservation_key': _reservation_key(kind, user_item[kind])},
+                    ConditionExpression='user_id = :user_id',
+                    ExpressionAttributeValues={':user_id': user_item['user_id']}
+                )
+            except Exception as e:
+                if not is_conditional_check_failed(e):
+                    logger.error(f"Failed to release {kind} reservation for user {user_item['user_id']}: {e}")
+    
     def _hash_password(self, password: str) -> str:
         """パスワードハッシュ化"""
         return hashlib.sha256(password.encode()).hexdigest()
\ No newline at end of file
@@ -6,6 +6,7 @@ Author: Rin Nakahata
 Created: 2025-08-25
 """
 
+import asyncio
 import os
 import logging
 from contextlib import asynccontextmanager
@@ -16,18 +17,59 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 
-from app.routers import health, users, metrics
+from app.routers import health, users, metrics, devices, telemetry
+from app.core.broadcast import get_broadcast_hub
+from app.core.compression import ENCODING_BROTLI, ENCODING_GZIP, ENCODING_ZSTD
 from app.core.config import get_settings
 from app.core.logging import setup_logging
 from app.core.error_handlers import register_exception_handlers
-from app.dependencies import get_dynamodb_client
+from app.core.startup import STARTUP_MODE_EAGER, get_startup_state
+from app.core.tracing import setup_tracing, shutdown_tracing
+from app.middleware import CompressionMiddleware, RequestContextMiddleware, RequestMetricsMiddleware
+from app.dependencies import (
+    get_dynamodb_client, get_dynamodb_resource, get_metric_wal, close_cache_backend,
+    close_dynamodb_resources, close_metric_wal, close_metric_write_buffer
+)
+
+# 設定読み込み
+settings = get_settings()
 
 # ログ設定
-setup_logging()
+setup_logging(
+    log_level=settings.LOG_LEVEL,
+    log_file=settings.LOG_FILE or None,
+    async_logging=settings.LOG_ASYNC,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    batch_size=settings.LOG_BATCH_SIZE,
+    max_bytes=settings.LOG_MAX_BYTES,
+    backup_count=settings.LOG_BACKUP_COUNT,
+    rotate_interval_seconds=settings.LOG_ROTATE_INTERVAL_SECONDS
+)
 logger = logging.getLogger(__name__)
 
-# 設定読み込み
-settings = get_settings()
+# トレース設定
+setup_tracing(
+    enabled=settings.TRACING_ENABLED,
+    exporter=settings.TRACING_EXPORTER,
+    service_name=settings.TRACING_SERVICE_NAME,
+    file_path=settings.TRACING_FILE,
+    otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+    sample_ratio=settings.TRACING_SAMPLE_RATIO,
+    queue_size=settings.TRACING_QUEUE_SIZE,
+    batch_size=settings.TRACING_BATCH_SIZE
+)
+
+
+def _warm_up_steps():
+    """起動時の初期化処理（ブロッキングなboto3呼び出しはスレッドで実行）"""
+    loop = asyncio.get_running_loop()
+    return [
+        # DynamoDB接続テスト
+        ("dynamodb_client", lambda: loop.run_in_executor(None, get_dynamodb_client)),
+        ("dynamodb_resource", lambda: loop.run_in_executor(None, get_dynamodb_resource)),
+        # 前回終了時に未再生のWALがあれば、最初のリクエストを待たずに再生を開始
+        ("metric_wal", get_metric_wal)
+    ]
 
 
 @asynccontextmanager
@@ -36,18 +78,31 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Portfolio API application...")
 
     # 起動時の処理
-    try:
-        # DynamoDB接続テスト
-        dynamodb = get_dynamodb_client()
+    startup = get_startup_state()
+    startup.mode = settings.STARTUP_MODE
+    warm_up_task = None
+    if settings.STARTUP_MODE == STARTUP_MODE_EAGER:
+        await startup.warm_up(_warm_up_steps())
+        if not startup.ready:
+            raise RuntimeError(f"Startup failed: {startup.steps}")
         logger.info("DynamoDB connection established")
-    except Exception as e:
-        logger.error(f"Failed to connect to DynamoDB: {e}")
-        raise
+    else:
+        # ヘルスチェックに即応答できるよう、初期化はバックグラウンドで実行
+        warm_up_task = asyncio.create_task(startup.warm_up(_warm_up_steps()))
 
     yield
 
     # 終了時の処理
     logger.info("Shutting down Portfolio API application...")
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    # 書き込み待ちのメトリクスを書き切ってから接続を閉じる
+    await close_metric_write_buffer()
+    await close_metric_wal()
+    get_broadcast_hub().close_all()
+    await close_cache_backend()
+    await close_dynamodb_resources()
+    shutdown_tracing()
 
 
 # FastAPIアプリケーション作成
@@ -69,6 +124,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# レスポンス圧縮（計測に圧縮時間を含めるため計測ミドルウェアより内側に追加）
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        encodings=settings.COMPRESSION_ENCODINGS.split(","),
+        content_types=settings.COMPRESSION_CONTENT_TYPES.split(","),
+        excluded_routes=settings.COMPRESSION_EXCLUDED_ROUTES.split(","),
+        levels={
+            ENCODING_GZIP: settings.COMPRESSION_GZIP_LEVEL,
+            ENCODING_BROTLI: settings.COMPRESSION_BROTLI_QUALITY,
+            ENCODING_ZSTD: settings.COMPRESSION_ZSTD_LEVEL
+        },
+        stream_flush_bytes=settings.COMPRESSION_STREAM_FLUSH_BYTES
+    )
+
+# リクエストの計測（CORS等を含めた全体のレイテンシを計測するため最後に追加）
+if settings.TELEMETRY_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
+
+# リクエストIDの付与・サーバースパンの記録（計測ミドルウェアからも参照するため外側に追加）
+app.add_middleware(RequestContextMiddleware)
+
 # カスタムエラーハンドラーの登録
 register_exception_handlers(app)
 
@@ -76,6 +154,7 @@ register_exception_handlers(app)
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(users.router, prefix="/api/v1", tags=["users"])
 app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
+app.include_router(devices.router, prefix="/api/v1", tags=["devices"])
 
 
 @app.get("/")
@@ -99,6 +178,11 @@ async def health_check():
     }
 
 
+# 計測値のエンドポイント（トークン未設定の場合は公開しない）
+if settings.TELEMETRY_ENABLED and settings.TELEMETRY_METRICS_TOKEN:
+    app.include_router(telemetry.router)
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -427,6 +427,12 @@ resource "aws_ecs_cluster_capacity_providers" "main" {
   }
 }
 
+# Cursor signing key for list API pagination
+resource "random_password" "cursor_secret_key" {
+  length  = 64
+  special = false
+}
+
 # ECS Task Definition
 resource "aws_ecs_task_definition" "api" {
   family                   = "${var.project_name}-api"
@@ -458,6 +464,11 @@ resource "aws_ecs_task_definition" "api" {
         {
           name  = "ENVIRONMENT"
           value = var.environment
+        },
+        {
+          # 一覧APIのカーソル署名キー（全タスクで共有するため、タスクごとに生成しない）
+          name  = "CURSOR_SECRET_KEY"
+          value = random_password.cursor_secret_key.result
         }
       ]
 
@@ -606,6 +617,11 @@ resource "aws_dynamodb_table" "metrics" {
     type = "S"
   }
 
+  attribute {
+    name = "metric_id"
+    type = "S"
+  }
+
   global_secondary_index {
     name            = "timestamp-index"
     hash_key        = "timestamp"
@@ -620,6 +636,13 @@ resource "aws_dynamodb_table" "metrics" {
     projection_type = "ALL"
   }
 
+  # metric_idによる詳細取得・更新・削除でキー（device_id + timestamp）を解決する
+  global_secondary_index {
+    name            = "metric-id-index"
+    hash_key        = "metric_id"
+    projection_type = "ALL"
+  }
+
   server_side_encryption {
     enabled = true
   }
@@ -633,6 +656,60 @@ resource "aws_dynamodb_table" "metrics" {
   }
 }
 
+# Metric Rollups Table (device_id/metric_name単位の集計値)
+resource "aws_dynamodb_table" "metric_rollups" {
+  name         = "${var.project_name}-metric-rollups"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "device_id"
+  range_key    = "metric_name"
+
+  attribute {
+    name = "device_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "metric_name"
+    type = "S"
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-metric-rollups"
+  }
+}
+
+# User Reservations Table (username/emailの一意性を保証する予約項目)
+resource "aws_dynamodb_table" "user_reservations" {
+  name         = "${var.project_name}-user-reservations"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "reservation_key"
+
+  attribute {
+    name = "reservation_key"
+    type = "S"
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-user-reservations"
+  }
+}
+
 # ==============================================================================
 # S3 BUCKET FOR STATIC WEBSITE
 # ==============================================================================
@@ -826,13 +903,17 @@ resource "aws_iam_role_policy" "ecs_task_dynamodb" {
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
-          "dynamodb:Scan"
+          "dynamodb:Scan",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:ConditionCheckItem"
         ]
         Resource = [
           aws_dynamodb_table.users.arn,
           "${aws_dynamodb_table.users.arn}/index/*",
           aws_dynamodb_table.metrics.arn,
-          "${aws_dynamodb_table.metrics.arn}/index/*"
+          "${aws_dynamodb_table.metrics.arn}/index/*",
+          aws_dynamodb_table.metric_rollups.arn,
+          aws_dynamodb_table.user_reservations.arn
         ]
       }
     ]
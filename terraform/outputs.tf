@@ -134,6 +134,16 @@ output "dynamodb_metrics_table_arn" {
   value       = aws_dynamodb_table.metrics.arn
 }
 
+output "dynamodb_metric_rollups_table_name" {
+  description = "Name of the DynamoDB metric rollups table"
+  value       = aws_dynamodb_table.metric_rollups.name
+}
+
+output "dynamodb_user_reservations_table_name" {
+  description = "Name of the DynamoDB user reservations table"
+  value       = aws_dynamodb_table.user_reservations.name
+}
+
 # ==============================================================================
 # S3 OUTPUTS
 # ==============================================================================
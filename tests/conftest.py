@@ -3,16 +3,77 @@ Pytest Configuration and Fixtures
 pytest設定とフィクスチャ
 """
 
+import os
+
 import pytest
 from unittest.mock import Mock, MagicMock
 from datetime import datetime, timezone
 
+from botocore.exceptions import ClientError
+
+# DEBUG=falseではカーソル署名キーが必須のため、設定を読み込む前にテスト用の値を設定
+os.environ.setdefault("CURSOR_SECRET_KEY", "test-cursor-secret")
+
 from app.services.user_service import UserService
 from app.services.metric_service import MetricService
 from app.models.user import UserCreate, UserUpdate
 from app.models.metric import MetricCreate, MetricUpdate, MetricStatus
 
 
+def _conditional_check_failed(operation_name):
+    return ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+        operation_name
+    )
+
+
+def _find_item(items, kwargs, operation_name):
+    """
+    Keyの全属性が一致する項目を取得
+    条件式（attribute_exists / metric_id = :metric_id）を満たさない場合は条件不成立
+    """
+    key = kwargs['Key']
+    item = next((i for i in items if all(i.get(name) == value for name, value in key.items())), None)
+    condition = kwargs.get('ConditionExpression', '')
+    expected_id = kwargs.get('ExpressionAttributeValues', {}).get(':metric_id')
+    if condition and (item is None or ('metric_id = :metric_id' in condition and item['metric_id'] != expected_id)):
+        raise _conditional_check_failed(operation_name)
+    return item
+
+
+def _mock_update(items, kwargs):
+    """SET式の値を反映するupdate_itemのモック（条件式・ReturnValues対応）"""
+    item = _find_item(items, kwargs, 'UpdateItem')
+    if item is None:
+        return {}
+    
+    old_item = dict(item)
+    names = kwargs.get('ExpressionAttributeNames', {})
+    values = kwargs.get('ExpressionAttributeValues', {})
+    for assignment in kwargs['UpdateExpression'].split('SET', 1)[1].split(','):
+        name, placeholder = (part.strip() for part in assignment.split('='))
+        item[names.get(name, name)] = values[placeholder]
+    
+    return_values = kwargs.get('ReturnValues', 'NONE')
+    if return_values == 'ALL_NEW':
+        return {'Attributes': dict(item)}
+    if return_values == 'ALL_OLD':
+        return {'Attributes': old_item}
+    return {}
+
+
+def _mock_delete(items, kwargs):
+    """delete_itemのモック（条件式・ReturnValues対応）"""
+    item = _find_item(items, kwargs, 'DeleteItem')
+    if item is None:
+        return {}
+    
+    items.remove(item)
+    if kwargs.get('ReturnValues') == 'ALL_OLD':
+        return {'Attributes': item}
+    return {}
+
+
 @pytest.fixture
 def mock_users_table():
     """ユーザーテーブルのモック"""
@@ -40,15 +101,23 @@ def mock_users_table():
         }
     ]
     
-    # scan操作のモック
+    # scan操作のモック（ExclusiveStartKey/LastEvaluatedKeyによるページング対応）
     def mock_scan(**kwargs):
         limit = kwargs.get('Limit', 10)
-        items = sample_users[:limit]
-        return {
+        start = 0
+        start_key = kwargs.get('ExclusiveStartKey')
+        if start_key:
+            keys = [item['user_id'] for item in sample_users]
+            start = keys.index(start_key['user_id']) + 1
+        items = sample_users[start:start + limit]
+        response = {
             'Items': items,
             'Count': len(items),
             'ScannedCount': len(items)
         }
+        if start + limit < len(sample_users):
+            response['LastEvaluatedKey'] = {'user_id': items[-1]['user_id']}
+        return response
     
     # get_item操作のモック
     def mock_get_item(**kwargs):
@@ -79,22 +148,37 @@ def mock_users_table():
     
     # update_item操作のモック
     def mock_update_item(**kwargs):
-        return {'Attributes': sample_users[0]}
+        return _mock_update(sample_users, kwargs)
     
     # delete_item操作のモック
     def mock_delete_item(**kwargs):
+        return _mock_delete(sample_users, kwargs)
+    
+    # transact_write_items操作のモック（低レベルクライアント）
+    def mock_transact_write_items(**kwargs):
         return {}
     
+    table.name = 'portfolio-users'
     table.scan = mock_scan
     table.get_item = mock_get_item
     table.query = mock_query
     table.put_item = mock_put_item
     table.update_item = mock_update_item
     table.delete_item = mock_delete_item
+    table.meta.client.transact_write_items = Mock(side_effect=mock_transact_write_items)
     
     return table
 
 
+@pytest.fixture
+def mock_reservations_table():
+    """ユーザー予約テーブルのモック"""
+    table = Mock()
+    table.name = 'portfolio-user-reservations'
+    table.delete_item = Mock(return_value={})
+    return table
+
+
 @pytest.fixture
 def mock_metrics_table():
     """メトリクステーブルのモック"""
@@ -122,38 +206,58 @@ def mock_metrics_table():
             'unit': 'percent',
             'status': 'active',
             'metadata': {'location': 'room1'},
-            'timestamp': '2024-01-01T12:00:00+00:00',
-            'created_at': '2024-01-01T12:00:00+00:00',
-            'updated_at': '2024-01-01T12:00:00+00:00'
+            'timestamp': '2024-01-01T12:00:01+00:00',
+            'created_at': '2024-01-01T12:00:01+00:00',
+            'updated_at': '2024-01-01T12:00:01+00:00'
         }
     ]
     
-    # scan操作のモック
+    # scan操作のモック（ExclusiveStartKey/LastEvaluatedKeyによるページング対応）
     def mock_scan(**kwargs):
         limit = kwargs.get('Limit', 10)
-        items = sample_metrics[:limit]
-        return {
+        start = 0
+        start_key = kwargs.get('ExclusiveStartKey')
+        if start_key:
+            keys = [item['metric_id'] for item in sample_metrics]
+            start = keys.index(start_key['metric_id']) + 1
+        items = sample_metrics[start:start + limit]
+        response = {
             'Items': items,
             'Count': len(items),
             'ScannedCount': len(items)
         }
+        if start + limit < len(sample_metrics):
+            response['LastEvaluatedKey'] = {'metric_id': items[-1]['metric_id']}
+        return response
     
-    # get_item操作のモック
+    # get_item操作のモック（プライマリキー: device_id + timestamp）
     def mock_get_item(**kwargs):
-        metric_id = kwargs.get('Key', {}).get('metric_id')
+        key = kwargs.get('Key', {})
         for metric in sample_metrics:
-            if metric['metric_id'] == metric_id:
+            if metric['device_id'] == key.get('device_id') and metric['timestamp'] == key.get('timestamp'):
                 return {'Item': metric}
         return {}
     
-    # query操作のモック（GSI用）
+    # query操作のモック（プライマリキー・GSI用）
     def mock_query(**kwargs):
         index_name = kwargs.get('IndexName')
-        if index_name == 'timestamp-index':
-            device_id = kwargs.get('ExpressionAttributeValues', {}).get(':device_id')
-            items = [m for m in sample_metrics if m['device_id'] == device_id]
-            return {'Items': items}
-        return {'Items': []}
+        values = kwargs.get('ExpressionAttributeValues', {})
+        if index_name in (None, 'timestamp-index'):
+            items = [m for m in sample_metrics if m['device_id'] == values.get(':device_id')]
+        elif index_name == 'status-index':
+            items = [m for m in sample_metrics if m['status'] == values.get(':status')]
+        elif index_name == 'metric-id-index':
+            items = [m for m in sample_metrics if m['metric_id'] == values.get(':metric_id')]
+        else:
+            return {'Items': []}
+        if ':metric_name' in values:
+            items = [m for m in items if m['metric_name'] == values[':metric_name']]
+        if ':start' in values:
+            items = [m for m in items if m['timestamp'] >= values[':start']]
+        if ':end' in values:
+            items = [m for m in items if m['timestamp'] <= values[':end']]
+        items = sorted(items, key=lambda m: m['timestamp'], reverse=not kwargs.get('ScanIndexForward', True))
+        return {'Items': items[:kwargs.get('Limit', len(items))]}
     
     # put_item操作のモック
     def mock_put_item(**kwargs):
@@ -161,18 +265,24 @@ def mock_metrics_table():
     
     # update_item操作のモック
     def mock_update_item(**kwargs):
-        return {'Attributes': sample_metrics[0]}
+        return _mock_update(sample_metrics, kwargs)
     
     # delete_item操作のモック
     def mock_delete_item(**kwargs):
-        return {}
+        return _mock_delete(sample_metrics, kwargs)
+    
+    # batch_write_item操作のモック（低レベルクライアント）
+    def mock_batch_write_item(**kwargs):
+        return {'UnprocessedItems': {}}
     
+    table.name = 'portfolio-metrics'
     table.scan = mock_scan
     table.get_item = mock_get_item
     table.query = mock_query
     table.put_item = mock_put_item
     table.update_item = mock_update_item
     table.delete_item = mock_delete_item
+    table.meta.client.batch_write_item = Mock(side_effect=mock_batch_write_item)
     
     return table
 
@@ -196,7 +306,8 @@ def sample_user_create():
         username='newuser',
         email='newuser@example.com',
         full_name='New User',
-        is_active=True
+        is_active=True,
+        password='password123'
     )
 
 
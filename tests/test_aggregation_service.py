@@ -0,0 +1,117 @@
+"""
+Aggregation Service Tests
+時間バケット集計のテスト
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from app.core.exceptions import ValidationException
+from app.services.aggregation_service import bucket_aggregate, parse_aggregations, parse_bucket, resolve_window
+from app.services.metric_service import MetricService
+
+
+class TestAggregationService:
+    """時間バケット集計のテストクラス"""
+
+    def test_bucket_aggregate_matches_reference(self):
+        """ベクトル化集計が素朴な集計と一致することのテスト"""
+        rng = np.random.default_rng(0)
+        timestamps = rng.uniform(0, 3600, size=2000)
+        values = rng.normal(20, 5, size=2000)
+
+        result = bucket_aggregate(timestamps, values, 300, ['avg', 'min', 'max', 'sum', 'p95'])
+
+        assert result['bucket'].tolist() == list(range(0, 3600, 300))
+        for i, bucket_start in enumerate(result['bucket']):
+            mask = (timestamps >= bucket_start) & (timestamps < bucket_start + 300)
+            expected = values[mask]
+            assert result['count'][i] == expected.size
+            assert result['avg'][i] == pytest.approx(expected.mean())
+            assert result['min'][i] == expected.min()
+            assert result['max'][i] == expected.max()
+            assert result['sum'][i] == pytest.approx(expected.sum())
+            assert result['p95'][i] == pytest.approx(np.percentile(expected, 95))
+
+    def test_bucket_aggregate_empty(self):
+        """データがない場合のテスト"""
+        result = bucket_aggregate(np.empty(0), np.empty(0), 60, ['avg', 'count'])
+
+        assert result['bucket'].size == 0
+        assert result['avg'].size == 0
+
+    def test_parse_bucket_and_aggregations(self):
+        """バケット・集計指定の検証テスト"""
+        assert parse_bucket('1h') == 3600
+        assert parse_aggregations('avg, max,avg,p95') == ['avg', 'max', 'p95']
+
+        with pytest.raises(ValidationException):
+            parse_bucket('2m')
+        with pytest.raises(ValidationException):
+            parse_aggregations('avg,median')
+
+    @pytest.mark.asyncio
+    async def test_get_metric_aggregates_pages_query(self):
+        """Queryの全ページを読み出してバケット集計することのテスト"""
+        items = [
+            {'timestamp': f'2024-01-01T00:{minute:02d}:{second:02d}+00:00', 'value': minute * 10 + (second // 10) % 2}
+            for minute in range(10)
+            for second in range(0, 60, 10)
+        ]
+        table = Mock()
+        table.query = Mock(side_effect=[
+            {'Items': items[:30], 'LastEvaluatedKey': {'device_id': 'device-001'}},
+            {'Items': items[30:]}
+        ])
+
+        result = await MetricService(table).get_metric_aggregates(
+            device_id='device-001',
+            metric_name='temperature',
+            bucket='5m',
+            aggregations=['avg', 'max']
+        )
+
+        assert result.point_count == 60
+        assert [b.count for b in result.buckets] == [30, 30]
+        assert result.buckets[1].max == 91
+        assert result.buckets[0].min is None
+        query_kwargs = table.query.call_args_list[0].kwargs
+        assert query_kwargs['ProjectionExpression'] == '#ts, #value'
+        assert query_kwargs['ExpressionAttributeValues'][':metric_name'] == 'temperature'
+        assert 'ExclusiveStartKey' in table.query.call_args_list[1].kwargs
+
+    def test_resolve_window_defaults_and_limit(self):
+        """期間の省略時の既定値と、バケット数の上限を超える期間の拒否のテスト"""
+        end = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+        assert resolve_window(300, None, end, 12) == (end - timedelta(hours=1), end)
+        assert resolve_window(300, datetime(2024, 1, 1, 23), end, 12) == (end - timedelta(hours=1), end)
+        with pytest.raises(ValidationException, match="max 12 buckets"):
+            resolve_window(300, end - timedelta(hours=1, seconds=1), end, 12)
+        with pytest.raises(ValidationException):
+            resolve_window(300, end, end - timedelta(seconds=1), 12)
+
+    @pytest.mark.asyncio
+    async def test_get_metric_aggregates_rejects_too_many_points(self):
+        """読み出し件数が上限を超えた場合に以降のページを読まずに拒否することのテスト"""
+        items = [{'timestamp': f'2024-01-01T00:00:{second:02d}+00:00', 'value': second} for second in range(30)]
+        table = Mock()
+        table.query = Mock(side_effect=[
+            {'Items': items, 'LastEvaluatedKey': {'device_id': 'device-001'}},
+            {'Items': items}
+        ])
+
+        with pytest.raises(ValidationException) as exc_info:
+            await MetricService(table).get_metric_aggregates(
+                device_id='device-001',
+                metric_name='temperature',
+                bucket='1m',
+                aggregations=['avg'],
+                max_points=50
+            )
+
+        assert exc_info.value.status_code == 400
+        assert table.query.call_count == 2
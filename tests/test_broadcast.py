@@ -0,0 +1,147 @@
+"""
+Broadcast Hub Tests
+ライブ配信ハブのテスト
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.broadcast import BroadcastHub
+from app.core.exceptions import ServiceUnavailableException
+from app.routers.metrics import _receive_commands, _sse_events
+from app.services.metric_service import MetricService
+
+
+class _FakeRequest:
+    """is_disconnectedのみを持つリクエスト"""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+class _FakeWebSocket:
+    """受信するコマンドを順に返し、送信したメッセージを記録するWebSocket"""
+
+    def __init__(self, commands):
+        self.commands = list(commands)
+        self.sent = []
+
+    async def receive_json(self):
+        if not self.commands:
+            raise asyncio.CancelledError
+        return self.commands.pop(0)
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+class TestBroadcastHub:
+    """BroadcastHubのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_publish_fans_out_by_device(self):
+        """購読デバイスに一致する購読者のみに配信されることのテスト"""
+        hub = BroadcastHub(queue_size=10)
+        device_1 = hub.subscribe(['device-001'])
+        device_2 = hub.subscribe(['device-002'])
+        everything = hub.subscribe()
+
+        assert hub.publish('device-001', 'm1') == 2
+
+        assert await device_1.get(timeout=0.1) == 'm1'
+        assert await everything.get(timeout=0.1) == 'm1'
+        assert await device_2.get(timeout=0.01) is None
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_is_dropped(self):
+        """キューが溢れた購読者が切断され、他の購読者に影響しないことのテスト"""
+        hub = BroadcastHub(queue_size=2)
+        slow = hub.subscribe()
+        fast = hub.subscribe()
+
+        for i in range(3):
+            hub.publish('device-001', f"m{i}")
+            assert await fast.get(timeout=0.1) == f"m{i}"
+
+        assert slow.closed
+        assert slow.close_reason == 'slow_consumer'
+        with pytest.raises(StopAsyncIteration):
+            await slow.get(timeout=0.1)
+        assert hub.stats()['subscribers'] == 1
+        assert hub.stats()['dropped_subscribers'] == 1
+
+    def test_subscriber_limit(self):
+        """購読者数の上限のテスト"""
+        hub = BroadcastHub(max_subscribers=1)
+        subscription = hub.subscribe()
+
+        with pytest.raises(ServiceUnavailableException):
+            hub.subscribe()
+
+        subscription.close()
+        hub.subscribe()
+
+    @pytest.mark.asyncio
+    async def test_create_metric_publishes(self, mock_metrics_table, sample_metric_create):
+        """メトリクス作成・一括作成時に配信されることのテスト"""
+        hub = BroadcastHub()
+        subscription = hub.subscribe([sample_metric_create.device_id])
+        service = MetricService(mock_metrics_table, broadcast_hub=hub)
+
+        created = await service.create_metric(sample_metric_create)
+        assert (await subscription.get(timeout=0.1)).metric_id == created.metric_id
+
+        await service.create_metrics_batch([sample_metric_create] * 3)
+        received = [await subscription.get(timeout=0.1) for _ in range(3)]
+        assert all(metric.device_id == sample_metric_create.device_id for metric in received)
+
+    @pytest.mark.asyncio
+    async def test_sse_events(self, mock_metrics_table, sample_metric_create):
+        """SSE形式で送信され、切断時に購読が解除されることのテスト"""
+        hub = BroadcastHub()
+        request = _FakeRequest()
+        subscription = hub.subscribe()
+        events = _sse_events(request, subscription)
+
+        created = await MetricService(mock_metrics_table, broadcast_hub=hub).create_metric(sample_metric_create)
+        event = await asyncio.wait_for(events.__anext__(), 1)
+
+        assert event.startswith(f"id: {created.metric_id}\nevent: metric\ndata: {{")
+        assert event.endswith("\n\n")
+
+        request.disconnected = True
+        with pytest.raises(StopAsyncIteration):
+            await events.__anext__()
+        assert not hub.has_subscribers
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_last_device_stops_delivery(self):
+        """最後のデバイスの購読を解除すると、全デバイスの購読にならず配信が止まることのテスト"""
+        hub = BroadcastHub(queue_size=10)
+        subscription = hub.subscribe(['device-001'])
+        websocket = _FakeWebSocket([{'action': 'unsubscribe', 'device_ids': ['device-001']}])
+
+        with pytest.raises(asyncio.CancelledError):
+            await _receive_commands(websocket, subscription)
+
+        assert websocket.sent == [{'event': 'subscribed', 'device_ids': [], 'all_devices': False}]
+        assert hub.publish('device-001', 'm1') == 0
+        assert hub.publish('device-002', 'm2') == 0
+        assert await subscription.get(timeout=0.01) is None
+
+    def test_subscribe_narrows_all_devices(self):
+        """全デバイスの購読中にデバイスを追加すると、指定したデバイスのみの購読になることのテスト"""
+        hub = BroadcastHub(queue_size=10)
+        subscription = hub.subscribe()
+        assert subscription.matches('device-002')
+
+        subscription.add_devices(['device-001'])
+        subscription.remove_devices(['device-001'])
+
+        assert not subscription.all_devices
+        assert not subscription.matches('device-001')
+        assert not subscription.matches('device-002')
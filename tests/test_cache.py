@@ -0,0 +1,202 @@
+"""
+Entity Cache Tests
+プロセス内TTL+LRUキャッシュのテスト
+"""
+
+import pytest
+
+import asyncio
+from typing import List
+
+import fakeredis
+import fakeredis.aioredis
+
+from app.cache import MemoryCacheBackend, RedisCacheBackend
+from app.core.cache import TTLCache
+from app.services.metric_service import MetricService
+from app.services.user_service import UserService
+from app.models.metric import MetricResponse
+from app.models.user import UserUpdate
+
+
+class FakeClock:
+    """テスト用の時計"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """TTLCacheのテストクラス"""
+
+    def test_ttl_expiration(self):
+        """TTL経過後にミスとなることのテスト"""
+        clock = FakeClock()
+        cache = TTLCache(ttl_seconds=10, clock=clock)
+        cache.set('a', 'value')
+
+        assert cache.get('a') == 'value'
+        clock.now = 11
+        assert cache.get('a') is None
+        assert cache.stats()['expirations'] == 1
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_lru_eviction_by_entries(self):
+        """件数上限でLRU順に追い出されることのテスト"""
+        cache = TTLCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.stats()['evictions'] == 1
+
+    def test_eviction_by_size(self):
+        """サイズ上限で追い出されることのテスト"""
+        cache = TTLCache(max_bytes=10, sizeof=len)
+        cache.set('a', 'x' * 6)
+        cache.set('b', 'y' * 6)
+
+        assert len(cache) == 1
+        assert cache.get('b') == 'y' * 6
+        assert cache.stats()['bytes'] == 6
+
+        cache.set('c', 'z' * 11)
+        assert cache.get('c') is None
+
+    def test_invalidate_tag(self):
+        """タグ単位の無効化のテスト"""
+        cache = TTLCache()
+        cache.set('user:1', 'u1', tags=['user:1'])
+        cache.set('user:username:alice', 'u1', tags=['user:1'])
+        cache.set('user:2', 'u2', tags=['user:2'])
+
+        assert cache.invalidate_tag('user:1') == 2
+        assert cache.get('user:username:alice') is None
+        assert cache.get('user:2') == 'u2'
+
+
+class TestServiceCaching:
+    """サービス層のキャッシュ利用テスト"""
+
+    @pytest.mark.asyncio
+    async def test_get_user_served_from_cache(self, mock_users_table):
+        """2回目以降のユーザー取得がキャッシュから返ることのテスト"""
+        calls = []
+        get_item = mock_users_table.get_item
+        mock_users_table.get_item = lambda **kwargs: calls.append(kwargs) or get_item(**kwargs)
+        service = UserService(mock_users_table, MemoryCacheBackend(TTLCache()))
+
+        first = await service.get_user('user-001')
+        second = await service.get_user('user-001')
+        by_username = await service.get_user_by_username(first.username)
+
+        assert first == second == by_username
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_update_user_invalidates_cache(self, mock_users_table):
+        """ユーザー更新で関連キーが無効化されることのテスト"""
+        cache = TTLCache()
+        service = UserService(mock_users_table, MemoryCacheBackend(cache))
+        user = await service.get_user('user-001')
+        assert cache.get(f"user:username:{user.username}") is not None
+
+        await service.update_user('user-001', UserUpdate(full_name='Updated'))
+        await service.delete_user('user-001')
+
+        assert cache.get(f"user:username:{user.username}") is None
+        assert cache.get('user:user-001') is None
+
+    @pytest.mark.asyncio
+    async def test_create_metric_write_through(self, mock_metrics_table, sample_metric_create):
+        """メトリクス作成時にキャッシュへ書き込まれることのテスト"""
+        cache = TTLCache()
+        service = MetricService(mock_metrics_table, cache=MemoryCacheBackend(cache))
+
+        created = await service.create_metric(sample_metric_create)
+        fetched = await service.get_metric(created.metric_id)
+
+        assert fetched is created
+        
+        await service.get_metric('metric-001')
+        await service.delete_metric('metric-001')
+        assert cache.get('metric:metric-001') is None
+
+    @pytest.mark.asyncio
+    async def test_latest_metrics_invalidated_by_create(self, mock_metrics_table, sample_metric_create):
+        """メトリクス作成で最新メトリクスのキャッシュが無効化されることのテスト"""
+        cache = TTLCache()
+        service = MetricService(mock_metrics_table, cache=MemoryCacheBackend(cache))
+
+        await service.get_latest_metrics(device_id=sample_metric_create.device_id, limit=5)
+        await service.get_latest_metrics(limit=5)
+        assert len(cache) == 2
+
+        created = await service.create_metric(sample_metric_create)
+
+        assert cache.get(f"metrics:latest:{sample_metric_create.device_id}:5") is None
+        assert cache.get("metrics:latest:*:5") is None
+        assert cache.get(f"metric:{created.metric_id}") is created
+
+
+class TestRedisCacheBackend:
+    """Redisプロトコルバックエンドのテストクラス（fakeredisを使用）"""
+
+    @staticmethod
+    def _backend(server, near_cache=None):
+        return RedisCacheBackend(
+            fakeredis.aioredis.FakeRedis(server=server),
+            channel='test:invalidate',
+            near_cache=near_cache
+        )
+
+    @pytest.mark.asyncio
+    async def test_shared_across_tasks(self, mock_metrics_table):
+        """別タスク（別インスタンス）から登録値を型付きで取得できることのテスト"""
+        server = fakeredis.FakeServer()
+        task_a, task_b = self._backend(server), self._backend(server)
+        latest = await MetricService(mock_metrics_table).get_latest_metrics(device_id='device-001')
+
+        await task_a.set('metrics:latest:device-001:10', latest, List[MetricResponse], tags=['metrics:latest:device-001'])
+        cached = await task_b.get('metrics:latest:device-001:10', List[MetricResponse])
+
+        assert cached == latest
+        assert isinstance(cached[0], MetricResponse)
+
+        await task_b.invalidate_tags('metrics:latest:device-001')
+        assert await task_a.get('metrics:latest:device-001:10', List[MetricResponse]) is None
+
+    @pytest.mark.asyncio
+    async def test_near_cache_invalidation_fan_out(self, mock_users_table):
+        """pub/subで他タスクのニアキャッシュが無効化されることのテスト"""
+        server = fakeredis.FakeServer()
+        task_a = self._backend(server, TTLCache())
+        task_b = self._backend(server, TTLCache())
+        await task_a.start()
+        await task_b.start()
+        try:
+            service_a = UserService(mock_users_table, task_a)
+            service_b = UserService(mock_users_table, task_b)
+            user = await service_a.get_user('user-001')
+            await service_b.get_user('user-001')
+            assert task_b.near_cache.get('user:user-001') is not None
+
+            await service_a.delete_user('user-001')
+            for _ in range(50):
+                if task_b.near_cache.get('user:user-001') is None:
+                    break
+                await asyncio.sleep(0.05)
+
+            assert task_b.near_cache.get('user:user-001') is None
+            assert task_b.near_cache.get(f"user:username:{user.username}") is None
+            assert task_b.invalidations_received == 1
+        finally:
+            await task_a.close()
+            await task_b.close()
@@ -0,0 +1,107 @@
+"""
+Codec Tests
+DynamoDB属性値の変換とCodecTableのテスト
+"""
+
+from decimal import Decimal
+from unittest.mock import Mock
+
+import pytest
+from boto3.dynamodb.types import TypeDeserializer
+
+from app.core.codec import decode_item, decode_number, encode_item
+from app.core.dynamodb import CodecTable, SyncTable
+
+
+class TestItemCodec:
+    """属性値の変換のテストクラス"""
+
+    def test_round_trip(self):
+        """各型の変換と、数値がDecimalを経由せずint/floatとなることのテスト"""
+        item = {
+            'device_id': 'device-001',
+            'value': 23.5,
+            'count': 3,
+            'active': True,
+            'note': None,
+            'metadata': {'floor': 2, 'tags': ['a', 1.25]},
+            'labels': {'x'},
+            'payload': b'\x00'
+        }
+
+        encoded = encode_item(item)
+        assert encoded['value'] == {'N': '23.5'}
+        assert encoded['active'] == {'BOOL': True}
+        assert encoded['metadata'] == {'M': {'floor': {'N': '2'}, 'tags': {'L': [{'S': 'a'}, {'N': '1.25'}]}}}
+
+        decoded = decode_item(encoded)
+        assert decoded == item
+        assert type(decoded['value']) is float
+        assert type(decoded['count']) is int
+
+    def test_matches_boto3_deserializer(self):
+        """boto3のTypeDeserializerと同じ値になることのテスト（数値型のみ異なる）"""
+        encoded = encode_item({'a': Decimal('1.10'), 'b': 100, 'c': -2.5e-7, 'd': {'e': [Decimal('3')]}})
+        expected = {k: TypeDeserializer().deserialize(v) for k, v in encoded.items()}
+
+        assert decode_item(encoded) == {
+            'a': float(expected['a']), 'b': int(expected['b']), 'c': float(expected['c']), 'd': {'e': [3]}
+        }
+        assert decode_number('1E+3') == 1000.0
+
+    def test_rejects_unsupported_values(self):
+        """DynamoDBで扱えない値のテスト"""
+        with pytest.raises(ValueError):
+            encode_item({'value': float('nan')})
+        with pytest.raises(TypeError):
+            encode_item({'value': object()})
+
+    @pytest.mark.parametrize('value', [set(), frozenset()])
+    def test_rejects_empty_set(self, value):
+        """空のセットは{'SS': []}等に変換せずエラーとすることのテスト"""
+        with pytest.raises(ValueError, match='empty sets'):
+            encode_item({'tags': value})
+        with pytest.raises(ValueError, match='empty sets'):
+            encode_item({'nested': {'tags': value}})
+
+
+class TestCodecTable:
+    """CodecTableのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_uses_low_level_client(self):
+        """低レベルクライアントAPIで呼び出し、レスポンスの項目を変換することのテスト"""
+        table = Mock()
+        table.name = 'portfolio-metrics'
+        table.meta.client.query.return_value = {
+            'Items': [{'device_id': {'S': 'device-001'}, 'value': {'N': '23.5'}}],
+            'LastEvaluatedKey': {'device_id': {'S': 'device-001'}, 'timestamp': {'S': '2024-01-01T00:00:00+00:00'}}
+        }
+        table.meta.client.put_item.return_value = {}
+        codec_table = CodecTable(SyncTable(table))
+
+        response = await codec_table.query(
+            KeyConditionExpression='device_id = :device_id',
+            ExpressionAttributeValues={':device_id': 'device-001'},
+            Limit=10
+        )
+        await codec_table.put_item(Item={'device_id': 'device-001', 'value': 23.5})
+
+        query_kwargs = table.meta.client.query.call_args.kwargs
+        assert query_kwargs['TableName'] == 'portfolio-metrics'
+        assert query_kwargs['ExpressionAttributeValues'] == {':device_id': {'S': 'device-001'}}
+        assert query_kwargs['Limit'] == 10
+        assert response['Items'] == [{'device_id': 'device-001', 'value': 23.5}]
+        assert response['LastEvaluatedKey']['timestamp'] == '2024-01-01T00:00:00+00:00'
+        assert table.meta.client.put_item.call_args.kwargs['Item']['value'] == {'N': '23.5'}
+        table.put_item.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_resource_adapter_converts_floats(self):
+        """リソースAPIの呼び出しではfloatがDecimalに変換されることのテスト"""
+        table = Mock()
+        await SyncTable(table).put_item(Item={'value': 23.1, 'metadata': {'ratio': 0.5}})
+
+        item = table.put_item.call_args.kwargs['Item']
+        assert item['value'] == Decimal('23.1')
+        assert item['metadata']['ratio'] == Decimal('0.5')
@@ -0,0 +1,157 @@
+"""
+Compression Tests
+Accept-Encodingのネゴシエーションとレスポンス圧縮ミドルウェアのテスト
+"""
+
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import COMPRESSORS, create_compressor, negotiate_encoding
+from app.middleware import CompressionMiddleware
+
+LINES = [f'{{"device_id":"device-001","value":{i}}}\n'.encode() for i in range(200)]
+
+
+def _create_app(**options):
+    router = APIRouter()
+
+    @router.get('/items')
+    async def items():
+        return [{'device_id': 'device-001', 'value': i} for i in range(200)]
+
+    @router.get('/small')
+    async def small():
+        return {'status': 'ok'}
+
+    @router.get('/stream')
+    async def stream():
+        async def lines():
+            for line in LINES:
+                yield line
+        return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+    @router.get('/no-transform')
+    async def no_transform():
+        return JSONResponse(list(range(1000)), headers={'Cache-Control': 'no-transform'})
+
+    app = FastAPI()
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=500,
+        encodings=['zstd', 'br', 'gzip'],
+        content_types=['application/json', 'application/x-ndjson'],
+        **options
+    )
+    app.include_router(router)
+    return app
+
+
+async def _call(app, path, accept_encoding='gzip'):
+    """ASGIアプリを直接呼び出し、送信されたメッセージを返す"""
+    messages = []
+    requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        # リクエスト本体を渡した後は切断されるまで待つ（StreamingResponseの切断監視用）
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'scheme': 'http', 'server': ('test', 80), 'http_version': '1.1',
+        'headers': [(b'accept-encoding', accept_encoding.encode())]
+    }
+    await app(scope, receive, send)
+    return messages
+
+
+class TestNegotiation:
+    """Accept-Encodingのネゴシエーションのテストクラス"""
+
+    def test_negotiate_encoding(self):
+        """q値・サーバーの優先順・q=0による選択のテスト"""
+        preferred = ['zstd', 'br', 'gzip']
+        assert negotiate_encoding('gzip, deflate', preferred) == 'gzip'
+        assert negotiate_encoding('gzip;q=0', preferred) is None
+        assert negotiate_encoding('identity', preferred) is None
+        assert negotiate_encoding(None, preferred) is None
+        assert negotiate_encoding('*', ['gzip']) == 'gzip'
+        assert negotiate_encoding('gzip;q=0.5, deflate;q=1.0', preferred) == 'gzip'
+        assert negotiate_encoding('gzip;q=invalid', preferred) is None
+
+    @pytest.mark.parametrize('encoding', sorted(COMPRESSORS))
+    def test_compressor_round_trip(self, encoding):
+        """インストール済みの各方式でフラッシュしたチャンクを連結すると元に戻ることのテスト"""
+        compressor = create_compressor(encoding)
+        data = b''.join(compressor.compress(line) + compressor.flush() for line in LINES[:-1]) + compressor.finish(LINES[-1])
+
+        if encoding == 'gzip':
+            restored = gzip.decompress(data)
+        elif encoding == 'br':
+            restored = pytest.importorskip('brotli').decompress(data)
+        else:
+            restored = pytest.importorskip('zstandard').ZstdDecompressor().decompressobj().decompress(data)
+        assert restored == b''.join(LINES)
+
+
+class TestCompressionMiddleware:
+    """CompressionMiddlewareのテストクラス"""
+
+    def test_compresses_json(self):
+        """最小サイズ以上のJSONがgzipで圧縮されることのテスト"""
+        client = TestClient(_create_app())
+        response = client.get('/items', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.headers['vary'] == 'Accept-Encoding'
+        assert int(response.headers['content-length']) < len(response.content)
+        assert response.json()[199] == {'device_id': 'device-001', 'value': 199}
+
+    def test_skips_small_and_opted_out_responses(self):
+        """最小サイズ未満・no-transform・除外ルート・Accept-Encodingなしは圧縮しないことのテスト"""
+        client = TestClient(_create_app(excluded_routes=['/items']))
+
+        small = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        assert 'content-encoding' not in small.headers
+        assert small.headers['vary'] == 'Accept-Encoding'
+
+        assert 'content-encoding' not in client.get('/no-transform', headers={'Accept-Encoding': 'gzip'}).headers
+        assert 'content-encoding' not in client.get('/items', headers={'Accept-Encoding': 'gzip'}).headers
+        assert 'content-encoding' not in client.get('/stream', headers={'Accept-Encoding': 'identity'}).headers
+
+    @pytest.mark.asyncio
+    async def test_streaming_flushes_each_chunk(self):
+        """stream_flush_bytes=0の場合、NDJSONのチャンクごとに展開できる単位でフラッシュされることのテスト"""
+        messages = await _call(_create_app(stream_flush_bytes=0), '/stream')
+
+        start = messages[0]
+        headers = dict(start['headers'])
+        assert headers[b'content-encoding'] == b'gzip'
+        assert b'content-length' not in headers
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        bodies = [message for message in messages[1:] if message.get('body')]
+        # 最初のチャンクを受け取った時点で最初の行を展開できる
+        assert decompressor.decompress(bodies[0]['body']) == LINES[0]
+        restored = LINES[0] + b''.join(decompressor.decompress(message['body']) for message in bodies[1:])
+        assert restored == b''.join(LINES)
+        assert messages[-1]['more_body'] is False
+
+    @pytest.mark.asyncio
+    async def test_streaming_flush_threshold(self):
+        """stream_flush_bytesに達するまで圧縮器の出力をまとめて送信することのテスト"""
+        messages = await _call(_create_app(stream_flush_bytes=4096), '/stream')
+
+        bodies = [message['body'] for message in messages[1:] if message.get('body')]
+        assert len(bodies) < len(LINES) // 10
+        assert zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(b''.join(bodies)) == b''.join(LINES)
@@ -0,0 +1,32 @@
+"""
+Settings Tests
+設定の検証のテスト
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+
+
+class TestCursorSecretKey:
+    """カーソル署名キーの検証のテストクラス"""
+
+    def test_required_outside_debug(self):
+        """DEBUG=falseで未設定の場合は設定の読み込みに失敗することのテスト"""
+        with pytest.raises(ValidationError, match="CURSOR_SECRET_KEY"):
+            Settings(_env_file=None, DEBUG=False, CURSOR_SECRET_KEY="")
+
+    def test_random_key_in_debug(self):
+        """DEBUG=trueで未設定の場合はランダムなキーが生成されることのテスト"""
+        first = Settings(_env_file=None, DEBUG=True, CURSOR_SECRET_KEY="")
+        second = Settings(_env_file=None, DEBUG=True, CURSOR_SECRET_KEY="")
+
+        assert len(first.CURSOR_SECRET_KEY) == 64
+        assert first.CURSOR_SECRET_KEY != second.CURSOR_SECRET_KEY
+
+    def test_configured_key_is_kept(self):
+        """設定したキーがそのまま使われることのテスト"""
+        settings = Settings(_env_file=None, DEBUG=False, CURSOR_SECRET_KEY="configured")
+
+        assert settings.CURSOR_SECRET_KEY == "configured"
@@ -0,0 +1,129 @@
+"""
+DynamoDB Adapter Tests
+DynamoDB非同期アダプターのテスト
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+
+from app.core.dynamodb import (
+    AsyncTable, PoolMetrics, SyncTable, ThreadPoolTable, _DiscardedConnectionCounter, as_async_table,
+    get_botocore_config, get_pool_metrics
+)
+
+
+class TestDynamoDBAdapters:
+    """非同期アダプターのテストクラス"""
+
+    def test_as_async_table_wraps_sync_table(self):
+        """同期テーブルがアダプターに包まれることのテスト"""
+        table = Mock()
+        adapter = as_async_table(table)
+
+        assert isinstance(adapter, AsyncTable)
+        assert as_async_table(adapter) is adapter
+
+    @pytest.mark.asyncio
+    async def test_threadpool_table_runs_off_event_loop(self):
+        """スレッドプールアダプターがイベントループ外で実行されることのテスト"""
+        loop_thread = threading.get_ident()
+        table = Mock()
+        table.get_item = lambda **kwargs: {'Item': {'thread': threading.get_ident(), **kwargs['Key']}}
+
+        adapter = ThreadPoolTable(table, ThreadPoolExecutor(max_workers=2))
+        response = await adapter.get_item(Key={'user_id': 'user-001'})
+
+        assert response['Item']['user_id'] == 'user-001'
+        assert response['Item']['thread'] != loop_thread
+
+    @pytest.mark.asyncio
+    async def test_threadpool_table_concurrent_calls(self):
+        """ブロッキング呼び出しが並行実行されることのテスト"""
+        table = Mock()
+
+        def slow_scan(**kwargs):
+            time.sleep(0.1)
+            return {'Items': []}
+
+        table.scan = slow_scan
+        adapter = ThreadPoolTable(table, ThreadPoolExecutor(max_workers=5))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(adapter.scan() for _ in range(5)))
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.4
+
+    @pytest.mark.asyncio
+    async def test_sync_table_client_call(self):
+        """低レベルクライアント呼び出しのテスト"""
+        table = Mock()
+        table.meta.client.describe_table.return_value = {'Table': {'TableStatus': 'ACTIVE'}}
+
+        response = await SyncTable(table).client_call('describe_table', TableName='portfolio-users')
+
+        assert response['Table']['TableStatus'] == 'ACTIVE'
+        table.meta.client.describe_table.assert_called_once_with(TableName='portfolio-users')
+
+    @pytest.mark.asyncio
+    async def test_client_call_uses_given_client(self):
+        """低レベルクライアントを渡した場合はリソースのmeta.clientを使わないことのテスト"""
+        table = Mock()
+        client = Mock()
+        client.describe_table.return_value = {'Table': {'TableStatus': 'ACTIVE'}}
+
+        adapter = as_async_table(table, client)
+        await adapter.client_call('describe_table', TableName='portfolio-users')
+
+        client.describe_table.assert_called_once_with(TableName='portfolio-users')
+        table.meta.client.describe_table.assert_not_called()
+
+
+class TestConnectionPool:
+    """botocore設定と接続プール統計のテストクラス"""
+
+    def test_botocore_config_from_settings(self):
+        """Settingsの値がbotocore設定に反映されることのテスト"""
+        config = get_botocore_config()
+
+        assert config.max_pool_connections == 64
+        assert config.retries == {'mode': 'standard', 'max_attempts': 3}
+        assert config.tcp_keepalive is True
+
+    @pytest.mark.asyncio
+    async def test_in_flight_calls_are_tracked(self):
+        """同時実行数とスレッドプールの待ち時間が記録されることのテスト"""
+        table = Mock()
+        table.query = lambda **kwargs: time.sleep(0.05) or {'Items': []}
+        adapter = ThreadPoolTable(table, ThreadPoolExecutor(max_workers=2))
+        metrics = get_pool_metrics()
+        calls_before = metrics.calls
+
+        await asyncio.gather(*(adapter.query() for _ in range(4)))
+
+        stats = metrics.stats()
+        assert stats['calls'] - calls_before == 4
+        assert stats['in_flight'] == 0
+        assert stats['peak_in_flight'] >= 4
+        assert stats['max_queue_wait_ms'] >= 40
+
+    def test_saturation_and_discarded_connections(self):
+        """接続プールを超える同時実行と、破棄された接続が記録されることのテスト"""
+        metrics = PoolMetrics(max_pool_connections=1, max_workers=1)
+        metrics.acquire()
+        metrics.acquire()
+        metrics.release()
+        metrics.release()
+
+        logger = logging.getLogger('test.urllib3.connectionpool')
+        logger.addFilter(_DiscardedConnectionCounter(metrics))
+        logger.warning("Connection pool is full, discarding connection: %s", 'dynamodb.ap-northeast-1.amazonaws.com')
+
+        assert metrics.stats()['saturated_calls'] == 1
+        assert metrics.stats()['discarded_connections'] == 1
@@ -0,0 +1,111 @@
+"""
+HTTP Cache Tests
+ETag・Last-Modifiedと条件付きGETのテスト
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.core.http_cache import content_etag, http_date, version_etag
+from app.dependencies import get_entity_cache, get_metrics_table, get_rollups_table, get_users_table
+from app.models.metric import MetricStatus, MetricSummary
+from app.routers import metrics, users
+
+
+@pytest.fixture
+def client(mock_users_table, mock_metrics_table):
+    """モックのテーブルでユーザー・メトリクスのルーターを起動したクライアント"""
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(metrics.router)
+    app.dependency_overrides[get_users_table] = lambda: mock_users_table
+    app.dependency_overrides[get_metrics_table] = lambda: mock_metrics_table
+    app.dependency_overrides[get_rollups_table] = lambda: None
+    app.dependency_overrides[get_entity_cache] = lambda: None
+    return TestClient(app)
+
+
+class TestValidators:
+    """ETag・HTTP日付の生成のテストクラス"""
+
+    def test_version_etag_changes_with_updated_at(self):
+        """updated_atが変わるとETagが変わることのテスト"""
+        updated_at = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+        etag = version_etag('user-001', updated_at)
+
+        assert etag.startswith('W/"')
+        assert etag == version_etag('user-001', updated_at)
+        assert etag != version_etag('user-001', updated_at.replace(second=1))
+        assert etag != version_etag('user-002', updated_at)
+
+    def test_content_etag(self):
+        """集計結果の内容が変わるとETagが変わることのテスト"""
+        summary = MetricSummary(
+            device_id='device-001', metric_name='temperature', total_count=1, avg_value=1.0, min_value=1.0,
+            max_value=1.0, latest_timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc), latest_value=1.0,
+            latest_status=MetricStatus.ACTIVE
+        )
+
+        assert content_etag([summary]) == content_etag([summary.model_copy()])
+        assert content_etag([summary]) != content_etag([summary.model_copy(update={'total_count': 2})])
+
+    def test_http_date(self):
+        """HTTP日付形式（秒未満切り捨て・GMT）への変換のテスト"""
+        assert http_date(datetime(2024, 1, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)) == 'Mon, 01 Jan 2024 12:00:00 GMT'
+        assert http_date(datetime(2024, 1, 1, 12, 0)) == 'Mon, 01 Jan 2024 12:00:00 GMT'
+
+
+class TestConditionalGet:
+    """条件付きGETのテストクラス"""
+
+    def test_user_if_none_match(self, client):
+        """ユーザー詳細のETag付与とIf-None-Match一致時の304のテスト"""
+        response = client.get('/users/user-001')
+        etag = response.headers['etag']
+        assert response.status_code == 200
+        assert response.headers['cache-control'] == 'private, no-cache'
+        assert response.headers['last-modified'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+        not_modified = client.get('/users/user-001', headers={'If-None-Match': f'"other", {etag}'})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b''
+        assert not_modified.headers['etag'] == etag
+        assert not_modified.headers['cache-control'] == 'private, no-cache'
+
+        assert client.get('/users/user-001', headers={'If-None-Match': '"other"'}).status_code == 200
+
+    def test_metric_if_modified_since(self, client):
+        """メトリクス詳細のIf-Modified-Since判定のテスト（If-None-Matchがある場合はそちらを優先）"""
+        assert client.get(
+            '/metrics/metric-001', headers={'If-Modified-Since': 'Mon, 01 Jan 2024 12:00:00 GMT'}
+        ).status_code == 304
+        assert client.get(
+            '/metrics/metric-001', headers={'If-Modified-Since': 'Mon, 01 Jan 2024 11:59:59 GMT'}
+        ).status_code == 200
+        assert client.get(
+            '/metrics/metric-001', headers={'If-Modified-Since': 'invalid'}
+        ).status_code == 200
+        assert client.get('/metrics/metric-001', headers={
+            'If-None-Match': '"other"', 'If-Modified-Since': 'Mon, 01 Jan 2024 12:00:00 GMT'
+        }).status_code == 200
+
+    def test_summary_etag(self, client):
+        """メトリクス集計の内容ハッシュによるETagのテスト"""
+        response = client.get('/metrics/summary')
+        assert response.status_code == 200
+        assert 'last-modified' not in response.headers
+        assert response.headers['cache-control'].startswith('public')
+
+        assert client.get('/metrics/summary', headers={'If-None-Match': response.headers['etag']}).status_code == 304
+
+    def test_disabled(self, client, monkeypatch):
+        """HTTP_CACHE_ENABLED=falseの場合は検証用ヘッダーを付与しないことのテスト"""
+        monkeypatch.setattr(get_settings(), 'HTTP_CACHE_ENABLED', False)
+
+        response = client.get('/users/user-001', headers={'If-None-Match': '*'})
+        assert response.status_code == 200
+        assert 'etag' not in response.headers
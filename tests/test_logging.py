@@ -0,0 +1,77 @@
+"""
+Logging Pipeline Tests
+キュー経由の非同期ログのテスト
+"""
+
+import io
+import json
+import logging
+import queue
+
+from app.core.logging import (
+    BatchingQueueListener, BatchingRotatingFileHandler, BatchingStreamHandler,
+    DroppingQueueHandler, LogPipelineStats, StructuredFormatter
+)
+
+
+def _make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+class TestLoggingPipeline:
+    """ログパイプラインのテストクラス"""
+
+    def test_records_are_written_in_batches(self):
+        """キューに登録したログが書き込みスレッドでJSONとして出力されることのテスト"""
+        stream = io.StringIO()
+        handler = BatchingStreamHandler(stream)
+        handler.setFormatter(StructuredFormatter())
+        stats = LogPipelineStats()
+        log_queue = queue.Queue(maxsize=1000)
+        listener = BatchingQueueListener(log_queue, [handler], stats, batch_size=50)
+        logger = _make_logger('test.pipeline', DroppingQueueHandler(log_queue, stats))
+
+        for i in range(100):
+            logger.info("Metric created: %s", f"metric-{i}")
+        listener.start()
+        listener.stop()
+
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(line)['message'] for line in lines] == [f"Metric created: metric-{i}" for i in range(100)]
+        assert stats.stats()['written'] == 100
+        assert stats.stats()['batches'] == 2
+
+    def test_drop_policy_under_overload(self):
+        """高水位を超えたらINFO以下、満杯で全レベルが破棄・計数されることのテスト"""
+        stats = LogPipelineStats()
+        log_queue = queue.Queue(maxsize=10)
+        logger = _make_logger('test.overload', DroppingQueueHandler(log_queue, stats))
+
+        for _ in range(20):
+            logger.info("info")
+        for _ in range(5):
+            logger.error("error")
+
+        assert log_queue.qsize() == 10
+        result = stats.stats()
+        assert result['enqueued'] == 10
+        assert result['dropped_by_level'] == {'INFO': 12, 'ERROR': 3}
+
+    def test_file_rotation_by_size(self, tmp_path):
+        """サイズ超過でファイルが切り替わることのテスト"""
+        log_file = tmp_path / 'portfolio-api.log'
+        handler = BatchingRotatingFileHandler(str(log_file), max_bytes=200, backup_count=2)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+        for i in range(5):
+            record = logging.LogRecord('test', logging.INFO, __file__, 0, 'x' * 80, None, None)
+            handler.emit_batch([record])
+        handler.close()
+
+        assert (tmp_path / 'portfolio-api.log.1').exists()
+        assert (tmp_path / 'portfolio-api.log.2').exists()
+        assert log_file.stat().st_size <= 200
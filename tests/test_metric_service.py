@@ -4,9 +4,14 @@ MetricService Tests
 """
 
 import pytest
+from decimal import Decimal
+from unittest.mock import Mock
 from datetime import datetime, timezone
 
+from botocore.exceptions import ClientError, EndpointConnectionError
+
 from app.services.metric_service import MetricService
+from app.core.exceptions import MetricNotFoundException, ValidationException
 from app.models.metric import MetricCreate, MetricUpdate, MetricResponse, MetricStatus
 
 
@@ -64,6 +69,94 @@ class TestMetricService:
         assert result.limit == 1
         assert result.offset == 1
     
+    @pytest.mark.asyncio
+    async def test_get_metrics_with_cursor(self, metric_service, mock_metrics_table):
+        """カーソルによるメトリクス一覧のページングテスト"""
+        first_page = await metric_service.get_metrics(limit=1)
+        second_page = await metric_service.get_metrics(limit=1, cursor=first_page.next_cursor)
+        
+        assert first_page.metrics[0].metric_id == 'metric-001'
+        assert second_page.metrics[0].metric_id == 'metric-002'
+        assert second_page.next_cursor is None
+    
+    @pytest.mark.asyncio
+    async def test_get_metrics_cursor_scope_mismatch(self, metric_service, mock_metrics_table):
+        """別のフィルター条件で発行されたカーソルの拒否テスト"""
+        first_page = await metric_service.get_metrics(limit=1)
+        
+        with pytest.raises(ValidationException):
+            await metric_service.get_metrics(limit=1, device_id='device-001', cursor=first_page.next_cursor)
+    
+    def test_plan_metrics_query_device(self, metric_service):
+        """デバイス指定時にプライマリキーのQueryが選択されることのテスト"""
+        plan = metric_service.plan_metrics_query(
+            device_id='device-001',
+            start=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            end=datetime(2024, 1, 2, tzinfo=timezone.utc)
+        )
+        
+        assert plan.describe() == 'query:primary'
+        assert plan.kwargs['KeyConditionExpression'] == "device_id = :device_id AND #ts BETWEEN :start AND :end"
+        assert plan.kwargs['ExpressionAttributeValues'][':start'] == '2024-01-01T00:00:00+00:00'
+        assert 'FilterExpression' not in plan.kwargs
+    
+    def test_plan_metrics_query_status(self, metric_service):
+        """ステータス指定時にstatus-indexのQueryが選択されることのテスト"""
+        plan = metric_service.plan_metrics_query(status=MetricStatus.ACTIVE)
+        
+        assert plan.describe() == 'query:status-index'
+        assert plan.kwargs['KeyConditionExpression'] == "#status = :status"
+    
+    def test_plan_metrics_query_scan_fallback(self, metric_service):
+        """キーが使えない場合にScanへフォールバックすることのテスト"""
+        plan = metric_service.plan_metrics_query(start=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        
+        assert plan.describe() == 'scan'
+        assert plan.kwargs['FilterExpression'] == "#ts >= :start"
+    
+    @pytest.mark.asyncio
+    async def test_get_metrics_with_time_range(self, metric_service, mock_metrics_table):
+        """時間範囲指定のメトリクス取得のテスト"""
+        result = await metric_service.get_metrics(
+            device_id='device-001',
+            start=datetime(2024, 1, 2, tzinfo=timezone.utc)
+        )
+        
+        assert result.metrics == []
+        assert metric_service.last_query_plan.describe() == 'query:primary'
+    
+    @pytest.mark.asyncio
+    async def test_iter_device_metrics_pages(self, mock_metrics_table):
+        """デバイス履歴がページを辿って1件ずつ返されることのテスト"""
+        base_item = mock_metrics_table.get_item(
+            Key={'device_id': 'device-001', 'timestamp': '2024-01-01T12:00:00+00:00'}
+        )['Item']
+        pages = [
+            {
+                'Items': [{**base_item, 'metric_id': 'metric-a'}, {**base_item, 'metric_id': 'metric-b'}],
+                'LastEvaluatedKey': {'device_id': 'device-001', 'timestamp': '2024-01-01T12:00:00+00:00'}
+            },
+            {'Items': [{**base_item, 'metric_id': 'metric-c'}]}
+        ]
+        requests = []
+        
+        def paged_query(**kwargs):
+            requests.append(kwargs)
+            return pages[len(requests) - 1]
+        
+        mock_metrics_table.query = paged_query
+        service = MetricService(mock_metrics_table)
+        metrics = [m async for m in service.iter_device_metrics(
+            'device-001',
+            start=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            end=datetime(2024, 1, 2, tzinfo=timezone.utc),
+            page_size=2
+        )]
+        
+        assert [m.metric_id for m in metrics] == ['metric-a', 'metric-b', 'metric-c']
+        assert requests[0]['Limit'] == 2
+        assert requests[1]['ExclusiveStartKey'] == pages[0]['LastEvaluatedKey']
+    
     @pytest.mark.asyncio
     async def test_get_latest_metrics_all_devices(self, metric_service, mock_metrics_table):
         """全デバイスの最新メトリクス取得のテスト"""
@@ -94,13 +187,12 @@ class TestMetricService:
         assert result is not None
         assert len(result) > 0
         
-        # デバイス001の集計確認
-        device_001_summary = next((s for s in result if s.device_id == 'device-001'), None)
-        assert device_001_summary is not None
-        assert device_001_summary.total_metrics == 2
-        assert device_001_summary.active_metrics == 2
-        assert 'temperature' in device_001_summary.metric_types
-        assert 'humidity' in device_001_summary.metric_types
+        # デバイス001の集計確認（メトリクス名ごとに1行）
+        device_001_summaries = {s.metric_name: s for s in result if s.device_id == 'device-001'}
+        assert set(device_001_summaries) == {'temperature', 'humidity'}
+        assert device_001_summaries['temperature'].total_count == 1
+        assert device_001_summaries['temperature'].avg_value == 25.5
+        assert device_001_summaries['humidity'].latest_value == 60.0
     
     @pytest.mark.asyncio
     async def test_get_metrics_summary_specific_device(self, metric_service, mock_metrics_table):
@@ -108,12 +200,134 @@ class TestMetricService:
         result = await metric_service.get_metrics_summary(device_id='device-001')
         
         assert result is not None
+        assert len(result) == 2
+        
+        for summary in result:
+            assert summary.device_id == 'device-001'
+            assert summary.total_count == 1
+            assert summary.min_value == summary.max_value == summary.latest_value
+    
+    @pytest.mark.asyncio
+    async def test_get_metrics_summary_from_rollups(self, mock_metrics_table):
+        """ロールアップ表からの集計取得のテスト（メトリクス表を走査しない）"""
+        rollups_table = Mock()
+        rollups_table.query.return_value = {
+            'Items': [{
+                'device_id': 'device-001',
+                'metric_name': 'temperature',
+                'total_count': Decimal('4'),
+                'sum_value': Decimal('100'),
+                'min_value': Decimal('20'),
+                'max_value': Decimal('30'),
+                'latest_value': Decimal('22'),
+                'latest_timestamp': '2024-01-01T12:00:00+00:00',
+                'latest_status': 'active'
+            }]
+        }
+        mock_metrics_table.scan = Mock()
+        mock_metrics_table.query = Mock()
+        service = MetricService(mock_metrics_table, rollups_table)
+        
+        result = await service.get_metrics_summary(device_id='device-001')
+        
         assert len(result) == 1
+        assert result[0].avg_value == 25.0
+        assert result[0].max_value == 30.0
+        mock_metrics_table.scan.assert_not_called()
+        mock_metrics_table.query.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_create_metric_updates_rollup(self, mock_metrics_table, sample_metric_create):
+        """メトリクス作成時にロールアップが増分更新されることのテスト"""
+        rollups_table = Mock()
+        rollups_table.update_item.return_value = {'Attributes': {}}
+        service = MetricService(mock_metrics_table, rollups_table)
+        
+        await service.create_metric(sample_metric_create)
+        
+        first_call = rollups_table.update_item.call_args_list[0].kwargs
+        assert first_call['Key'] == {
+            'device_id': sample_metric_create.device_id,
+            'metric_name': sample_metric_create.metric_name
+        }
+        assert first_call['UpdateExpression'].startswith('ADD total_count :count, sum_value :sum')
+        assert first_call['ExpressionAttributeValues'][':count'] == 1
+        # 初回は最小・最大値も条件付きで設定される
+        conditions = [c.kwargs.get('ConditionExpression') for c in rollups_table.update_item.call_args_list[1:]]
+        assert any('min_value' in c for c in conditions)
+        assert any('max_value' in c for c in conditions)
+    
+    @pytest.mark.asyncio
+    async def test_delete_metric_marks_rollup_rebuild(self, mock_metrics_table):
+        """最大値のメトリクス削除で再集計が予約されることのテスト"""
+        rollups_table = Mock()
+        rollups_table.update_item.return_value = {
+            'Attributes': {
+                'total_count': Decimal('2'),
+                'min_value': Decimal('20'),
+                'max_value': Decimal('25.5'),
+                'latest_timestamp': '2024-01-02T00:00:00+00:00'
+            }
+        }
+        mock_metrics_table.delete_item = Mock(return_value={
+            'Attributes': {
+                'metric_id': 'metric-001',
+                'device_id': 'device-001',
+                'metric_name': 'temperature',
+                'value': Decimal('25.5'),
+                'timestamp': '2024-01-01T00:00:00+00:00',
+                'status': 'active'
+            }
+        })
+        service = MetricService(mock_metrics_table, rollups_table)
+        
+        await service.delete_metric('metric-001')
+        
+        expressions = [c.kwargs['UpdateExpression'] for c in rollups_table.update_item.call_args_list]
+        assert expressions[0] == 'ADD total_count :minus_one, sum_value :minus_value'
+        assert 'SET needs_rebuild = :true' in expressions
+    
+    @pytest.mark.asyncio
+    async def test_rollup_failure_marks_rebuild(self, mock_metrics_table, sample_metric_create):
+        """ロールアップの更新に失敗した場合に再集計が予約されることのテスト"""
+        rollups_table = Mock()
+        rollups_table.update_item.side_effect = [
+            ClientError({'Error': {'Code': 'InternalServerError', 'Message': 'error'}}, 'UpdateItem'),
+            {}
+        ]
+        service = MetricService(mock_metrics_table, rollups_table)
+        
+        result = await service.create_metric(sample_metric_create)
         
-        summary = result[0]
-        assert summary.device_id == 'device-001'
-        assert summary.total_metrics == 2
-        assert summary.active_metrics == 2
+        assert result.device_id == sample_metric_create.device_id
+        last_call = rollups_table.update_item.call_args_list[-1].kwargs
+        assert last_call['Key'] == {
+            'device_id': sample_metric_create.device_id,
+            'metric_name': sample_metric_create.metric_name
+        }
+        assert last_call['UpdateExpression'] == 'SET needs_rebuild = :true'
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_rollups(self, mock_metrics_table):
+        """メトリクス表の全件からロールアップ表が再構築されることのテスト"""
+        rollups_table = Mock()
+        rollups_table.scan.return_value = {
+            'Items': [
+                {'device_id': 'device-001', 'metric_name': 'temperature', 'needs_rebuild': True},
+                {'device_id': 'device-999', 'metric_name': 'temperature'}
+            ]
+        }
+        service = MetricService(mock_metrics_table, rollups_table)
+        
+        counts = await service.rebuild_rollups()
+        
+        assert counts == {'metrics': 2, 'rollups': 2, 'removed': 1}
+        written = {call.kwargs['Item']['metric_name']: call.kwargs['Item'] for call in rollups_table.put_item.call_args_list}
+        assert set(written) == {'temperature', 'humidity'}
+        assert written['temperature']['total_count'] == 1
+        assert 'needs_rebuild' not in written['temperature']
+        rollups_table.delete_item.assert_called_once()
+        assert rollups_table.delete_item.call_args.kwargs['Key'] == {'device_id': 'device-999', 'metric_name': 'temperature'}
     
     @pytest.mark.asyncio
     async def test_get_metric_success(self, metric_service, mock_metrics_table):
@@ -151,6 +365,107 @@ class TestMetricService:
         assert result.created_at is not None
         assert result.updated_at is not None
     
+    @pytest.mark.asyncio
+    async def test_create_metrics_batch_chunks(self, metric_service, mock_metrics_table, sample_metric_create):
+        """メトリクス一括作成が25件ずつ分割されることのテスト"""
+        result = await metric_service.create_metrics_batch([sample_metric_create] * 60)
+        
+        assert result.total_count == 60
+        assert result.success_count == 60
+        assert result.failure_count == 0
+        assert [r.index for r in result.results] == list(range(60))
+        
+        batch_write = mock_metrics_table.meta.client.batch_write_item
+        assert batch_write.call_count == 3
+        chunk_sizes = sorted(len(c.kwargs['RequestItems']['portfolio-metrics']) for c in batch_write.call_args_list)
+        assert chunk_sizes == [10, 25, 25]
+    
+    @pytest.mark.asyncio
+    async def test_create_metrics_batch_retries_unprocessed(self, metric_service, mock_metrics_table, sample_metric_create):
+        """UnprocessedItemsが再試行されることのテスト"""
+        calls = []
+        
+        def flaky_batch_write_item(**kwargs):
+            requests = kwargs['RequestItems']['portfolio-metrics']
+            calls.append(len(requests))
+            if len(calls) == 1:
+                return {'UnprocessedItems': {'portfolio-metrics': requests[:2]}}
+            return {'UnprocessedItems': {}}
+        
+        mock_metrics_table.meta.client.batch_write_item.side_effect = flaky_batch_write_item
+        result = await metric_service.create_metrics_batch([sample_metric_create] * 5)
+        
+        assert calls == [5, 2]
+        assert result.success_count == 5
+    
+    @pytest.mark.asyncio
+    async def test_create_metrics_batch_reports_failures(self, metric_service, mock_metrics_table, sample_metric_create):
+        """不正な項目と再試行上限超過が項目別の失敗になることのテスト"""
+        mock_metrics_table.meta.client.batch_write_item.side_effect = (
+            lambda **kwargs: {'UnprocessedItems': kwargs['RequestItems']}
+        )
+        result = await metric_service.create_metrics_batch(
+            [ValueError("invalid item"), sample_metric_create]
+        )
+        
+        assert result.failure_count == 2
+        assert result.results[0].error == "invalid item"
+        assert result.results[0].metric_id is None
+        assert result.results[1].metric_id is not None
+        assert result.results[1].success is False
+    
+    @pytest.mark.asyncio
+    async def test_create_metrics_batch_same_device(self, metric_service, mock_metrics_table, sample_metric_create):
+        """同一デバイスの複数件でキー（device_id + timestamp）が重複しないことのテスト"""
+        measured_at = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+        readings = [sample_metric_create] * 30 + [
+            sample_metric_create.model_copy(update={'timestamp': measured_at}),
+            sample_metric_create.model_copy(update={'metric_name': 'humidity', 'timestamp': measured_at})
+        ]
+        
+        result = await metric_service.create_metrics_batch(readings)
+        
+        assert result.success_count == 32
+        items = [
+            request['PutRequest']['Item']
+            for call in mock_metrics_table.meta.client.batch_write_item.call_args_list
+            for request in call.kwargs['RequestItems']['portfolio-metrics']
+        ]
+        keys = {(item['device_id']['S'], item['timestamp']['S']) for item in items}
+        assert len(keys) == 32
+        # 指定した計測日時はそのまま使い、重複分のみずらす
+        device_id = sample_metric_create.device_id
+        assert (device_id, '2024-01-01T12:00:00+00:00') in keys
+        assert (device_id, '2024-01-01T12:00:00.000001+00:00') in keys
+    
+    @pytest.mark.asyncio
+    async def test_create_metrics_batch_retries_only_throttling(self, metric_service, mock_metrics_table, sample_metric_create):
+        """スロットリングのみ再試行し、その他のエラーは再試行せず項目別の失敗になることのテスト"""
+        calls = []
+        
+        def batch_write_item(**kwargs):
+            calls.append(len(kwargs['RequestItems']['portfolio-metrics']))
+            if len(calls) == 1:
+                raise ClientError({'Error': {'Code': 'ValidationException', 'Message': 'bad'}}, 'BatchWriteItem')
+            if len(calls) == 2:
+                raise EndpointConnectionError(endpoint_url='http://dynamodb')
+            if len(calls) == 3:
+                raise ClientError(
+                    {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'slow down'}},
+                    'BatchWriteItem'
+                )
+            return {'UnprocessedItems': {}}
+        
+        mock_metrics_table.meta.client.batch_write_item.side_effect = batch_write_item
+        result = await metric_service.create_metrics_batch([sample_metric_create] * 60)
+        
+        # 3チャンク（25/25/10件）のうち、スロットリングのチャンクのみ再試行される
+        assert len(calls) == 4
+        assert calls[2] == calls[3]
+        assert result.success_count == calls[3]
+        assert result.failure_count == 60 - calls[3]
+        assert {r.error is not None for r in result.results if not r.success} == {True}
+    
     @pytest.mark.asyncio
     async def test_update_metric_success(self, metric_service, mock_metrics_table, sample_metric_update):
         """メトリクス更新の成功テスト"""
@@ -178,6 +493,51 @@ class TestMetricService:
         
         assert result is True
     
+    @pytest.mark.asyncio
+    async def test_update_metric_single_call(self, mock_metrics_table, sample_metric_update):
+        """metric-id-indexでキーを解決し、テーブルのキー（device_id + timestamp）への条件付きの1回の書き込みで更新することのテスト"""
+        update_item = mock_metrics_table.update_item
+        mock_metrics_table.update_item = Mock(side_effect=update_item)
+        mock_metrics_table.get_item = Mock()
+        
+        result = await MetricService(mock_metrics_table).update_metric('metric-002', sample_metric_update)
+        
+        assert result.metric_id == 'metric-002'
+        assert result.value == 1015.0
+        assert result.status == MetricStatus.INACTIVE
+        mock_metrics_table.get_item.assert_not_called()
+        kwargs = mock_metrics_table.update_item.call_args.kwargs
+        assert kwargs['Key'] == {'device_id': 'device-001', 'timestamp': '2024-01-01T12:00:01+00:00'}
+        assert kwargs['ConditionExpression'] == 'metric_id = :metric_id'
+        assert kwargs['ExpressionAttributeValues'][':metric_id'] == 'metric-002'
+        assert kwargs['ExpressionAttributeNames'] == {'#value': 'value', '#status': 'status'}
+        assert '#value' not in kwargs['ExpressionAttributeValues']
+    
+    @pytest.mark.asyncio
+    async def test_delete_metric_uses_table_key(self, mock_metrics_table):
+        """メトリクス削除がテーブルのキー（device_id + timestamp）で行われることのテスト"""
+        delete_item = mock_metrics_table.delete_item
+        mock_metrics_table.delete_item = Mock(side_effect=delete_item)
+        
+        assert await MetricService(mock_metrics_table).delete_metric('metric-001') is True
+        
+        kwargs = mock_metrics_table.delete_item.call_args.kwargs
+        assert kwargs['Key'] == {'device_id': 'device-001', 'timestamp': '2024-01-01T12:00:00+00:00'}
+        assert kwargs['ConditionExpression'] == 'metric_id = :metric_id'
+        assert await MetricService(mock_metrics_table).get_metric('metric-001') is None
+    
+    @pytest.mark.asyncio
+    async def test_update_metric_not_found(self, metric_service, sample_metric_update):
+        """存在しないメトリクス更新のテスト"""
+        with pytest.raises(MetricNotFoundException):
+            await metric_service.update_metric('metric-999', sample_metric_update)
+    
+    @pytest.mark.asyncio
+    async def test_delete_metric_not_found(self, metric_service):
+        """存在しないメトリクス削除のテスト"""
+        with pytest.raises(MetricNotFoundException):
+            await metric_service.delete_metric('metric-999')
+    
     @pytest.mark.asyncio
     async def test_get_metrics_with_complex_filters(self, metric_service, mock_metrics_table):
         """複合フィルター付きメトリクス取得のテスト"""
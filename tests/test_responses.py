@@ -0,0 +1,69 @@
+"""
+Response Tests
+検証済みモデルを直接エンコードするレスポンスのテスト
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.core.responses import FastJSONResponse, fast_json_response
+from app.models.metric import MetricListResponse, MetricResponse
+
+
+def _metric_items(count: int):
+    """DynamoDBから読み出した形式のメトリクス"""
+    return [
+        {
+            'metric_id': f'metric-{i:03d}',
+            'device_id': 'device-001',
+            'metric_name': 'temperature',
+            'value': Decimal('23.5') + i,
+            'unit': 'celsius',
+            'status': 'active',
+            'metadata': {'location': 'room-a', 'floor': Decimal('3')},
+            'timestamp': '2024-01-01T00:00:00+00:00',
+            'created_at': '2024-01-01T00:00:00+00:00',
+            'updated_at': '2024-01-01T00:00:00+00:00'
+        }
+        for i in range(count)
+    ]
+
+
+def _list_response() -> MetricListResponse:
+    metrics = [MetricResponse(**item) for item in _metric_items(3)]
+    return MetricListResponse(metrics=metrics, total_count=3, limit=10, offset=0, next_cursor='cursor')
+
+
+class TestFastJSONResponse:
+    """FastJSONResponseのテストクラス"""
+
+    def test_same_body_as_response_model(self):
+        """response_modelを経由した場合と同じJSONとなることのテスト"""
+        app = FastAPI()
+
+        @app.get('/default', response_model=MetricListResponse)
+        async def default():
+            return _list_response()
+
+        @app.get('/fast', response_model=MetricListResponse)
+        async def fast(response: Response):
+            response.headers['X-Query-Plan'] = 'query:primary'
+            return fast_json_response(_list_response(), response)
+
+        client = TestClient(app)
+        default_response = client.get('/default')
+        fast_response = client.get('/fast')
+
+        assert fast_response.content == default_response.content
+        assert fast_response.headers['content-type'] == 'application/json'
+        assert fast_response.headers['x-query-plan'] == 'query:primary'
+
+    def test_render_plain_content(self):
+        """モデル以外の内容（Decimal・datetime・モデルを含む辞書）のエンコードのテスト"""
+        timestamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        response = FastJSONResponse({'value': Decimal('1.5'), 'at': timestamp, 'items': [_list_response()]})
+
+        assert response.body.startswith(b'{"value":1.5,"at":"2024-01-01T00:00:00+00:00","items":[{"metrics"')
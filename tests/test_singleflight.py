@@ -0,0 +1,86 @@
+"""
+Single-Flight Tests
+同時読み取りの合流のテスト
+"""
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from app.core.singleflight import SingleFlight, make_key
+from app.services.metric_service import MetricService
+
+
+class TestSingleFlight:
+    """SingleFlightのテストクラス"""
+
+    def test_make_key_normalizes_params(self):
+        """パラメーター順序に依存しないキーのテスト"""
+        assert make_key('latest', device_id='d1', limit=10) == make_key('latest', limit=10, device_id='d1')
+        assert make_key('latest', device_id='d1', limit=10) != make_key('latest', device_id='d1', limit=5)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """同一キーの同時呼び出しが1回の実行にまとまることのテスト"""
+        single_flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {'value': 42}
+
+        results = await asyncio.gather(*(single_flight.do('key', load) for _ in range(20)))
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert single_flight.stats() == {'in_flight': 0, 'executions': 1, 'coalesced': 19}
+
+        # 完了後は新たに実行される
+        await single_flight.do('key', load)
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_exception_fans_out(self):
+        """例外が待機中の全呼び出し元に伝わることのテスト"""
+        single_flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('boom')
+
+        results = await asyncio.gather(*(single_flight.do('key', fail) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_leader_cancellation_does_not_cancel_followers(self):
+        """最初の呼び出し元のキャンセルが他の呼び出し元に影響しないことのテスト"""
+        single_flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        leader = asyncio.ensure_future(single_flight.do('key', load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(single_flight.do('key', load))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == 'done'
+
+    @pytest.mark.asyncio
+    async def test_latest_metrics_coalesced(self, mock_metrics_table):
+        """最新メトリクスの同時取得でQueryが1回になることのテスト"""
+        mock_metrics_table.query = Mock(side_effect=mock_metrics_table.query)
+        single_flight = SingleFlight()
+
+        results = await asyncio.gather(*(
+            MetricService(mock_metrics_table, single_flight=single_flight).get_latest_metrics(device_id='device-001')
+            for _ in range(10)
+        ))
+
+        assert mock_metrics_table.query.call_count == 1
+        assert all(len(result) == 2 for result in results)
@@ -0,0 +1,87 @@
+"""
+Startup Tests
+起動時のウォームアップのテスト
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.core.logging import setup_logging
+from app.core.startup import StartupState
+
+
+class TestStartupState:
+    """StartupStateのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_warm_up_runs_sync_and_async_steps(self):
+        """同期・非同期のステップが順に実行されることのテスト"""
+        calls = []
+
+        async def async_step():
+            await asyncio.sleep(0)
+            calls.append('async')
+
+        state = StartupState()
+        await state.warm_up([('sync', lambda: calls.append('sync')), ('async', async_step)])
+
+        assert calls == ['sync', 'async']
+        assert state.ready
+        assert state.stats()['steps']['sync']['status'] == 'ready'
+
+    @pytest.mark.asyncio
+    async def test_failed_step_marks_degraded(self):
+        """失敗したステップがあっても残りを実行し、degradedとなることのテスト"""
+        def failing():
+            raise RuntimeError('Unable to locate credentials')
+
+        calls = []
+        state = StartupState()
+        await state.warm_up([('dynamodb_client', failing), ('metric_wal', lambda: calls.append('wal'))])
+
+        assert calls == ['wal']
+        assert not state.ready
+        assert state.status == 'degraded'
+        assert state.steps['dynamodb_client'] == {
+            'status': 'failed',
+            'error': 'Unable to locate credentials',
+            'duration_ms': state.steps['dynamodb_client']['duration_ms']
+        }
+
+
+def test_setup_logging_is_idempotent():
+    """2回目以降のsetup_loggingでハンドラーが重複しないことのテスト"""
+    root_logger = logging.getLogger()
+    handlers = list(root_logger.handlers)
+    try:
+        setup_logging(force=True, async_logging=False)
+        configured = list(root_logger.handlers)
+        setup_logging(log_level="DEBUG")
+
+        assert root_logger.handlers == configured
+        assert root_logger.level == logging.INFO
+    finally:
+        root_logger.handlers = handlers
+
+
+def test_health_router_import_skips_aws_sdk():
+    """ヘルスチェックルーターのimportでboto3・botocore・numpyが読み込まれないことのテスト"""
+    code = (
+        "import sys; import app.routers.health; "
+        "print(','.join(m for m in ('boto3', 'botocore', 'numpy') if m in sys.modules))"
+    )
+    src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, "PYTHONPATH": src_dir},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    assert result.stdout.strip() == ""
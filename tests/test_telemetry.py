@@ -0,0 +1,134 @@
+"""
+Telemetry Tests
+レイテンシ計測とPrometheusテキスト形式出力のテスト
+"""
+
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.core.dynamodb import SyncTable
+from app.core.telemetry import (
+    DYNAMODB_CONSUMED_CAPACITY, DYNAMODB_OPERATION_DURATION, HTTP_REQUEST_DURATION, Counter, Histogram,
+    MetricsRegistry
+)
+from app.middleware import UNMATCHED_ROUTE, RequestMetricsMiddleware
+from app.routers import telemetry
+
+
+class TestMetricsRegistry:
+    """計測値とテキスト形式出力のテストクラス"""
+
+    def test_histogram_render_cumulative_buckets(self):
+        """ヒストグラムが累積バケット・合計・件数で出力されることのテスト"""
+        registry = MetricsRegistry()
+        histogram = registry.register(Histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0)))
+
+        histogram.observe(0.05, route='/a')
+        histogram.observe(0.5, route='/a')
+        histogram.observe(2.0, route='/a')
+
+        output = registry.render()
+        assert '# TYPE latency_seconds histogram' in output
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{route="/a",le="1"} 2' in output
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in output
+        assert 'latency_seconds_sum{route="/a"} 2.55' in output
+        assert 'latency_seconds_count{route="/a"} 3' in output
+
+    def test_counter_render_and_duplicate_registration(self):
+        """カウンターの出力とラベル値のエスケープ、重複登録のテスト"""
+        registry = MetricsRegistry()
+        counter = registry.register(Counter('units_total', 'Units.', ('table',)))
+        counter.inc(1.5, table='a"b')
+
+        assert 'units_total{table="a\\"b"} 1.5' in registry.render()
+        with pytest.raises(ValueError):
+            registry.register(Counter('units_total', 'Units.'))
+
+
+class TestRequestMetricsMiddleware:
+    """リクエスト計測ミドルウェアのテストクラス"""
+
+    def test_records_route_template(self):
+        """パスパラメータを含まないルートテンプレートで記録されることのテスト"""
+        app = FastAPI()
+        app.add_middleware(RequestMetricsMiddleware)
+
+        @app.get('/telemetry-test/{item_id}')
+        async def read_item(item_id: str):
+            return {'item_id': item_id}
+
+        before = HTTP_REQUEST_DURATION.count(route='/telemetry-test/{item_id}', method='GET', status='200')
+        unmatched_before = HTTP_REQUEST_DURATION.count(route=UNMATCHED_ROUTE, method='GET', status='404')
+
+        client = TestClient(app)
+        assert client.get('/telemetry-test/a').status_code == 200
+        assert client.get('/telemetry-test/b').status_code == 200
+        assert client.get('/no-such-route').status_code == 404
+
+        assert HTTP_REQUEST_DURATION.count(route='/telemetry-test/{item_id}', method='GET', status='200') == before + 2
+        assert HTTP_REQUEST_DURATION.count(route=UNMATCHED_ROUTE, method='GET', status='404') == unmatched_before + 1
+
+
+class TestMetricsEndpoint:
+    """計測値エンドポイントのアクセス制御のテストクラス"""
+
+    def test_requires_bearer_token(self, monkeypatch):
+        """トークンが一致しない場合は401、一致する場合はテキスト形式を返すことのテスト"""
+        monkeypatch.setattr(get_settings(), 'TELEMETRY_METRICS_TOKEN', 'secret')
+        app = FastAPI()
+        app.include_router(telemetry.router)
+        client = TestClient(app)
+        path = get_settings().TELEMETRY_METRICS_PATH
+
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+        response = client.get(path, headers={'Authorization': 'Bearer secret'})
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/plain')
+        assert '# TYPE http_request_duration_seconds histogram' in response.text
+
+    def test_empty_token_rejects_all(self, monkeypatch):
+        """トークンが未設定の場合は常に401を返すことのテスト"""
+        monkeypatch.setattr(get_settings(), 'TELEMETRY_METRICS_TOKEN', '')
+        app = FastAPI()
+        app.include_router(telemetry.router)
+
+        response = TestClient(app).get(get_settings().TELEMETRY_METRICS_PATH, headers={'Authorization': 'Bearer '})
+        assert response.status_code == 401
+
+
+class TestDynamoDBTelemetry:
+    """DynamoDB呼び出し計測のテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_records_consumed_capacity_and_outcome(self):
+        """消費キャパシティの要求・集計と、エラーコード別の記録のテスト"""
+        table = Mock()
+        table.name = 'telemetry-test'
+        table.get_item.return_value = {
+            'Item': {'id': '1'},
+            'ConsumedCapacity': {'TableName': 'telemetry-test', 'CapacityUnits': 0.5}
+        }
+        table.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'throttled'}}, 'PutItem'
+        )
+        adapter = SyncTable(table)
+        capacity_before = DYNAMODB_CONSUMED_CAPACITY.value(operation='get_item', table='telemetry-test')
+
+        await adapter.get_item(Key={'id': '1'})
+        with pytest.raises(ClientError):
+            await adapter.put_item(Item={'id': '1'})
+
+        assert table.get_item.call_args.kwargs['ReturnConsumedCapacity'] == 'TOTAL'
+        assert DYNAMODB_CONSUMED_CAPACITY.value(operation='get_item', table='telemetry-test') == capacity_before + 0.5
+        assert DYNAMODB_OPERATION_DURATION.count(operation='get_item', table='telemetry-test', outcome='ok') >= 1
+        assert DYNAMODB_OPERATION_DURATION.count(
+            operation='put_item', table='telemetry-test', outcome='ProvisionedThroughputExceededException'
+        ) >= 1
@@ -0,0 +1,171 @@
+"""
+Tracing Tests
+リクエストIDの伝播とスパン記録のテスト
+"""
+
+import json
+import logging
+from unittest.mock import Mock
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import tracing
+from app.core.dynamodb import SyncTable
+from app.core.logging import RequestContextFilter
+from app.core.tracing import (
+    BatchSpanProcessor, FileSpanExporter, TracedRoute, Tracer, get_request_id, get_tracer, parse_traceparent,
+    set_request_id, reset_request_id, trace_methods
+)
+from app.middleware import RequestContextMiddleware
+
+
+class InMemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    """記録したスパンをメモリに保持するTracerを設定"""
+    exporter = InMemoryExporter()
+    processor = BatchSpanProcessor(exporter, flush_interval=0.01)
+    processor.start()
+    monkeypatch.setattr(tracing, '_tracer', Tracer('test', processor))
+    yield exporter
+    processor.shutdown()
+
+
+def _flush():
+    get_tracer().processor.shutdown()
+    return {span.name: span for span in tracing.get_tracer().processor.exporter.spans}
+
+
+class TestTracer:
+    """Tracerのテストクラス"""
+
+    def test_parse_traceparent(self):
+        """traceparentヘッダーの解析のテスト"""
+        trace_id, span_id = 'a' * 32, 'b' * 16
+        assert parse_traceparent(f'00-{trace_id}-{span_id}-01') == (trace_id, span_id, True)
+        assert parse_traceparent(f'00-{trace_id}-{span_id}-00') == (trace_id, span_id, False)
+        assert parse_traceparent('00-invalid') is None
+        assert parse_traceparent(f'00-{"0" * 32}-{span_id}-01') is None
+
+    def test_disabled_tracer_does_not_record(self):
+        """processor未設定の場合はスパンを記録しないことのテスト"""
+        with Tracer().start_span('noop') as span:
+            span.set_attribute('key', 'value')
+            assert not span.recording
+            assert tracing.get_current_span() is None
+
+    @pytest.mark.asyncio
+    async def test_nested_spans_and_trace_methods(self, exporter):
+        """入れ子のスパンの親子関係と、サービスメソッドの記録・例外の記録のテスト"""
+
+        @trace_methods
+        class Service:
+            async def run(self):
+                with get_tracer().start_span('inner'):
+                    return 'done'
+
+            async def fail(self):
+                raise ValueError('boom')
+
+        with get_tracer().start_span('root') as root:
+            assert await Service().run() == 'done'
+            with pytest.raises(ValueError):
+                await Service().fail()
+
+        spans = _flush()
+        assert spans['Service.run'].parent_span_id == root.span_id
+        assert spans['inner'].parent_span_id == spans['Service.run'].span_id
+        assert {span.trace_id for span in spans.values()} == {root.trace_id}
+        assert spans['Service.fail'].status == 'error'
+        assert spans['Service.fail'].attributes['exception.type'] == 'ValueError'
+
+    def test_file_exporter_writes_otlp_json(self, tmp_path):
+        """ファイル出力がOTLP/JSON形式となることのテスト"""
+        path = tmp_path / 'traces.jsonl'
+        span = tracing.Span('op', 'c' * 32, attributes={'db.system': 'dynamodb', 'count': 2})
+        span.end()
+
+        FileSpanExporter(str(path), 'portfolio-api').export([span])
+
+        payload = json.loads(path.read_text().splitlines()[0])
+        resource_spans = payload['resourceSpans'][0]
+        assert resource_spans['resource']['attributes'][0]['value'] == {'stringValue': 'portfolio-api'}
+        exported = resource_spans['scopeSpans'][0]['spans'][0]
+        assert exported['traceId'] == 'c' * 32
+        assert {'key': 'count', 'value': {'intValue': '2'}} in exported['attributes']
+
+
+class TestRequestContext:
+    """リクエストIDとサーバースパンのテストクラス"""
+
+    @staticmethod
+    def _create_app(table):
+        router = APIRouter(route_class=TracedRoute)
+
+        @router.get('/items/{item_id}')
+        async def read_item(item_id: str):
+            await SyncTable(table).get_item(Key={'id': item_id})
+            return {'request_id': get_request_id()}
+
+        app = FastAPI()
+        app.add_middleware(RequestContextMiddleware)
+        app.include_router(router)
+        return app
+
+    def test_request_id_propagation(self):
+        """リクエストIDの引き継ぎ・発行とレスポンスヘッダーへの付与のテスト"""
+        client = TestClient(self._create_app(Mock()))
+
+        response = client.get('/items/1', headers={'X-Request-ID': 'req-123'})
+        assert response.headers['x-request-id'] == 'req-123'
+        assert response.json()['request_id'] == 'req-123'
+
+        # 不正な形式のIDは引き継がず新規に発行
+        response = client.get('/items/1', headers={'X-Request-ID': 'bad id\n'})
+        assert response.headers['x-request-id'] == response.json()['request_id'] != 'bad id\n'
+
+    def test_spans_per_hop(self, exporter):
+        """サーバー・ハンドラー・DynamoDB呼び出しのスパンが1つのトレースに記録されることのテスト"""
+        table = Mock()
+        table.name = 'items'
+        table.get_item.return_value = {'Item': {'id': '1'}}
+        client = TestClient(self._create_app(table))
+        trace_id = 'd' * 32
+
+        client.get('/items/1', headers={'traceparent': f'00-{trace_id}-{"e" * 16}-01'})
+
+        spans = _flush()
+        server = spans['GET /items/{item_id}']
+        handler = spans['handler read_item']
+        dynamodb = spans['DynamoDB.get_item']
+        assert server.parent_span_id == 'e' * 16
+        assert handler.parent_span_id == server.span_id
+        assert dynamodb.parent_span_id == handler.span_id
+        assert {server.trace_id, handler.trace_id, dynamodb.trace_id} == {trace_id}
+        assert server.attributes['http.response.status_code'] == 200
+        assert dynamodb.attributes['aws.dynamodb.table_names'] == ['items']
+
+    def test_log_records_include_request_id(self, exporter):
+        """ログレコードにリクエストID・トレースIDが付与されることのテスト"""
+        record = logging.LogRecord('test', logging.INFO, __file__, 1, 'message', None, None)
+        token = set_request_id('req-456')
+        try:
+            with get_tracer().start_span('log') as span:
+                RequestContextFilter().filter(record)
+        finally:
+            reset_request_id(token)
+
+        assert record.request_id == 'req-456'
+        assert record.trace_id == span.trace_id
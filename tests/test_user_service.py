@@ -5,8 +5,12 @@ UserService Tests
 
 import pytest
 from datetime import datetime, timezone
+from unittest.mock import Mock
+
+from botocore.exceptions import ClientError
 
 from app.services.user_service import UserService
+from app.core.exceptions import UserAlreadyExistsException, UserNotFoundException, ValidationException
 from app.models.user import UserCreate, UserUpdate, UserResponse
 
 
@@ -49,6 +53,30 @@ class TestUserService:
         assert user.username == 'testuser2'
         assert user.email == 'test2@example.com'
     
+    @pytest.mark.asyncio
+    async def test_get_users_with_cursor(self, user_service, mock_users_table):
+        """カーソルによるユーザー一覧のページングテスト"""
+        first_page = await user_service.get_users(limit=1)
+        
+        assert len(first_page.users) == 1
+        assert first_page.users[0].user_id == 'user-001'
+        assert first_page.next_cursor is not None
+        
+        second_page = await user_service.get_users(limit=1, cursor=first_page.next_cursor)
+        
+        assert len(second_page.users) == 1
+        assert second_page.users[0].user_id == 'user-002'
+        assert second_page.next_cursor is None
+    
+    @pytest.mark.asyncio
+    async def test_get_users_with_tampered_cursor(self, user_service, mock_users_table):
+        """改ざんされたカーソルの拒否テスト"""
+        first_page = await user_service.get_users(limit=1)
+        payload, _ = first_page.next_cursor.split('.', 1)
+        
+        with pytest.raises(ValidationException):
+            await user_service.get_users(limit=1, cursor=f"{payload}.invalid-signature")
+    
     @pytest.mark.asyncio
     async def test_get_user_success(self, user_service, mock_users_table):
         """ユーザー詳細取得の成功テスト"""
@@ -117,6 +145,92 @@ class TestUserService:
         # パスワードハッシュ化の確認
         assert hasattr(result, 'hashed_password') is False  # レスポンスには含まれない
     
+    @pytest.mark.asyncio
+    async def test_create_user_transactional(self, mock_users_table, mock_reservations_table, sample_user_create):
+        """ユーザー本体と予約項目が1回のトランザクションで書き込まれることのテスト"""
+        mock_users_table.query = Mock()
+        service = UserService(mock_users_table, reservations_table=mock_reservations_table)
+        
+        result = await service.create_user(sample_user_create)
+        
+        assert result.username == 'newuser'
+        mock_users_table.query.assert_not_called()
+        transact_items = mock_users_table.meta.client.transact_write_items.call_args.kwargs['TransactItems']
+        assert [item['Put']['TableName'] for item in transact_items] == [
+            'portfolio-users', 'portfolio-user-reservations', 'portfolio-user-reservations'
+        ]
+        assert transact_items[1]['Put']['Item']['reservation_key'] == {'S': 'username#newuser'}
+        assert transact_items[2]['Put']['Item']['reservation_key'] == {'S': 'email#newuser@example.com'}
+        assert all('ConditionExpression' in item['Put'] for item in transact_items)
+    
+    @pytest.mark.asyncio
+    async def test_create_user_reservation_conflict(self, mock_users_table, mock_reservations_table, sample_user_create):
+        """予約済みのメールアドレスでの作成が競合として扱われることのテスト"""
+        mock_users_table.meta.client.transact_write_items.side_effect = ClientError(
+            {
+                'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'},
+                'CancellationReasons': [{'Code': 'None'}, {'Code': 'None'}, {'Code': 'ConditionalCheckFailed'}]
+            },
+            'TransactWriteItems'
+        )
+        service = UserService(mock_users_table, reservations_table=mock_reservations_table)
+        
+        with pytest.raises(UserAlreadyExistsException) as exc_info:
+            await service.create_user(sample_user_create)
+        
+        assert exc_info.value.details == {'email': 'newuser@example.com'}
+    
+    @pytest.mark.asyncio
+    async def test_create_user_duplicate_without_reservations(self, user_service, sample_user_create):
+        """予約表がない場合もGSIで重複を検出することのテスト"""
+        duplicate = sample_user_create.model_copy(update={'username': 'testuser1'})
+        
+        with pytest.raises(UserAlreadyExistsException):
+            await user_service.create_user(duplicate)
+    
+    @pytest.mark.asyncio
+    async def test_backfill_reservations(self, mock_users_table, mock_reservations_table):
+        """既存ユーザーの予約項目を作成し、別ユーザーが予約済みの値を重複として数えることのテスト"""
+        def put_item(**kwargs):
+            if kwargs['Item']['reservation_key'] == 'email#test2@example.com':
+                raise ClientError(
+                    {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+                    'PutItem'
+                )
+            return {}
+        mock_reservations_table.put_item = Mock(side_effect=put_item)
+        mock_users_table.scan = Mock(side_effect=[
+            {'Items': [{'user_id': 'user-001', 'username': 'testuser1', 'email': 'Test1@example.com'}],
+             'LastEvaluatedKey': {'user_id': 'user-001'}},
+            {'Items': [{'user_id': 'user-002', 'username': 'testuser2', 'email': 'test2@example.com'}]}
+        ])
+        service = UserService(mock_users_table, reservations_table=mock_reservations_table)
+        
+        counts = await service.backfill_reservations()
+        
+        assert counts == {'users': 2, 'reserved': 3, 'conflicts': 1}
+        assert mock_users_table.scan.call_args_list[1].kwargs['ExclusiveStartKey'] == {'user_id': 'user-001'}
+        keys = [call.kwargs['Item']['reservation_key'] for call in mock_reservations_table.put_item.call_args_list]
+        assert keys == ['username#testuser1', 'email#test1@example.com', 'username#testuser2', 'email#test2@example.com']
+        assert all(
+            call.kwargs['ConditionExpression'] == 'attribute_not_exists(reservation_key) OR user_id = :user_id'
+            for call in mock_reservations_table.put_item.call_args_list
+        )
+    
+    @pytest.mark.asyncio
+    async def test_update_username_moves_reservation(self, mock_users_table, mock_reservations_table):
+        """ユーザー名変更で予約が付け替えられることのテスト"""
+        service = UserService(mock_users_table, reservations_table=mock_reservations_table)
+        
+        result = await service.update_user('user-001', UserUpdate(username='renamed'))
+        
+        assert result.username == 'renamed'
+        assert result.email == 'test1@example.com'
+        transact_items = mock_users_table.meta.client.transact_write_items.call_args.kwargs['TransactItems']
+        assert 'Update' in transact_items[0]
+        assert transact_items[1]['Put']['Item']['reservation_key'] == {'S': 'username#renamed'}
+        assert transact_items[2]['Delete']['Key']['reservation_key'] == {'S': 'username#testuser1'}
+    
     @pytest.mark.asyncio
     async def test_update_user_success(self, user_service, mock_users_table, sample_user_update):
         """ユーザー更新の成功テスト"""
@@ -144,6 +258,33 @@ class TestUserService:
         
         assert result is True
     
+    @pytest.mark.asyncio
+    async def test_update_user_single_call(self, mock_users_table, sample_user_update):
+        """ユーザー更新が条件付きの1回の書き込みで完結することのテスト"""
+        update_item = mock_users_table.update_item
+        mock_users_table.update_item = Mock(side_effect=update_item)
+        mock_users_table.get_item = Mock()
+        
+        result = await UserService(mock_users_table).update_user('user-001', sample_user_update)
+        
+        assert result.full_name == 'Updated User Name'
+        mock_users_table.get_item.assert_not_called()
+        kwargs = mock_users_table.update_item.call_args.kwargs
+        assert kwargs['ConditionExpression'] == 'attribute_exists(user_id)'
+        assert kwargs['ReturnValues'] == 'ALL_NEW'
+    
+    @pytest.mark.asyncio
+    async def test_update_user_not_found(self, user_service, sample_user_update):
+        """存在しないユーザー更新のテスト"""
+        with pytest.raises(UserNotFoundException):
+            await user_service.update_user('user-999', sample_user_update)
+    
+    @pytest.mark.asyncio
+    async def test_delete_user_not_found(self, user_service):
+        """存在しないユーザー削除のテスト"""
+        with pytest.raises(UserNotFoundException):
+            await user_service.delete_user('user-999')
+    
     def test_password_hashing(self, user_service):
         """パスワードハッシュ化のテスト"""
         password = "testpassword123"
@@ -0,0 +1,260 @@
+"""
+Write-Ahead Log Tests
+WALと再生処理のテスト
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.core.exceptions import RateLimitException
+from app.core.wal import WalReplayer, WriteAheadLog
+from app.services.metric_service import MetricService
+
+
+async def _open_wal(directory, **kwargs) -> WriteAheadLog:
+    wal = WriteAheadLog(str(directory), **kwargs)
+    await wal.open()
+    return wal
+
+
+def _segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.log'))
+
+
+def _throttled():
+    return ClientError(
+        {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Throughput exceeded'}},
+        'BatchWriteItem'
+    )
+
+
+def _dead_letters(directory):
+    with open(os.path.join(directory, 'dead-letter.jsonl')) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestWriteAheadLog:
+    """WriteAheadLogのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_append_and_replay(self, tmp_path):
+        """同時追記が1回のfsyncにまとまり、順に読み出せることのテスト"""
+        wal = await _open_wal(tmp_path)
+
+        await asyncio.gather(*(wal.append({'n': i}) for i in range(10)))
+        assert wal.stats()['appended'] == 10
+        assert wal.stats()['fsyncs'] < 10
+
+        records, position = await wal.read_batch(4)
+        assert [r['n'] for r in records] == [0, 1, 2, 3]
+        await wal.commit(position)
+
+        records, position = await wal.read_batch(100)
+        assert [r['n'] for r in records] == list(range(4, 10))
+        await wal.commit(position)
+        assert wal.lag_bytes == 0
+        await wal.close()
+
+    @pytest.mark.asyncio
+    async def test_read_does_not_skip_records_appended_during_rotation(self, tmp_path, monkeypatch):
+        """書き込み中のセグメントを末尾まで読んだ直後に追記・切り替えが起きても、追記分を読み飛ばさないことのテスト"""
+        wal = await _open_wal(tmp_path, segment_max_bytes=64)
+        await wal.append({'n': 0})
+        active_path = wal._segment_path(wal._segment_seq)
+
+        class _RacingFile:
+            """EOFを返した直後に別スレッドの追記・セグメント切り替えを割り込ませるファイル"""
+
+            def __init__(self, f):
+                self._f = f
+                self._raced = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                self._f.close()
+
+            def seek(self, offset):
+                self._f.seek(offset)
+
+            def readline(self):
+                line = self._f.readline()
+                if not line and not self._raced:
+                    self._raced = True
+                    wal._write_and_sync(b'{"n":1,"payload":"' + b'x' * 64 + b'"}\n')
+                return line
+
+        real_open = open
+
+        def racing_open(path, mode='r', *args, **kwargs):
+            f = real_open(path, mode, *args, **kwargs)
+            return _RacingFile(f) if path == active_path else f
+
+        monkeypatch.setattr('builtins.open', racing_open)
+        records, position = await wal.read_batch(100)
+        monkeypatch.undo()
+
+        assert [r['n'] for r in records] == [0]
+        await wal.commit(position)
+        records, position = await wal.read_batch(100)
+        assert [r['n'] for r in records] == [1]
+        await wal.close()
+
+    @pytest.mark.asyncio
+    async def test_segment_rotation_and_cleanup(self, tmp_path):
+        """セグメントの切り替えと再生済みセグメントの削除のテスト"""
+        wal = await _open_wal(tmp_path, segment_max_bytes=64)
+
+        for i in range(10):
+            await wal.append({'n': i, 'payload': 'x' * 20})
+        assert len(_segment_files(tmp_path)) > 2
+
+        records, position = await wal.read_batch(100)
+        assert [r['n'] for r in records] == list(range(10))
+        await wal.commit(position)
+
+        assert len(_segment_files(tmp_path)) == 1
+        assert wal.lag_bytes == 0
+        await wal.close()
+
+    @pytest.mark.asyncio
+    async def test_recovery_after_restart(self, tmp_path):
+        """再起動後にチェックポイント以降から再生され、途中までの行は読み飛ばされることのテスト"""
+        wal = await _open_wal(tmp_path)
+        for i in range(5):
+            await wal.append({'n': i})
+        records, position = await wal.read_batch(2)
+        await wal.commit(position)
+        await wal.close()
+
+        # 異常終了で書きかけになった行
+        with open(os.path.join(tmp_path, _segment_files(tmp_path)[-1]), 'ab') as f:
+            f.write(b'{"n": 99')
+
+        wal = await _open_wal(tmp_path)
+        assert wal.lag_bytes > 0
+        await wal.append({'n': 5})
+
+        records, position = await wal.read_batch(100)
+        assert [r['n'] for r in records] == [2, 3, 4, 5]
+        await wal.commit(position)
+        assert wal.lag_bytes == 0
+        await wal.close()
+
+    @pytest.mark.asyncio
+    async def test_backpressure_when_lag_exceeds_limit(self, tmp_path):
+        """未再生データが上限を超えた場合に429となることのテスト"""
+        wal = await _open_wal(tmp_path, max_bytes=32)
+        await wal.append({'payload': 'x' * 40})
+
+        with pytest.raises(RateLimitException):
+            await wal.append({'payload': 'y'})
+        await wal.close()
+
+
+class TestWalReplayer:
+    """WalReplayerのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_retries_until_written(self, tmp_path):
+        """書き込みに失敗したレコードのみ再試行し、成功後にチェックポイントを進めることのテスト"""
+        wal = await _open_wal(tmp_path)
+        for i in range(3):
+            await wal.append({'n': i})
+
+        calls = []
+
+        async def write(records):
+            calls.append([r['n'] for r in records])
+            if len(calls) == 1:
+                raise _throttled()
+            if len(calls) == 2:
+                return [True, False, True]
+            return [True] * len(records)
+
+        replayer = WalReplayer(wal, write, retry_base_delay=0.001)
+        assert await replayer.replay_once() == 3
+
+        assert calls == [[0, 1, 2], [0, 1, 2], [1]]
+        assert replayer.stats()['retries'] == 2
+        assert wal.lag_bytes == 0
+        assert await replayer.replay_once() == 0
+        await wal.close()
+
+    @pytest.mark.asyncio
+    async def test_dead_letters_malformed_record(self, tmp_path):
+        """再試行できない例外の原因となったレコードのみをデッドレターへ退避し、再生を進めることのテスト"""
+        wal = await _open_wal(tmp_path)
+        for record in ({'n': 0}, {'bad': True}, {'n': 2}):
+            await wal.append(record)
+
+        written = []
+
+        async def write(records):
+            written.extend([record['n'] for record in records])
+            return [True] * len(records)
+
+        replayer = WalReplayer(wal, write, retry_base_delay=0.001)
+        assert await replayer.replay_once() == 3
+
+        assert written == [0, 2]
+        assert replayer.stats()['dead_lettered'] == 1
+        assert replayer.stats()['retries'] == 0
+        assert wal.lag_bytes == 0
+        assert wal.stats()['dead_letter']['records'] == 1
+        dead = _dead_letters(tmp_path)
+        assert dead[0]['record'] == {'bad': True}
+        assert dead[0]['error'] == "KeyError: 'n'"
+        await wal.close()
+
+        # 再起動後も退避した件数を引き継ぐ
+        reopened = await _open_wal(tmp_path)
+        assert reopened.stats()['dead_letter']['records'] == 1
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_dead_letters_after_max_retries(self, tmp_path):
+        """書き込めないレコードは上限まで再試行した後に退避し、スロットリングは上限に数えないことのテスト"""
+        wal = await _open_wal(tmp_path)
+        for i in range(3):
+            await wal.append({'n': i})
+
+        calls = []
+
+        async def write(records):
+            calls.append([r['n'] for r in records])
+            if len(calls) <= 3:
+                raise _throttled()
+            # 1件でも不正な項目を含むチャンクは全件失敗する（BatchWriteItemのValidationException）
+            failed = any(r['n'] == 1 for r in records)
+            return [not failed] * len(records)
+
+        replayer = WalReplayer(wal, write, retry_base_delay=0.001, max_retries=2)
+        assert await replayer.replay_once() == 3
+
+        # スロットリング3回 + 上限までの3回 + 1件ずつの書き込み直し
+        assert calls == [[0, 1, 2]] * 6 + [[0], [1], [2]]
+        assert replayer.stats()['replayed'] == 2
+        assert replayer.stats()['dead_lettered'] == 1
+        assert [entry['record'] for entry in _dead_letters(tmp_path)] == [{'n': 1}]
+        assert wal.lag_bytes == 0
+        await wal.close()
+
+    @pytest.mark.asyncio
+    async def test_metric_service_wal_mode(self, tmp_path, mock_metrics_table, sample_metric_create):
+        """WALモードで受け付けたメトリクスがBatchWriteItemで再生されることのテスト"""
+        wal = await _open_wal(tmp_path)
+        replayer = WalReplayer(wal, MetricService(mock_metrics_table).write_buffered)
+        service = MetricService(mock_metrics_table, wal=wal)
+
+        accepted = await service.create_metric(sample_metric_create)
+
+        assert await replayer.replay_once() == 1
+        requests = mock_metrics_table.meta.client.batch_write_item.call_args.kwargs['RequestItems']
+        assert requests['portfolio-metrics'][0]['PutRequest']['Item']['metric_id'] == {'S': accepted.metric_id}
+        await wal.close()
@@ -0,0 +1,142 @@
+"""
+Write-Behind Buffer Tests
+ライトビハインドバッファーのテスト
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.dead_letter import DeadLetterFile
+from app.core.exceptions import RateLimitException, ServiceUnavailableException
+from app.core.write_buffer import WriteBehindBuffer
+from app.services.metric_service import MetricService
+
+
+class _Recorder:
+    """flushの呼び出しを記録"""
+
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+
+    async def __call__(self, items):
+        await asyncio.sleep(self.delay)
+        self.batches.append(list(items))
+        return [True] * len(items)
+
+
+class TestWriteBehindBuffer:
+    """WriteBehindBufferのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_flushes_micro_batches(self):
+        """batch_size件ごとにまとめて書き込まれることのテスト"""
+        recorder = _Recorder()
+        buffer = WriteBehindBuffer(recorder, batch_size=10, flush_interval=0.01, workers=1)
+        buffer.start()
+
+        for i in range(25):
+            buffer.enqueue(i)
+        await buffer.close(timeout=1)
+
+        assert [len(batch) for batch in recorder.batches] == [10, 10, 5]
+        assert sum(recorder.batches, []) == list(range(25))
+        assert buffer.stats()['written'] == 25
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_interval(self):
+        """batch_sizeに達しなくてもflush_interval経過で書き込まれることのテスト"""
+        recorder = _Recorder()
+        buffer = WriteBehindBuffer(recorder, batch_size=100, flush_interval=0.01, workers=1)
+        buffer.start()
+
+        buffer.enqueue('a')
+        await asyncio.sleep(0.1)
+
+        assert recorder.batches == [['a']]
+        await buffer.close(timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_backpressure_when_full(self):
+        """キュー満杯時にRateLimitExceptionとなることのテスト"""
+        buffer = WriteBehindBuffer(_Recorder(delay=0.05), max_size=2, batch_size=1, workers=1)
+        buffer.start()
+
+        buffer.enqueue(1)
+        buffer.enqueue(2)
+        with pytest.raises(RateLimitException) as exc_info:
+            buffer.enqueue(3)
+            buffer.enqueue(4)
+
+        assert exc_info.value.status_code == 429
+        assert buffer.stats()['rejected'] == 1
+        await buffer.close(timeout=1)
+        with pytest.raises(ServiceUnavailableException):
+            buffer.enqueue(5)
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_counted(self):
+        """書き込み失敗が記録され、ワーカーが停止しないことのテスト"""
+        async def failing(items):
+            raise RuntimeError('boom')
+
+        buffer = WriteBehindBuffer(failing, batch_size=5, flush_interval=0.01, workers=1)
+        buffer.start()
+        buffer.enqueue(1)
+        await buffer.close(timeout=1)
+
+        assert buffer.stats()['failed'] == 1
+        assert buffer.stats()['lost'] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_items_are_dead_lettered(self, tmp_path):
+        """書き込めなかった項目がデッドレターファイルへ退避されることのテスト"""
+        async def partial(items):
+            return [item % 2 == 0 for item in items]
+
+        dead_letter = DeadLetterFile(str(tmp_path / 'dead-letter.jsonl'))
+        await dead_letter.open()
+        buffer = WriteBehindBuffer(partial, batch_size=10, flush_interval=0.01, workers=1, dead_letter=dead_letter)
+        buffer.start()
+        for i in range(4):
+            buffer.enqueue(i)
+        await buffer.close(timeout=1)
+
+        stats = buffer.stats()
+        assert stats['written'] == 2
+        assert stats['failed'] == 2
+        assert stats['dead_lettered'] == 2
+        assert stats['lost'] == 0
+        assert stats['dead_letter']['records'] == 2
+        with open(tmp_path / 'dead-letter.jsonl') as f:
+            assert [json.loads(line)['record'] for line in f] == [1, 3]
+
+        reopened = DeadLetterFile(str(tmp_path / 'dead-letter.jsonl'))
+        await reopened.open()
+        assert reopened.records == 2
+
+
+class TestMetricWriteBehind:
+    """MetricServiceのライトビハインドモードのテストクラス"""
+
+    @pytest.mark.asyncio
+    async def test_create_metric_enqueues(self, mock_metrics_table, sample_metric_create):
+        """put_itemを待たずに受け付け、BatchWriteItemで書き込まれることのテスト"""
+        writer = MetricService(mock_metrics_table)
+        buffer = WriteBehindBuffer(writer.write_buffered, batch_size=50, flush_interval=0.01, workers=1)
+        buffer.start()
+        service = MetricService(mock_metrics_table, write_buffer=buffer)
+
+        accepted = [await service.create_metric(sample_metric_create) for _ in range(30)]
+        await buffer.close(timeout=1)
+
+        assert all(metric.device_id == sample_metric_create.device_id for metric in accepted)
+        written = [
+            request['PutRequest']['Item']['metric_id']['S']
+            for call in mock_metrics_table.meta.client.batch_write_item.call_args_list
+            for request in call.kwargs['RequestItems']['portfolio-metrics']
+        ]
+        assert sorted(written) == sorted(metric.metric_id for metric in accepted)
+        assert buffer.stats()['written'] == 30